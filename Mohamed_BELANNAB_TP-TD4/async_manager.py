@@ -0,0 +1,238 @@
+# async_manager.py
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Any, AsyncIterator, Iterable
+
+from config import Config
+from models import UserRegistration, UserLogin, PasswordEntry
+from storage import StorageBackend, get_backend
+from database import SECRET_COLUMNS
+from security import hash_password, verify_password, needs_rehash, decrypt_passwords
+from data_keys import get_user_cipher
+from sessions import SessionManager, Session
+from throttle import LoginThrottle
+import audit
+
+logger = logging.getLogger(__name__)
+
+class AsyncPasswordManager:
+    """
+    Version asyncio du gestionnaire de mots de passe.
+    bcrypt et Fernet s'exécutent dans un pool de threads borné (bcrypt libère le GIL),
+    et les accès au stockage passent par un second pool dimensionné sur le pool de connexions.
+    Un sémaphore limite le nombre de hachages bcrypt simultanés.
+    Chaque opération protégée reçoit le jeton de session retourné par `login_user`,
+    ce qui permet de servir plusieurs sessions depuis la même instance.
+    """
+
+    def __init__(self, crypto_workers: Optional[int] = None, hash_concurrency: Optional[int] = None,
+                 storage: Optional[StorageBackend] = None):
+        self.storage = storage or get_backend()
+        self._crypto_executor = ThreadPoolExecutor(
+            max_workers=crypto_workers or Config.ASYNC_CRYPTO_WORKERS,
+            thread_name_prefix="crypto"
+        )
+        self._db_executor = ThreadPoolExecutor(
+            max_workers=Config.DB_POOL_SIZE,
+            thread_name_prefix="db"
+        )
+        self._hash_semaphore = asyncio.Semaphore(hash_concurrency or Config.ASYNC_HASH_CONCURRENCY)
+        self.sessions = SessionManager()
+        self.throttle = LoginThrottle(storage=self.storage)
+        self.audit = audit.get_audit_log(self.storage)
+        self._initialized = False
+
+    async def _run_db(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._db_executor, functools.partial(func, *args, **kwargs))
+
+    async def _run_crypto(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._crypto_executor, func, *args)
+
+    async def _run_hash(self, func, *args):
+        """Exécuter une opération bcrypt en respectant la limite de concurrence."""
+        async with self._hash_semaphore:
+            return await self._run_crypto(func, *args)
+
+    def _require_session(self, session_token: Optional[str]) -> Session:
+        """Équivalent de `requires_auth` : valider le jeton en mémoire."""
+        session = self.sessions.get(session_token)
+        if session is None:
+            logger.warning("Tentative d'accès non autorisé à une fonction protégée")
+            raise PermissionError("Authentification requise pour accéder à cette fonctionnalité")
+        return session
+
+    async def initialize(self) -> None:
+        """Initialiser la base de données (à appeler une fois avant utilisation)."""
+        if not self._initialized:
+            await self._run_db(self.storage.initialize)
+            self._initialized = True
+            logger.info("Gestionnaire asynchrone initialisé")
+
+    async def register_user(self, username: str, email: str, password: str) -> bool:
+        """Enregistrer un nouvel utilisateur."""
+        try:
+            user_data = UserRegistration(username=username, email=email, password=password)
+            hashed_password = await self._run_hash(hash_password, user_data.password)
+            await self._run_db(self.storage.add_user, user_data.username, hashed_password, user_data.email)
+            logger.info(f"Utilisateur {username} enregistré avec succès")
+            return True
+        except ValueError as e:
+            logger.error(f"Erreur de validation: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"Erreur lors de l'enregistrement de l'utilisateur: {e}")
+            return False
+
+    async def login_user(self, username: str, password: str, source: Optional[str] = None) -> Optional[str]:
+        """Vérifier les identifiants et retourner un jeton de session, ou None en cas d'échec."""
+        try:
+            login_data = UserLogin(username=username, password=password)
+            # Limitation avant bcrypt ; l'état peut être relu depuis le stockage, d'où le pool db
+            retry_after = await self._run_db(self.throttle.acquire, login_data.username, source)
+            if retry_after:
+                logger.warning(f"Tentative de connexion limitée pour {username} (réessayer dans {retry_after:.0f} s)")
+                self.audit.record(audit.LOGIN_THROTTLED, subject=login_data.username, source=source)
+                return None
+            user = await self._run_db(self.storage.get_user_by_username, login_data.username)
+            if not user:
+                logger.warning(f"Tentative de connexion avec un nom d'utilisateur inexistant: {username}")
+                self.audit.record(audit.LOGIN_FAILED, subject=login_data.username, source=source)
+                await self._run_db(self.throttle.record_failure, login_data.username, source)
+                return None
+            if not await self._run_hash(verify_password, login_data.password, user['password_hash']):
+                logger.warning(f"Tentative de connexion avec un mot de passe incorrect pour {username}")
+                self.audit.record(audit.LOGIN_FAILED, user['id'], subject=login_data.username, source=source)
+                await self._run_db(self.throttle.record_failure, login_data.username, source)
+                return None
+            await self._run_db(self.throttle.record_success, login_data.username, source)
+            if needs_rehash(user['password_hash']):
+                try:
+                    new_hash = await self._run_hash(hash_password, login_data.password)
+                    await self._run_db(self.storage.update_user_password_hash, user['id'], new_hash)
+                except Exception as e:
+                    # Le rehachage ne doit jamais empêcher la connexion
+                    logger.error(f"Échec du rehachage du mot de passe de {username}: {e}")
+            self.audit.record(audit.LOGIN_SUCCEEDED, user['id'], source=source)
+            logger.info(f"Utilisateur {username} connecté avec succès")
+            return self.sessions.create(user)
+        except Exception as e:
+            logger.error(f"Erreur lors de la connexion: {e}")
+            return None
+
+    async def store_password(self, session_token: str, site_name: str, username: str, password: str,
+                             notes: Optional[str] = None) -> bool:
+        """Stocker un nouveau mot de passe pour l'utilisateur de la session."""
+        session = self._require_session(session_token)
+        try:
+            fields = {"site_name": site_name, "username": username, "password": password}
+            if notes is not None:
+                fields["notes"] = notes
+            password_data = PasswordEntry(**fields)
+            cipher = await self._run_db(get_user_cipher, session.user_id, self.storage)
+            encrypted_password = await self._run_crypto(cipher.encrypt, password_data.password)
+            password_id = await self._run_db(
+                self.storage.add_password, session.user_id, password_data.site_name, password_data.username,
+                encrypted_password, password_data.notes
+            )
+            self.audit.record(audit.SECRET_CREATED, session.user_id, password_id)
+            logger.info(f"Mot de passe pour {site_name} stocké avec succès")
+            return True
+        except Exception as e:
+            logger.error(f"Erreur lors du stockage du mot de passe: {e}")
+            return False
+
+    async def retrieve_passwords(self, session_token: str, after_id: int = 0, limit: int = 50,
+                                 columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Récupérer une page de mots de passe de l'utilisateur de la session."""
+        session = self._require_session(session_token)
+        try:
+            return await self._run_db(self.storage.get_passwords_page, session.user_id, after_id, limit, columns)
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération des mots de passe: {e}")
+            return []
+
+    async def retrieve_password(self, session_token: str, password_id: int) -> Optional[Dict[str, Any]]:
+        """Récupérer et déchiffrer un mot de passe spécifique."""
+        session = self._require_session(session_token)
+        try:
+            password_entry = await self._run_db(self.storage.get_password_by_id, password_id, session.user_id)
+            if not password_entry:
+                logger.warning(f"Tentative d'accès à un mot de passe inexistant: ID {password_id}")
+                return None
+            encrypted_password = password_entry.pop('encrypted_password')
+            cipher = await self._run_db(get_user_cipher, session.user_id, self.storage, [encrypted_password])
+            password_entry['password'] = await self._run_crypto(cipher.decrypt, encrypted_password)
+            self.audit.record(audit.SECRET_READ, session.user_id, password_id)
+            logger.info(f"Mot de passe récupéré avec succès: ID {password_id}")
+            return password_entry
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération du mot de passe: {e}")
+            return None
+
+    def retrieve_password_bulk(self, session_token: str, password_ids: Optional[Iterable[int]] = None,
+                               chunk_size: int = 500) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Récupérer et déchiffrer plusieurs entrées en flux (`async for`), triées par id.
+        La session est vérifiée dès l'appel ; le bloc suivant est lu pendant le
+        déchiffrement du bloc courant.
+        """
+        session = self._require_session(session_token)
+        return self._iter_password_bulk(session, None if password_ids is None else sorted(set(password_ids)),
+                                        chunk_size)
+
+    async def _iter_password_bulk(self, session: Session, password_ids: Optional[List[int]],
+                                  chunk_size: int) -> AsyncIterator[Dict[str, Any]]:
+        def fetch(position: int) -> List[Dict[str, Any]]:
+            # Position : dernier id reçu (tout le coffre) ou rang dans la liste d'ids
+            if password_ids is None:
+                return self.storage.get_passwords_page(session.user_id, position, chunk_size, SECRET_COLUMNS)
+            return self.storage.get_passwords_by_ids(
+                session.user_id, password_ids[position:position + chunk_size], SECRET_COLUMNS
+            )
+
+        pending = asyncio.ensure_future(self._run_db(fetch, 0))
+        offset = 0
+        try:
+            while pending is not None:
+                rows = await pending
+                pending = None
+                if password_ids is None:
+                    if len(rows) == chunk_size:
+                        pending = asyncio.ensure_future(self._run_db(fetch, rows[-1]["id"]))
+                else:
+                    offset += chunk_size
+                    if offset < len(password_ids):
+                        pending = asyncio.ensure_future(self._run_db(fetch, offset))
+                tokens = [row.pop('encrypted_password') for row in rows]
+                cipher = await self._run_db(get_user_cipher, session.user_id, self.storage, tokens)
+                passwords = await self._run_crypto(decrypt_passwords, tokens, None, cipher)
+                for row, password in zip(rows, passwords):
+                    row['password'] = password
+                self.audit.record_many(audit.SECRET_READ, session.user_id, [row['id'] for row in rows])
+                for row in rows:
+                    yield row
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    def logout(self, session_token: Optional[str]) -> None:
+        """Fermer la session associée au jeton."""
+        if not self.sessions.revoke(session_token):
+            logger.warning("Tentative de déconnexion sans utilisateur connecté")
+
+    async def close(self) -> None:
+        """Arrêter les pools de threads, sans bloquer la boucle pendant les tâches en cours."""
+        loop = asyncio.get_running_loop()
+        for executor in (self._crypto_executor, self._db_executor):
+            await loop.run_in_executor(None, functools.partial(executor.shutdown, wait=True))
+
+    async def __aenter__(self):
+        await self.initialize()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
@@ -0,0 +1,374 @@
+# audit.py
+"""
+Journal d'audit structuré : connexions, échecs, lectures et modifications de secrets.
+
+    python audit.py query [--user alice] [--entry 42] [--event secret_read] [--since 2026-09-01] [--until ...]
+    python audit.py verify
+
+Les événements sont mis en file par `AuditLog.record` (sans attendre le disque)
+puis écrits par lots par un thread dédié, dans une table en ajout seul
+(migration 10, déclencheurs qui refusent UPDATE et DELETE), indexée par
+utilisateur, par entrée et par date. Chaque ligne porte l'empreinte SHA-256
+(tronquée à 128 bits) de son contenu et de l'empreinte précédente : modifier
+ou supprimer une ligne casse la chaîne, ce que `verify` détecte. Pour détecter
+aussi la suppression des dernières lignes, conservez ailleurs la tête
+affichée par `verify`.
+"""
+import argparse
+import atexit
+import hashlib
+import logging
+import queue
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Types d'événements (stockés sous forme d'entier)
+LOGIN_SUCCEEDED = 1
+LOGIN_FAILED = 2
+LOGIN_THROTTLED = 3
+SECRET_READ = 4
+SECRET_CREATED = 5
+SECRET_UPDATED = 6
+SECRET_DELETED = 7
+SECRETS_EXPORTED = 8
+SECRETS_IMPORTED = 9
+
+EVENT_NAMES = {
+    LOGIN_SUCCEEDED: "login",
+    LOGIN_FAILED: "login_failed",
+    LOGIN_THROTTLED: "login_throttled",
+    SECRET_READ: "secret_read",
+    SECRET_CREATED: "secret_created",
+    SECRET_UPDATED: "secret_updated",
+    SECRET_DELETED: "secret_deleted",
+    SECRETS_EXPORTED: "secrets_exported",
+    SECRETS_IMPORTED: "secrets_imported",
+}
+EVENT_CODES = {name: code for code, name in EVENT_NAMES.items()}
+
+HASH_SIZE = 16
+GENESIS_HASH = bytes(HASH_SIZE)
+# id, date, type, utilisateur (0 si aucun), entrée (0 si aucune)
+_RECORD = struct.Struct(">qdBqq")
+_TEXT_LENGTH = struct.Struct(">I")
+
+def chain_hash(previous_hash: bytes, record: Sequence) -> bytes:
+    """Empreinte d'un événement (id, ts, event, user_id, entry_id, subject, source) chaînée à la précédente."""
+    record_id, ts, event, user_id, entry_id, subject, source = record[:7]
+    digest = hashlib.sha256(previous_hash)
+    digest.update(_RECORD.pack(record_id, ts, event, user_id or 0, entry_id or 0))
+    for text in (subject, source):
+        data = (text or "").encode("utf-8")
+        digest.update(_TEXT_LENGTH.pack(len(data)))
+        digest.update(data)
+    return digest.digest()[:HASH_SIZE]
+
+class AuditLog:
+    """
+    File d'événements d'audit vidée par lots dans le stockage.
+
+    Le thread d'écriture démarre au premier événement. Il attend au plus
+    `flush_interval` secondes ou `batch_size` événements, chaîne le lot à la
+    dernière ligne du journal et l'écrit en une transaction. Si un autre
+    processus a écrit entre-temps (ids déjà pris), la tête est relue et le lot
+    rechaîné ; si la base est verrouillée, le lot est gardé et réessayé. Une
+    file pleine ou une autre erreur d'écriture fait perdre les événements
+    concernés : ils sont comptés et journalisés, jamais bloquants.
+    """
+
+    def __init__(self, storage=None, batch_size: Optional[int] = None, flush_interval: Optional[float] = None,
+                 max_queue: Optional[int] = None):
+        self.storage = storage
+        self.batch_size = batch_size or Config.AUDIT_BATCH_SIZE
+        self.flush_interval = Config.AUDIT_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._queue: "queue.Queue" = queue.Queue(max_queue or Config.AUDIT_QUEUE_MAX)
+        self._head: Optional[Tuple[int, bytes]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stop_timeout = Config.AUDIT_CLOSE_TIMEOUT
+        self._stats = {"written": 0, "batches": 0, "conflicts": 0, "retries": 0, "dropped": 0, "errors": 0}
+
+    def _storage(self):
+        if self.storage is None:
+            from storage import get_backend
+            self.storage = get_backend()
+        return self.storage
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "queued": self._queue.qsize()}
+
+    def record(self, event: int, user_id: Optional[int] = None, entry_id: Optional[int] = None,
+               subject: Optional[str] = None, source: Optional[str] = None) -> None:
+        """
+        Mettre un événement en file ; ne bloque jamais l'appelant. Dans une
+        transaction du stockage, il n'est mis en file qu'à sa validation.
+        """
+        if not Config.AUDIT_ENABLED:
+            return
+        record = (time.time(), event, user_id, entry_id, subject, source)
+        self._storage().after_commit(lambda: self._enqueue(record, 1))
+
+    def record_many(self, event: int, user_id: Optional[int], entry_ids: Sequence[int],
+                    subject: Optional[str] = None, source: Optional[str] = None) -> None:
+        """Un événement par entrée, mis en file en une seule fois (lectures en masse)."""
+        if not Config.AUDIT_ENABLED or not entry_ids:
+            return
+        now = time.time()
+        records = [(now, event, user_id, entry_id, subject, source) for entry_id in entry_ids]
+        self._storage().after_commit(lambda: self._enqueue(records, len(records)))
+
+    def _enqueue(self, item, count: int) -> None:
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                previous = self._stats["dropped"]
+                self._stats["dropped"] += count
+                dropped = self._stats["dropped"]
+            # Journaliser la première perte puis une fois par millier d'événements perdus
+            if previous == 0 or previous // 1000 != dropped // 1000:
+                logger.error(f"File d'audit pleine: {dropped} événement(s) perdu(s)")
+            return
+        if self._thread is None:
+            self._start()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Attendre l'écriture des événements déjà en file. Retourne False après `timeout`."""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Écrire les événements en attente puis arrêter le thread d'écriture. Un lot
+        encore refusé par la base après `timeout` secondes (AUDIT_CLOSE_TIMEOUT
+        par défaut) est abandonné et compté comme perdu.
+        """
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._stop_timeout = Config.AUDIT_CLOSE_TIMEOUT if timeout is None else timeout
+        self._queue.put(None)
+        thread.join(self._stop_timeout + 1.0)
+
+    def _run(self) -> None:
+        # Un lot non écrit (base verrouillée par une autre transaction) reste en
+        # tête du suivant et est réessayé après un délai croissant
+        batch: List[Tuple] = []
+        waiters: List[threading.Event] = []
+        stop, failures, stop_deadline = False, 0, None
+        while True:
+            if batch:
+                delay = min(max(self.flush_interval, 0.05), 0.05 * 2 ** min(failures, 10))
+                if stop:
+                    # Plus rien à lire dans la file : attendre avant le nouvel essai
+                    time.sleep(delay)
+                deadline = time.monotonic() + delay
+            else:
+                deadline = None
+            while not stop:
+                try:
+                    if deadline is None:
+                        item = self._queue.get()
+                        deadline = time.monotonic() + self.flush_interval
+                    else:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    stop_deadline = time.monotonic() + self._stop_timeout
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif isinstance(item, list):
+                    batch.extend(item)
+                else:
+                    batch.append(item)
+                # Un flush() ou un arrêt écrit le lot sans attendre qu'il se remplisse
+                if waiters or len(batch) >= self.batch_size:
+                    break
+            if batch:
+                if self._write(batch):
+                    batch, failures = [], 0
+                elif stop and time.monotonic() >= stop_deadline:
+                    with self._lock:
+                        self._stats["dropped"] += len(batch)
+                    logger.error(f"Arrêt du journal d'audit: {len(batch)} événement(s) non écrit(s) perdu(s)")
+                    batch = []
+                else:
+                    failures += 1
+            if not batch:
+                for waiter in waiters:
+                    waiter.set()
+                waiters = []
+                if stop:
+                    return
+
+    def _write(self, batch: List[Tuple]) -> bool:
+        """
+        Chaîner et écrire un lot. Retourne False si la base est occupée (lot à
+        réessayer) ; après toute autre erreur, le lot est perdu et compté.
+        """
+        storage = self._storage()
+        try:
+            for _ in range(3):
+                if self._head is None:
+                    self._head = storage.get_audit_head() or (0, GENESIS_HASH)
+                last_id, last_hash = self._head
+                rows = []
+                for record in batch:
+                    last_id += 1
+                    last_hash = chain_hash(last_hash, (last_id, *record))
+                    rows.append((last_id, *record, last_hash))
+                if storage.append_audit_events(rows):
+                    self._head = (last_id, last_hash)
+                    with self._lock:
+                        self._stats["written"] += len(rows)
+                        self._stats["batches"] += 1
+                    return True
+                # Un autre processus a écrit : relire la tête et rechaîner le lot
+                self._head = None
+                with self._lock:
+                    self._stats["conflicts"] += 1
+            raise RuntimeError("tête du journal modifiée à chaque tentative")
+        except sqlite3.OperationalError as e:
+            # Base verrouillée (busy_timeout dépassé) ou pool épuisé : rien n'est perdu
+            self._head = None
+            with self._lock:
+                self._stats["retries"] += 1
+            logger.warning(f"Écriture de {len(batch)} événement(s) d'audit différée: {e}")
+            return False
+        except Exception as e:
+            self._head = None
+            with self._lock:
+                self._stats["errors"] += len(batch)
+            logger.error(f"Échec de l'écriture de {len(batch)} événement(s) d'audit: {e}")
+            return True
+
+    def _flush_before_read(self) -> None:
+        # Délai borné : une base verrouillée ne doit pas bloquer la lecture du journal
+        if not self.flush(Config.AUDIT_FLUSH_TIMEOUT):
+            logger.warning("Événements d'audit encore en file : ils manqueront à la lecture")
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None, user_id: Optional[int] = None,
+              entry_id: Optional[int] = None, events: Optional[Sequence[int]] = None,
+              limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Événements de la période [start, end[ (horodatages Unix), filtrés par
+        utilisateur, entrée et types, par date croissante. Les événements encore
+        en file sont écrits avant la lecture (attente bornée par AUDIT_FLUSH_TIMEOUT).
+        """
+        self._flush_before_read()
+        rows = self._storage().query_audit_events(start, end, user_id, entry_id, list(events or ()), limit)
+        for row in rows:
+            row["event"] = EVENT_NAMES.get(row["event"], str(row["event"]))
+        return rows
+
+    def verify(self, chunk_size: int = 10000) -> Dict[str, Any]:
+        """
+        Recalculer toute la chaîne d'empreintes. Retourne le nombre de lignes
+        vérifiées, la tête (id, empreinte hexadécimale) et le premier id en défaut.
+        """
+        self._flush_before_read()
+        storage = self._storage()
+        previous_id, previous_hash = 0, GENESIS_HASH
+        checked, broken_at = 0, None
+        while broken_at is None:
+            page = storage.get_audit_events_page(previous_id, chunk_size)
+            if not page:
+                break
+            for row in page:
+                stored_hash = bytes(row[7])
+                # Un id manquant (ligne supprimée) casse aussi la chaîne
+                if row[0] != previous_id + 1 or chain_hash(previous_hash, row) != stored_hash:
+                    broken_at = row[0]
+                    break
+                previous_id, previous_hash = row[0], stored_hash
+                checked += 1
+        return {"checked": checked, "head_id": previous_id, "head_hash": previous_hash.hex(), "broken_at": broken_at}
+
+# Un journal par moteur de stockage, partagé par les gestionnaires du processus
+_audit_logs: Dict[Any, AuditLog] = {}
+_audit_logs_lock = threading.Lock()
+
+def get_audit_log(storage=None) -> AuditLog:
+    """Journal d'audit du moteur de stockage (par défaut celui de get_backend())."""
+    if storage is None:
+        from storage import get_backend
+        storage = get_backend()
+    with _audit_logs_lock:
+        audit_log = _audit_logs.get(storage)
+        if audit_log is None:
+            audit_log = _audit_logs[storage] = AuditLog(storage)
+        return audit_log
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Journal d'audit")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    query = subparsers.add_parser("query", help="Événements d'une période")
+    query.add_argument("--user", default=None, help="Nom d'utilisateur")
+    query.add_argument("--entry", type=int, default=None, help="Id de l'entrée du coffre")
+    query.add_argument("--event", action="append", choices=sorted(EVENT_CODES), help="Type (répétable)")
+    query.add_argument("--since", default=None, help="Début, date ISO (ex. 2026-09-01 ou 2026-09-01T08:00)")
+    query.add_argument("--until", default=None, help="Fin exclue, date ISO")
+    query.add_argument("--limit", type=int, default=1000)
+    subparsers.add_parser("verify", help="Vérifier la chaîne d'empreintes")
+    args = parser.parse_args(argv)
+
+    # Import tardif : main.py configure la journalisation au chargement
+    from main import PasswordManager
+    manager = PasswordManager()
+
+    if args.command == "verify":
+        result = manager.audit.verify()
+        print(f"{result['checked']} événement(s) vérifié(s), tête {result['head_id']} {result['head_hash']}")
+        if result["broken_at"] is not None:
+            print(f"Erreur: chaîne rompue à l'événement {result['broken_at']}")
+            return 1
+        return 0
+
+    user_id = None
+    if args.user is not None:
+        user = manager.storage.get_user_by_username(args.user)
+        if user is None:
+            print(f"Erreur: utilisateur {args.user} inconnu")
+            return 1
+        user_id = user["id"]
+    try:
+        start, end = _parse_time(args.since), _parse_time(args.until)
+    except ValueError as e:
+        print(f"Erreur: date invalide ({e})")
+        return 1
+    events = [EVENT_CODES[name] for name in args.event or ()]
+    for row in manager.audit.query(start, end, user_id, args.entry, events, args.limit):
+        when = datetime.fromtimestamp(row["ts"]).isoformat(sep=" ", timespec="seconds")
+        who = row["username"] or row["subject"] or "-"
+        entry = f" entrée {row['entry_id']}" if row["entry_id"] is not None else ""
+        source = f" depuis {row['source']}" if row["source"] else ""
+        print(f"{when}  {row['event']:<16} {who}{entry}{source}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,507 @@
+# backup.py
+"""
+Sauvegardes chiffrées du coffre, à chaud.
+
+    python backup.py full [--dir DIR]                       # instantané complet
+    python backup.py incremental [--dir DIR] [--base ARCHIVE]
+    python backup.py restore ARCHIVE [--target CHEMIN]      # complète + incrémentales de la chaîne
+    python backup.py list [--dir DIR]
+
+Une sauvegarde complète copie la base avec l'API de sauvegarde de SQLite en une
+seule étape : en mode WAL, elle lit un instantané cohérent sans bloquer les
+écritures. Une sauvegarde incrémentale ne copie que les entrées ajoutées
+(id) ou modifiées (updated_at) depuis l'archive précédente, la liste des id
+encore présents (suppressions), les nouveaux événements d'audit et les autres
+tables, petites, en entier.
+
+Chaque archive est compressée (zlib) puis chiffrée par blocs avec AES-256-GCM,
+sous une clé propre à l'archive enveloppée par la clé principale : il faut la
+clé principale de l'époque (ou une ancienne clé encore conservée) pour
+restaurer. Conservez encryption_key.key à part, jamais à côté des archives.
+Après une restauration, redémarrez les processus déjà lancés (server.py).
+"""
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import struct
+import sys
+import tempfile
+import time
+import uuid
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+from security import NONCE_SIZE, generate_data_key, wrap_data_key, unwrap_data_key
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_MAGIC = b"PMBK"
+ARCHIVE_VERSION = 1
+ARCHIVE_EXTENSION = ".pmbak"
+# Magie, version, longueur du manifeste (JSON), longueur de la clé enveloppée
+ARCHIVE_PREFIX = struct.Struct(">4sBII")
+CHUNK_LENGTH = struct.Struct(">I")
+# Authentifié avec chaque bloc : son rang et s'il est le dernier (archive tronquée)
+CHUNK_AAD = struct.Struct(">QB")
+
+# Tables copiées par morceaux dans une incrémentale : table -> colonne de date
+# de modification, ou None pour une table en ajout seul (nouveaux ids
+# uniquement, ni modifications ni suppressions). Les autres tables sont
+# recopiées en entier.
+TRACKED_TABLES = {"passwords": "updated_at", "audit_events": None}
+SEQUENCE_TABLE = "__sqlite_sequence"
+IDS_SUFFIX = "__ids"
+
+def _write_private(path: str):
+    """Ouvrir un fichier lisible par le seul propriétaire."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    return os.fdopen(fd, "wb")
+
+def _temp_path(directory: str, suffix: str) -> str:
+    fd, path = tempfile.mkstemp(prefix=".backup-", suffix=suffix, dir=directory or ".")
+    os.close(fd)
+    return path
+
+def _remove(*paths: str) -> None:
+    for path in paths:
+        for candidate in (path, f"{path}-wal", f"{path}-shm", f"{path}-journal"):
+            if os.path.exists(candidate):
+                os.remove(candidate)
+
+def _connect(path: str) -> sqlite3.Connection:
+    """Connexion dédiée en mode autocommit (les transactions sont explicites)."""
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute(f"PRAGMA busy_timeout = {Config.DB_PRAGMAS.get('busy_timeout', 5000)}")
+    return conn
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def _copied_tables(conn: sqlite3.Connection, schema: str) -> List[str]:
+    """Tables ordinaires d'une base, sans les tables internes de SQLite ni celles de FTS5."""
+    rows = conn.execute(
+        f"SELECT name, sql FROM {schema}.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()
+    virtual = [name for name, sql in rows if (sql or "").upper().startswith("CREATE VIRTUAL")]
+    return sorted(
+        name for name, _ in rows
+        if name not in virtual and not any(name.startswith(f"{vname}_") for vname in virtual)
+    )
+
+def _columns(conn: sqlite3.Connection, schema: str, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({_quote(table)})")]
+
+def _watermarks(conn: sqlite3.Connection, schema: str) -> Dict[str, Dict[str, Any]]:
+    """Plus grand id et plus récente modification de chaque table suivie."""
+    marks = {}
+    for table, column in TRACKED_TABLES.items():
+        last_id, updated_at = conn.execute(
+            f"SELECT MAX(id), {f'MAX({column})' if column else 'NULL'} FROM {schema}.{_quote(table)}"
+        ).fetchone()
+        marks[table] = {"last_id": last_id or 0, "updated_at": updated_at}
+    return marks
+
+class _ArchiveWriter:
+    """Compresser puis chiffrer un flux par blocs de `chunk_size` octets."""
+
+    def __init__(self, f, header: bytes, key: bytes, chunk_size: int, level: int):
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+        self._f = f
+        self._aead = AESGCM(key)
+        self._digest = hashlib.sha256(header).digest()
+        self._compressor = zlib.compressobj(level)
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+        self._index = 0
+        f.write(header)
+        self.archive_bytes = len(header)
+
+    def _seal(self, data: bytes, last: bool) -> None:
+        nonce = os.urandom(NONCE_SIZE)
+        sealed = nonce + self._aead.encrypt(nonce, data, self._digest + CHUNK_AAD.pack(self._index, last))
+        self._f.write(CHUNK_LENGTH.pack(len(sealed)))
+        self._f.write(sealed)
+        self._index += 1
+        self.archive_bytes += CHUNK_LENGTH.size + len(sealed)
+
+    def write(self, data: bytes) -> None:
+        self._buffer += self._compressor.compress(data)
+        # Le dernier bloc est scellé par close() avec son marqueur de fin
+        while len(self._buffer) > self._chunk_size:
+            self._seal(bytes(self._buffer[:self._chunk_size]), False)
+            del self._buffer[:self._chunk_size]
+
+    def close(self) -> None:
+        self._buffer += self._compressor.flush()
+        while len(self._buffer) > self._chunk_size:
+            self._seal(bytes(self._buffer[:self._chunk_size]), False)
+            del self._buffer[:self._chunk_size]
+        self._seal(bytes(self._buffer), True)
+        self._buffer.clear()
+
+def read_manifest(path: str) -> Tuple[Dict[str, Any], bytes, bytes]:
+    """Lire l'en-tête d'une archive : (manifeste, clé enveloppée, en-tête brut)."""
+    with open(path, "rb") as f:
+        prefix = f.read(ARCHIVE_PREFIX.size)
+        if len(prefix) < ARCHIVE_PREFIX.size:
+            raise ValueError(f"{path} n'est pas une archive de sauvegarde")
+        magic, version, manifest_length, key_length = ARCHIVE_PREFIX.unpack(prefix)
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            raise ValueError(f"{path} n'est pas une archive de sauvegarde (version {version})")
+        manifest_bytes = f.read(manifest_length)
+        wrapped_key = f.read(key_length)
+    if len(manifest_bytes) != manifest_length or len(wrapped_key) != key_length:
+        raise ValueError(f"Archive {path} tronquée")
+    return json.loads(manifest_bytes), wrapped_key, prefix + manifest_bytes + wrapped_key
+
+def _iter_plaintext(path: str) -> Iterator[bytes]:
+    """Déchiffrer et décompresser une archive bloc par bloc."""
+    from cryptography.exceptions import InvalidTag
+    from cryptography.fernet import InvalidToken
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+    _, wrapped_key, header = read_manifest(path)
+    try:
+        aead = AESGCM(unwrap_data_key(wrapped_key))
+    except InvalidToken:
+        raise ValueError(f"La clé principale ne permet pas d'ouvrir {path}") from None
+    digest = hashlib.sha256(header).digest()
+    decompressor = zlib.decompressobj()
+    with open(path, "rb") as f:
+        f.seek(len(header))
+        length = f.read(CHUNK_LENGTH.size)
+        index = 0
+        while length:
+            sealed = f.read(CHUNK_LENGTH.unpack(length)[0])
+            length = f.read(CHUNK_LENGTH.size)
+            last = not length
+            try:
+                data = aead.decrypt(sealed[:NONCE_SIZE], sealed[NONCE_SIZE:], digest + CHUNK_AAD.pack(index, last))
+            except (InvalidTag, ValueError):
+                raise ValueError(f"Archive {path} altérée ou tronquée (bloc {index})") from None
+            index += 1
+            yield decompressor.decompress(data)
+    if not decompressor.eof:
+        raise ValueError(f"Archive {path} incomplète")
+    yield decompressor.flush()
+
+def _write_archive(source_path: str, directory: str, manifest: Dict[str, Any]) -> Tuple[str, int]:
+    """Compresser et chiffrer un fichier SQLite dans une nouvelle archive. Retourne (chemin, octets)."""
+    key = generate_data_key()
+    wrapped_key = wrap_data_key(key)
+    manifest_bytes = json.dumps(manifest, sort_keys=True).encode("utf-8")
+    header = ARCHIVE_PREFIX.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, len(manifest_bytes), len(wrapped_key))
+    header += manifest_bytes + wrapped_key
+
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime(manifest["created_at"]))
+    path = os.path.join(directory, f"vault-{stamp}-{manifest['kind']}-{manifest['backup_id'][:8]}{ARCHIVE_EXTENSION}")
+    tmp_path = f"{path}.tmp"
+    try:
+        with _write_private(tmp_path) as f, open(source_path, "rb") as source:
+            writer = _ArchiveWriter(f, header, key, Config.BACKUP_CHUNK_SIZE, Config.BACKUP_COMPRESSION_LEVEL)
+            for block in iter(lambda: source.read(Config.BACKUP_CHUNK_SIZE), b""):
+                writer.write(block)
+            writer.close()
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        _remove(tmp_path)
+        raise
+    return path, writer.archive_bytes
+
+def _new_manifest(kind: str, conn: sqlite3.Connection, schema: str, base: Optional[Dict[str, Any]] = None):
+    from key_rotation import key_fingerprint
+
+    schema_version = conn.execute(f"SELECT MAX(version) FROM {schema}.schema_version").fetchone()[0] or 0
+    return {
+        "kind": kind,
+        "backup_id": uuid.uuid4().hex,
+        "base_id": base["backup_id"] if base else None,
+        "created_at": time.time(),
+        "schema_version": schema_version,
+        "key_fingerprint": key_fingerprint(Config.get_encryption_key()),
+    }
+
+def _check_backend() -> None:
+    if Config.STORAGE_BACKEND == "memory":
+        raise RuntimeError("Le moteur de stockage \"memory\" n'a pas de base à sauvegarder")
+
+def _report(manifest: Dict[str, Any], path: str, db_bytes: int, archive_bytes: int, rows: int,
+            seconds: float) -> Dict[str, Any]:
+    stats = {
+        "kind": manifest["kind"], "backup_id": manifest["backup_id"], "path": path, "rows": rows,
+        "db_bytes": db_bytes, "archive_bytes": archive_bytes, "seconds": seconds,
+        "mb_per_sec": db_bytes / seconds / 1e6 if seconds else 0.0,
+    }
+    logger.info(
+        f"Sauvegarde {manifest['kind']} {path}: {rows} lignes, {db_bytes} -> {archive_bytes} octets "
+        f"en {seconds:.2f} s ({stats['mb_per_sec']:.0f} Mo/s)"
+    )
+    return stats
+
+def backup_full(directory: Optional[str] = None) -> Dict[str, Any]:
+    """Sauvegarder toute la base dans une archive chiffrée et retourner les statistiques."""
+    _check_backend()
+    directory = directory or Config.BACKUP_DIR
+    os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    snapshot_path = _temp_path(directory, ".db")
+    try:
+        source = _connect(Config.DATABASE_PATH)
+        target = _connect(snapshot_path)
+        try:
+            # Une seule étape : copiée par pas, la sauvegarde recommencerait à
+            # chaque écriture concurrente. En WAL, la lecture ne bloque pas les écrivains.
+            source.backup(target)
+            manifest = _new_manifest("full", target, "main")
+            manifest["watermarks"] = _watermarks(target, "main")
+            rows = target.execute("SELECT COUNT(*) FROM passwords").fetchone()[0]
+        finally:
+            source.close()
+            target.close()
+        db_bytes = os.path.getsize(snapshot_path)
+        path, archive_bytes = _write_archive(snapshot_path, directory, manifest)
+    finally:
+        _remove(snapshot_path)
+    return _report(manifest, path, db_bytes, archive_bytes, rows, time.perf_counter() - start)
+
+def list_archives(directory: Optional[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """Archives d'un répertoire, de la plus ancienne à la plus récente."""
+    archives = []
+    for path in glob.glob(os.path.join(directory or Config.BACKUP_DIR, f"*{ARCHIVE_EXTENSION}")):
+        try:
+            archives.append((path, read_manifest(path)[0]))
+        except ValueError as e:
+            logger.warning(f"Archive ignorée: {e}")
+    return sorted(archives, key=lambda item: item[1]["created_at"])
+
+def backup_incremental(directory: Optional[str] = None, base_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Sauvegarder les changements depuis l'archive `base_path` (par défaut la plus
+    récente du répertoire), qui peut elle-même être incrémentale.
+    """
+    _check_backend()
+    directory = directory or Config.BACKUP_DIR
+    if base_path is not None:
+        base = read_manifest(base_path)[0]
+    else:
+        archives = list_archives(directory)
+        if not archives:
+            raise RuntimeError(f"Aucune archive dans {directory}: commencez par une sauvegarde complète")
+        base = archives[-1][1]
+    start = time.perf_counter()
+    snapshot_path = _temp_path(directory, ".db")
+    try:
+        conn = _connect(snapshot_path)
+        try:
+            conn.execute("ATTACH DATABASE ? AS src", (Config.DATABASE_PATH,))
+            # Toutes les lectures de src se font dans le même instantané
+            conn.execute("BEGIN")
+            manifest = _new_manifest("incremental", conn, "src", base)
+            manifest["watermarks"] = _watermarks(conn, "src")
+            manifest["tables"] = []
+            rows = 0
+            for table in _copied_tables(conn, "src"):
+                quoted = _quote(table)
+                if table in TRACKED_TABLES:
+                    # Un seul écrivain à la fois : une modification absente de
+                    # l'archive précédente a une date >= sa plus récente, d'où le >=
+                    mark = base["watermarks"].get(table, {"last_id": 0, "updated_at": None})
+                    column = TRACKED_TABLES[table]
+                    if column is None:
+                        conn.execute(
+                            f"CREATE TABLE main.{quoted} AS SELECT * FROM src.{quoted} WHERE id > ?",
+                            (mark["last_id"],)
+                        )
+                    else:
+                        conn.execute(
+                            f"CREATE TABLE main.{quoted} AS SELECT * FROM src.{quoted} WHERE id > ? OR {column} >= ?",
+                            (mark["last_id"], mark["updated_at"] or "")
+                        )
+                        conn.execute(
+                            f"CREATE TABLE main.{_quote(table + IDS_SUFFIX)} AS SELECT id FROM src.{quoted}"
+                        )
+                    rows += conn.execute(f"SELECT COUNT(*) FROM main.{quoted}").fetchone()[0]
+                else:
+                    conn.execute(f"CREATE TABLE main.{quoted} AS SELECT * FROM src.{quoted}")
+                manifest["tables"].append(table)
+            conn.execute(f"CREATE TABLE main.{SEQUENCE_TABLE} AS SELECT name, seq FROM src.sqlite_sequence")
+            conn.execute("COMMIT")
+            conn.execute("DETACH DATABASE src")
+        finally:
+            conn.close()
+        db_bytes = os.path.getsize(snapshot_path)
+        path, archive_bytes = _write_archive(snapshot_path, directory, manifest)
+    finally:
+        _remove(snapshot_path)
+    return _report(manifest, path, db_bytes, archive_bytes, rows, time.perf_counter() - start)
+
+def resolve_chain(path: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """Archives à appliquer pour restaurer `path` : la complète puis les incrémentales dans l'ordre."""
+    manifest = read_manifest(path)[0]
+    by_id = {entry["backup_id"]: (archive, entry) for archive, entry in list_archives(os.path.dirname(path) or ".")}
+    chain = [(path, manifest)]
+    while manifest["kind"] != "full":
+        if manifest["base_id"] not in by_id:
+            raise ValueError(f"Archive de base {manifest['base_id']} introuvable à côté de {path}")
+        path, manifest = by_id[manifest["base_id"]]
+        chain.append((path, manifest))
+    return chain[::-1]
+
+def _extract(path: str, target_path: str) -> int:
+    """Déchiffrer une archive dans un fichier SQLite. Retourne le nombre d'octets écrits."""
+    written = 0
+    with _write_private(target_path) as f:
+        for block in _iter_plaintext(path):
+            f.write(block)
+            written += len(block)
+    return written
+
+def _apply_incremental(conn: sqlite3.Connection, increment_path: str, manifest: Dict[str, Any]) -> int:
+    """Appliquer une incrémentale sur la base restaurée. Retourne le nombre de lignes suivies appliquées."""
+    from migrations import apply_migrations, get_schema_version
+
+    if get_schema_version(conn) < manifest["schema_version"]:
+        # Les tables ajoutées depuis l'archive de base doivent exister
+        apply_migrations(conn)
+    conn.execute("ATTACH DATABASE ? AS inc", (increment_path,))
+    applied = 0
+    try:
+        conn.execute("BEGIN")
+        for table in manifest["tables"]:
+            quoted = _quote(table)
+            columns = _columns(conn, "inc", table)
+            column_list = ", ".join(_quote(column) for column in columns)
+            if table in TRACKED_TABLES and TRACKED_TABLES[table] is None:
+                cursor = conn.execute(
+                    f"INSERT INTO main.{quoted} ({column_list}) SELECT {column_list} FROM inc.{quoted} WHERE true "
+                    f"ON CONFLICT (id) DO NOTHING"
+                )
+                applied += cursor.rowcount
+            elif table in TRACKED_TABLES:
+                conn.execute(
+                    f"DELETE FROM main.{quoted} WHERE id NOT IN (SELECT id FROM inc.{_quote(table + IDS_SUFFIX)})"
+                )
+                # Mise à jour plutôt que REPLACE : les déclencheurs FTS5 suivent
+                assignments = ", ".join(f"{_quote(c)} = excluded.{_quote(c)}" for c in columns if c != "id")
+                cursor = conn.execute(
+                    f"INSERT INTO main.{quoted} ({column_list}) SELECT {column_list} FROM inc.{quoted} WHERE true "
+                    f"ON CONFLICT (id) DO UPDATE SET {assignments}"
+                )
+                applied += cursor.rowcount
+            else:
+                conn.execute(f"DELETE FROM main.{quoted}")
+                conn.execute(f"INSERT INTO main.{quoted} ({column_list}) SELECT {column_list} FROM inc.{quoted}")
+        conn.execute("DELETE FROM main.sqlite_sequence")
+        conn.execute(f"INSERT INTO main.sqlite_sequence (name, seq) SELECT name, seq FROM inc.{SEQUENCE_TABLE}")
+        conn.execute("COMMIT")
+    except sqlite3.Error:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.execute("DETACH DATABASE inc")
+    return applied
+
+def restore(path: str, target: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Restaurer l'archive `path` (et, si elle est incrémentale, sa chaîne) dans
+    `target`, par défaut la base configurée. La base est reconstituée et vérifiée
+    à côté de la cible, puis copiée dans la cible avec l'API de sauvegarde.
+    """
+    target = target or Config.DATABASE_PATH
+    chain = resolve_chain(path)
+    start = time.perf_counter()
+    directory = os.path.dirname(os.path.abspath(target))
+    restored_path = _temp_path(directory, ".db")
+    increment_path = _temp_path(directory, ".db")
+    archive_bytes = sum(os.path.getsize(archive) for archive, _ in chain)
+    try:
+        _extract(chain[0][0], restored_path)
+        conn = _connect(restored_path)
+        try:
+            for archive, manifest in chain[1:]:
+                _extract(archive, increment_path)
+                applied = _apply_incremental(conn, increment_path, manifest)
+                logger.debug(f"{archive}: {applied} entrées appliquées")
+                _remove(increment_path)
+            result = conn.execute("PRAGMA quick_check").fetchone()[0]
+            if result != "ok":
+                raise ValueError(f"Base restaurée incohérente: {result}")
+            rows = conn.execute("SELECT COUNT(*) FROM passwords").fetchone()[0]
+            destination = _connect(target)
+            try:
+                conn.backup(destination)
+            finally:
+                destination.close()
+        finally:
+            conn.close()
+        db_bytes = os.path.getsize(restored_path)
+    finally:
+        _remove(restored_path, increment_path)
+
+    from data_keys import reset_user_ciphers
+    reset_user_ciphers()
+    seconds = time.perf_counter() - start
+    stats = {
+        "archives": len(chain), "target": target, "rows": rows, "db_bytes": db_bytes,
+        "archive_bytes": archive_bytes, "seconds": seconds,
+        "mb_per_sec": db_bytes / seconds / 1e6 if seconds else 0.0,
+    }
+    logger.info(
+        f"Restauration de {path} ({len(chain)} archive(s)) dans {target}: {db_bytes} octets "
+        f"en {seconds:.2f} s ({stats['mb_per_sec']:.0f} Mo/s)"
+    )
+    return stats
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sauvegardes chiffrées du coffre")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    full = subparsers.add_parser("full", help="Sauvegarde complète")
+    full.add_argument("--dir", default=None, help="Répertoire des archives")
+    incremental = subparsers.add_parser("incremental", help="Changements depuis la dernière archive")
+    incremental.add_argument("--dir", default=None, help="Répertoire des archives")
+    incremental.add_argument("--base", default=None, help="Archive de référence (par défaut la plus récente)")
+    restore_parser = subparsers.add_parser("restore", help="Restaurer une archive et sa chaîne")
+    restore_parser.add_argument("archive")
+    restore_parser.add_argument("--target", default=None, help="Base à écrire (par défaut la base configurée)")
+    list_parser = subparsers.add_parser("list", help="Lister les archives")
+    list_parser.add_argument("--dir", default=None, help="Répertoire des archives")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for path, manifest in list_archives(args.dir):
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(manifest["created_at"]))
+            base = f" (base {manifest['base_id'][:8]})" if manifest["base_id"] else ""
+            print(f"{created}  {manifest['kind']:<11} {manifest['backup_id'][:8]}{base}  "
+                  f"{os.path.getsize(path) / 1e6:8.1f} Mo  {path}")
+        return 0
+
+    # Import tardif : main.py configure la journalisation au chargement
+    from main import PasswordManager
+    PasswordManager()
+    try:
+        if args.command == "restore":
+            stats = restore(args.archive, args.target)
+            print(f"{stats['archives']} archive(s) restaurée(s) dans {stats['target']}: {stats['rows']} lignes, "
+                  f"{stats['db_bytes'] / 1e6:.1f} Mo en {stats['seconds']:.2f} s ({stats['mb_per_sec']:.0f} Mo/s)")
+            return 0
+        if args.command == "full":
+            stats = backup_full(args.dir)
+        else:
+            stats = backup_incremental(args.dir, args.base)
+    except (RuntimeError, ValueError, sqlite3.Error) as e:
+        print(f"Erreur: {e}")
+        return 1
+    print(f"{stats['path']}: {stats['rows']} lignes, {stats['db_bytes'] / 1e6:.1f} Mo -> "
+          f"{stats['archive_bytes'] / 1e6:.1f} Mo en {stats['seconds']:.2f} s ({stats['mb_per_sec']:.0f} Mo/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
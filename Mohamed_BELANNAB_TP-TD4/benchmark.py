@@ -0,0 +1,237 @@
+# benchmark.py
+"""
+Banc d'essai reproductible des chemins critiques du gestionnaire de mots de passe.
+
+Exemples :
+    python benchmark.py --output results.json
+    python benchmark.py --sizes 1000,100000 --save-baseline baseline.json
+    python benchmark.py --baseline baseline.json --threshold 0.2
+    python benchmark.py --backend memory        # sans SQLite, pour isoler le coût applicatif
+
+Tout s'exécute dans un répertoire temporaire (base, clé et journaux),
+sans toucher à passwords.db.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Any
+
+def summarize(durations: List[float], wall_time: float = None) -> Dict[str, float]:
+    """Calculer les percentiles (en millisecondes) et le débit d'une série de mesures."""
+    ordered = sorted(durations)
+    count = len(ordered)
+
+    def percentile(p):
+        return ordered[min(count - 1, int(round(p / 100 * (count - 1))))] * 1000
+
+    total = wall_time if wall_time is not None else sum(ordered)
+    return {
+        "count": count,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "min_ms": ordered[0] * 1000,
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p99_ms": percentile(99),
+        "max_ms": ordered[-1] * 1000,
+        "ops_per_sec": count / total if total else 0.0,
+    }
+
+def measure(func: Callable, iterations: int) -> Dict[str, float]:
+    """Appeler `func(i)` `iterations` fois et résumer les durées."""
+    durations = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        func(i)
+        durations.append(time.perf_counter() - start)
+    return summarize(durations)
+
+def prefill_vault(storage, user_id: int, size: int, encrypted_password: bytes, chunk_size: int = 10000) -> None:
+    """Remplir rapidement un coffre avec `size` entrées (un seul chiffrement réutilisé)."""
+    for start in range(0, size, chunk_size):
+        end = min(size, start + chunk_size)
+        storage.add_passwords_bulk(user_id, [
+            (f"site-{i}.example.com", f"user{i}", encrypted_password, None) for i in range(start, end)
+        ])
+
+def run_benchmarks(sizes: List[int], iterations: int, auth_iterations: int,
+                   concurrency: List[int]) -> Dict[str, Any]:
+    """Exécuter tous les scénarios et retourner les résultats indexés par nom."""
+    # Imports tardifs : le répertoire de travail temporaire doit être actif
+    from main import PasswordManager
+    from security import hash_password
+    from data_keys import get_user_cipher
+
+    results = {}
+    manager = PasswordManager()
+    password = "Bench#Passw0rd"
+    rng = random.Random(42)
+
+    results["register"] = measure(
+        lambda i: manager.register_user(f"bench_register_{i}", f"register{i}@example.com", password),
+        auth_iterations
+    )
+    results["login"] = measure(lambda i: manager.login_user("bench_register_0", password), auth_iterations)
+
+    token = manager.login_user("bench_register_0", password)
+    results["store"] = measure(
+        lambda i: manager.store_password(token, f"store-{i}.example.com", "bench", "S3cret!", ""),
+        iterations
+    )
+
+    password_hash = hash_password(password)
+    for size in sizes:
+        username = f"bench_vault_{size}"
+        user_id = manager.storage.add_user(username, password_hash, f"{username}@example.com")
+        start = time.perf_counter()
+        encrypted = get_user_cipher(user_id, manager.storage).encrypt("S3cret!")
+        prefill_vault(manager.storage, user_id, size, encrypted)
+        logging.getLogger(__name__).warning(
+            f"Coffre de {size} entrées prérempli en {time.perf_counter() - start:.1f} s"
+        )
+
+        vault_token = manager.login_user(username, password)
+        ids = [row["id"] for row in manager.retrieve_passwords(vault_token, limit=min(size, 10000))]
+        results[f"list_page_{size}"] = measure(
+            lambda i: manager.retrieve_passwords(vault_token, after_id=rng.choice(ids), limit=50),
+            iterations
+        )
+        results[f"retrieve_{size}"] = measure(
+            lambda i: manager.retrieve_password(vault_token, rng.choice(ids)),
+            iterations
+        )
+        results[f"search_{size}"] = measure(
+            lambda i: manager.search_passwords(vault_token, f"site-{rng.randrange(size)}"),
+            iterations
+        )
+
+        for threads in concurrency:
+            tokens = [manager.login_user(username, password) for _ in range(threads)]
+            durations = []
+            lock = threading.Lock()
+
+            def worker(session_token):
+                local_rng = random.Random(session_token)
+                local = []
+                for _ in range(iterations):
+                    op_start = time.perf_counter()
+                    manager.retrieve_password(session_token, local_rng.choice(ids))
+                    local.append(time.perf_counter() - op_start)
+                with lock:
+                    durations.extend(local)
+
+            workers = [threading.Thread(target=worker, args=(t,)) for t in tokens]
+            wall_start = time.perf_counter()
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            results[f"concurrent_retrieve_{size}_x{threads}"] = summarize(
+                durations, time.perf_counter() - wall_start
+            )
+
+    return results
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Lister les scénarios dont le p50 dépasse celui de la référence de plus de `threshold`."""
+    regressions = []
+    for name, stats in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        ratio = stats["p50_ms"] / reference["p50_ms"] if reference["p50_ms"] else 1.0
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: p50 {stats['p50_ms']:.3f} ms contre {reference['p50_ms']:.3f} ms (x{ratio:.2f})"
+            )
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai du gestionnaire de mots de passe")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="Tailles de coffre, séparées par des virgules")
+    parser.add_argument("--iterations", type=int, default=500, help="Itérations par scénario rapide")
+    parser.add_argument("--auth-iterations", type=int, default=10, help="Itérations pour register/login (bcrypt)")
+    parser.add_argument("--concurrency", default="1,4,16", help="Nombres de sessions simultanées")
+    parser.add_argument("--backend", choices=["sqlite", "memory", "cached"], default=None,
+                        help="Moteur de stockage (défaut: Config.STORAGE_BACKEND)")
+    parser.add_argument("--bcrypt-rounds", type=int, default=None, help="Coût bcrypt (défaut: Config)")
+    parser.add_argument("--output", help="Écrire les résultats JSON dans ce fichier")
+    parser.add_argument("--baseline", help="Fichier de résultats de référence à comparer")
+    parser.add_argument("--save-baseline", help="Enregistrer les résultats comme nouvelle référence")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Régression tolérée sur le p50 (0.2 = 20 %%)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    concurrency = [int(n) for n in args.concurrency.split(",") if n]
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    output_paths = [os.path.abspath(path) for path in (args.output, args.save_baseline) if path]
+
+    original_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="pm-bench-") as workdir:
+        os.chdir(workdir)
+        try:
+            from config import Config
+
+            Config.DATABASE_PATH = os.path.join(workdir, "bench.db")
+            if args.backend:
+                Config.STORAGE_BACKEND = args.backend
+            if args.bcrypt_rounds:
+                Config.BCRYPT_ROUNDS = args.bcrypt_rounds
+            # Le banc d'essai enchaîne les connexions sur un même compte : pas de limitation
+            Config.LOGIN_USER_BURST = Config.LOGIN_SOURCE_BURST = float("inf")
+            started = time.time()
+            results = run_benchmarks(sizes, args.iterations, args.auth_iterations, concurrency)
+
+            import audit
+            from storage import get_backend
+            # Le thread d'audit écrit ses derniers lots avant la fermeture de la base
+            audit.get_audit_log().close()
+            get_backend().close()
+        finally:
+            # Quitter le répertoire avant sa suppression
+            os.chdir(original_cwd)
+
+    report = {
+        "meta": {
+            "started_at": started,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "bcrypt_rounds": Config.BCRYPT_ROUNDS,
+            "storage_backend": Config.STORAGE_BACKEND,
+            "sizes": sizes,
+            "iterations": args.iterations,
+        },
+        "results": results,
+    }
+    for path in output_paths:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    for name, stats in results.items():
+        print(f"{name:<34} p50 {stats['p50_ms']:9.3f} ms  p99 {stats['p99_ms']:9.3f} ms  "
+              f"{stats['ops_per_sec']:10.1f} op/s")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\nRégressions détectées :")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nAucune régression par rapport à la référence.")
+    return 0
+
+if __name__ == "__main__":
+    # Les journaux INFO par appel fausseraient l'affichage ; seuls les avertissements restent visibles
+    logging.disable(logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,219 @@
+# breach_index.py
+"""
+Liste locale de mots de passe divulgués, consultée sans accès réseau.
+
+    python breach_index.py build corpus.txt                      # un mot de passe par ligne
+    python breach_index.py build pwned-passwords-sha1.txt --format sha1   # lignes HASH:compte
+    python breach_index.py check                                 # tester un mot de passe
+
+Format de l'index : les 8 premiers octets du SHA-1 de chaque mot de passe,
+triés et dédoublonnés, précédés d'une table de répartition sur les 16 premiers
+bits. Le fichier est projeté en mémoire (mmap) : une recherche lit la table
+puis fait une recherche dichotomique dans un seul compartiment, sans charger
+l'index. Avec des empreintes de 64 bits, le taux de faux positifs reste
+négligeable même pour des centaines de millions d'entrées.
+"""
+import argparse
+import getpass
+import hashlib
+import heapq
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from typing import Iterator, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PMBREACH"
+VERSION = 1
+FANOUT_BITS = 16
+HEADER = struct.Struct(">8sIIQ")  # magic, version, bits de répartition, nombre d'empreintes
+FANOUT = struct.Struct(f">{(1 << FANOUT_BITS) + 1}Q")
+RECORD = struct.Struct(">Q")
+DATA_OFFSET = HEADER.size + FANOUT.size
+
+def password_fingerprint(password: str) -> int:
+    """Empreinte 64 bits d'un mot de passe (début de son SHA-1)."""
+    return RECORD.unpack_from(hashlib.sha1(password.encode("utf-8", "surrogatepass")).digest())[0]
+
+class BreachIndex:
+    """Index projeté en mémoire ; `password in index` prend quelques microsecondes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, fanout_bits, self.count = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION or fanout_bits != FANOUT_BITS:
+            self._mmap.close()
+            raise ValueError(f"Fichier d'index de mots de passe divulgués invalide: {path}")
+        if len(self._mmap) != DATA_OFFSET + self.count * RECORD.size:
+            self._mmap.close()
+            raise ValueError(f"Fichier d'index de mots de passe divulgués tronqué: {path}")
+
+    def contains_fingerprint(self, fingerprint: int) -> bool:
+        mm = self._mmap
+        bucket_offset = HEADER.size + (fingerprint >> (64 - FANOUT_BITS)) * RECORD.size
+        lo, hi = struct.unpack_from(">QQ", mm, bucket_offset)
+        unpack_from = RECORD.unpack_from
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = unpack_from(mm, DATA_OFFSET + mid * RECORD.size)[0]
+            if value < fingerprint:
+                lo = mid + 1
+            elif value > fingerprint:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def __contains__(self, password: str) -> bool:
+        return self.contains_fingerprint(password_fingerprint(password))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self._mmap.close()
+
+def _iter_fingerprints(path: str, fmt: str) -> Iterator[int]:
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.rstrip(b"\r\n")
+            if not line:
+                continue
+            if fmt == "sha1":
+                # Format « Pwned Passwords » : SHA1 en hexadécimal, suivi éventuellement de :compte
+                try:
+                    yield int(line[:16], 16)
+                except ValueError:
+                    continue
+            else:
+                yield RECORD.unpack_from(hashlib.sha1(line).digest())[0]
+
+def _write_run(fingerprints, directory: str) -> str:
+    fd, path = tempfile.mkstemp(suffix=".run", dir=directory)
+    with os.fdopen(fd, "wb") as f:
+        f.write(b"".join(RECORD.pack(value) for value in fingerprints))
+    return path
+
+def _read_run(path: str, read_size: int = 1 << 16) -> Iterator[int]:
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(read_size * RECORD.size)
+            if not block:
+                break
+            yield from (value for (value,) in RECORD.iter_unpack(block))
+
+def build_index(source: str, output: str, fmt: str = "plain", chunk_size: int = 1_000_000) -> int:
+    """
+    Construire l'index à partir d'un corpus. Tri externe : des blocs de
+    `chunk_size` empreintes sont triés puis fusionnés, la mémoire reste bornée
+    quel que soit le corpus. Retourne le nombre d'empreintes distinctes.
+    """
+    start_time = time.perf_counter()
+    directory = os.path.dirname(os.path.abspath(output))
+    runs = []
+    try:
+        chunk = []
+        for fingerprint in _iter_fingerprints(source, fmt):
+            chunk.append(fingerprint)
+            if len(chunk) >= chunk_size:
+                chunk.sort()
+                runs.append(_write_run(chunk, directory))
+                chunk = []
+        if chunk:
+            chunk.sort()
+            runs.append(_write_run(chunk, directory))
+
+        fanout = [0] * ((1 << FANOUT_BITS) + 1)
+        count, previous = 0, None
+        tmp_output = f"{output}.tmp"
+        with open(tmp_output, "wb") as f:
+            # En-tête et table réécrits une fois le nombre d'empreintes connu
+            f.write(bytes(DATA_OFFSET))
+            buffer = []
+            for fingerprint in heapq.merge(*(_read_run(path) for path in runs)):
+                if fingerprint == previous:
+                    continue
+                previous = fingerprint
+                fanout[(fingerprint >> (64 - FANOUT_BITS)) + 1] += 1
+                buffer.append(fingerprint)
+                count += 1
+                if len(buffer) >= 65536:
+                    f.write(b"".join(RECORD.pack(value) for value in buffer))
+                    buffer = []
+            f.write(b"".join(RECORD.pack(value) for value in buffer))
+            for bucket in range(1, len(fanout)):
+                fanout[bucket] += fanout[bucket - 1]
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, FANOUT_BITS, count))
+            f.write(FANOUT.pack(*fanout))
+        os.replace(tmp_output, output)
+    finally:
+        for path in runs:
+            os.remove(path)
+
+    logger.info(f"Index de mots de passe divulgués construit: {count} empreintes en {time.perf_counter() - start_time:.1f} s")
+    return count
+
+_breach_index = None
+_breach_index_loaded = False
+_breach_index_lock = threading.Lock()
+
+def get_breach_index() -> Optional[BreachIndex]:
+    """Index configuré (Config.BREACHED_PASSWORDS_INDEX_PATH), ou None s'il n'a pas été construit."""
+    global _breach_index, _breach_index_loaded
+    if not _breach_index_loaded:
+        with _breach_index_lock:
+            if not _breach_index_loaded:
+                path = Config.BREACHED_PASSWORDS_INDEX_PATH
+                if path and os.path.exists(path):
+                    _breach_index = BreachIndex(path)
+                    logger.debug(f"Index de mots de passe divulgués chargé: {len(_breach_index)} empreintes")
+                else:
+                    logger.debug("Aucun index de mots de passe divulgués: vérification désactivée")
+                _breach_index_loaded = True
+    return _breach_index
+
+def is_breached(password: str) -> bool:
+    """Indiquer si un mot de passe figure dans l'index local (False si aucun index)."""
+    index = get_breach_index()
+    return index is not None and password in index
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Index local de mots de passe divulgués")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Construire l'index à partir d'un corpus")
+    build.add_argument("source", help="Fichier texte : un mot de passe ou un SHA-1 par ligne")
+    build.add_argument("--format", choices=["plain", "sha1"], default="plain")
+    build.add_argument("--output", default=Config.BREACHED_PASSWORDS_INDEX_PATH)
+    build.add_argument("--chunk-size", type=int, default=1_000_000, help="Empreintes triées en mémoire par bloc")
+    subparsers.add_parser("check", help="Vérifier un mot de passe saisi au clavier")
+    args = parser.parse_args(argv)
+
+    from logging_config import setup_logging
+    setup_logging(Config.LOGGING_CONFIG_PATH)
+    if args.command == "build":
+        count = build_index(args.source, args.output, args.format, args.chunk_size)
+        print(f"{count} empreintes écrites dans {args.output}")
+        return 0
+
+    if get_breach_index() is None:
+        print(f"Aucun index trouvé ({Config.BREACHED_PASSWORDS_INDEX_PATH}); lancez d'abord `build`")
+        return 2
+    if is_breached(getpass.getpass("Mot de passe: ")):
+        print("Ce mot de passe figure dans la liste des mots de passe divulgués.")
+        return 1
+    print("Mot de passe absent de la liste.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+# bulk_transfer.py
+import argparse
+import csv
+import getpass
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Dict, Any, List, Optional
+
+from pydantic import ValidationError
+
+from models import PasswordEntry
+from storage import get_backend
+from data_keys import get_user_cipher
+from security import encrypt_passwords, decrypt_passwords
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ["site_name", "username", "password", "notes"]
+DEFAULT_CHUNK_SIZE = 1000
+EXPORT_COLUMNS = ("id", "site_name", "username", "encrypted_password", "notes")
+
+def detect_format(path: str) -> str:
+    """Déduire le format (csv, json ou jsonl) à partir de l'extension du fichier."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if extension == ".json":
+        return "json"
+    raise ValueError(f"Format de fichier non reconnu: {path}")
+
+def _iter_json_array(f, read_size: int = 65536) -> Iterator[Dict[str, Any]]:
+    """Lire un tableau JSON objet par objet, sans charger tout le fichier."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    eof = False
+    while True:
+        buffer = buffer.lstrip(" \t\r\n,")
+        if not started and buffer:
+            if buffer[0] != "[":
+                raise ValueError("Le fichier JSON doit contenir un tableau d'objets")
+            buffer = buffer[1:].lstrip(" \t\r\n")
+            started = True
+        if started and buffer.startswith("]"):
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                if buffer:
+                    raise ValueError("Fichier JSON tronqué ou invalide")
+                return
+            chunk = f.read(read_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        if started:
+            yield obj
+        buffer = buffer[end:]
+
+class InvalidRecord:
+    """Ligne JSONL illisible : produite à la place de l'entrée, puis rejetée et comptée à l'import."""
+
+    __slots__ = ("error",)
+
+    def __init__(self, error: str):
+        self.error = error
+
+def iter_records(path: str, fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Lire les entrées d'un fichier d'import une à une. Une ligne JSONL illisible
+    produit un InvalidRecord au lieu d'interrompre la lecture.
+    """
+    fmt = fmt or detect_format(path)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        elif fmt == "jsonl":
+            for line in f:
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        record = InvalidRecord(f"JSON invalide ({e.msg}, colonne {e.colno})")
+                    yield record
+        elif fmt == "json":
+            yield from _iter_json_array(f)
+        else:
+            raise ValueError(f"Format non supporté: {fmt}")
+
+def _chunks(iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def import_passwords(user_id: int, path: str, fmt: Optional[str] = None,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 0, storage=None) -> Dict[str, Any]:
+    """
+    Importer un fichier CSV/JSON/JSONL de mots de passe pour un utilisateur.
+    Chaque bloc est validé avec PasswordEntry, chiffré en lot puis inséré
+    dans une seule transaction. Les entrées invalides sont ignorées et comptées.
+    `storage` est le moteur de stockage (par défaut celui de la Config).
+    """
+    storage = storage or get_backend()
+    stats = {"imported": 0, "rejected": 0}
+    start_time = time.perf_counter()
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        line = 0
+        for chunk in _chunks(iter_records(path, fmt), chunk_size):
+            valid = []
+            for record in chunk:
+                line += 1
+                if isinstance(record, InvalidRecord):
+                    stats["rejected"] += 1
+                    logger.warning(f"Entrée {line} ignorée lors de l'import: {record.error}")
+                    continue
+                if not isinstance(record, dict):
+                    stats["rejected"] += 1
+                    logger.warning(f"Entrée {line} ignorée lors de l'import: objet attendu, {type(record).__name__} reçu")
+                    continue
+                try:
+                    valid.append(PasswordEntry(**{
+                        field: record[field] for field in FIELDS if record.get(field) not in (None, "")
+                    }))
+                except ValidationError as e:
+                    stats["rejected"] += 1
+                    logger.warning(f"Entrée {line} ignorée lors de l'import: {e.error_count()} erreur(s) de validation")
+                except TypeError as e:
+                    stats["rejected"] += 1
+                    logger.warning(f"Entrée {line} ignorée lors de l'import: {e}")
+            if not valid:
+                continue
+            encrypted = encrypt_passwords([entry.password for entry in valid], executor,
+                                          get_user_cipher(user_id, storage))
+            stats["imported"] += storage.add_passwords_bulk(
+                user_id,
+                [(entry.site_name, entry.username, token, entry.notes)
+                 for entry, token in zip(valid, encrypted)]
+            )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    stats["seconds"] = time.perf_counter() - start_time
+    stats["rows_per_sec"] = stats["imported"] / stats["seconds"] if stats["seconds"] else 0.0
+    logger.info(
+        f"Import terminé: {stats['imported']} entrées importées, {stats['rejected']} rejetées "
+        f"({stats['rows_per_sec']:.0f} lignes/s)"
+    )
+    return stats
+
+def export_passwords(user_id: int, path: str, fmt: Optional[str] = None,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 0, storage=None) -> Dict[str, Any]:
+    """
+    Exporter les mots de passe déchiffrés d'un utilisateur bloc par bloc.
+    Le fichier est créé avec les permissions 0600 puisqu'il contient des secrets en clair.
+    """
+    storage = storage or get_backend()
+    fmt = fmt or detect_format(path)
+    stats = {"exported": 0}
+    start_time = time.perf_counter()
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            writer = None
+            if fmt == "csv":
+                writer = csv.DictWriter(f, fieldnames=FIELDS)
+                writer.writeheader()
+            elif fmt == "json":
+                f.write("[")
+            elif fmt != "jsonl":
+                raise ValueError(f"Format non supporté: {fmt}")
+
+            for rows in storage.iter_passwords_by_user_id(user_id, chunk_size, EXPORT_COLUMNS):
+                tokens = [row["encrypted_password"] for row in rows]
+                decrypted = decrypt_passwords(tokens, executor, get_user_cipher(user_id, storage, tokens))
+                for row, password in zip(rows, decrypted):
+                    record = {
+                        "site_name": row["site_name"],
+                        "username": row["username"],
+                        "password": password,
+                        "notes": row["notes"],
+                    }
+                    if writer is not None:
+                        writer.writerow(record)
+                    elif fmt == "json":
+                        f.write(("," if stats["exported"] else "") + "\n" + json.dumps(record, ensure_ascii=False))
+                    else:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    stats["exported"] += 1
+
+            if fmt == "json":
+                f.write("\n]\n")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    stats["seconds"] = time.perf_counter() - start_time
+    stats["rows_per_sec"] = stats["exported"] / stats["seconds"] if stats["seconds"] else 0.0
+    logger.info(f"Export terminé: {stats['exported']} entrées ({stats['rows_per_sec']:.0f} lignes/s)")
+    return stats
+
+def main(argv=None):
+    """Point d'entrée en ligne de commande pour l'import et l'export en masse."""
+    parser = argparse.ArgumentParser(description="Import/export en masse de mots de passe")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("file", help="Fichier .csv, .json ou .jsonl")
+    parser.add_argument("--user", required=True, help="Nom d'utilisateur du coffre")
+    parser.add_argument("--format", choices=["csv", "json", "jsonl"], default=None)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=0, help="Processus de chiffrement (0 = aucun)")
+    args = parser.parse_args(argv)
+
+    # Import tardif : main.py configure la journalisation au chargement
+    from main import PasswordManager
+
+    password_manager = PasswordManager()
+    session_token = password_manager.login_user(args.user, getpass.getpass("Mot de passe: "))
+    if not session_token:
+        return 1
+
+    if args.action == "import":
+        stats = password_manager.import_passwords(session_token, args.file, args.format, args.chunk_size, args.workers)
+        print(f"{stats['imported']} entrées importées, {stats['rejected']} rejetées "
+              f"en {stats['seconds']:.2f} s ({stats['rows_per_sec']:.0f} lignes/s)")
+    else:
+        stats = password_manager.export_passwords(session_token, args.file, args.format, args.chunk_size, args.workers)
+        print(f"{stats['exported']} entrées exportées "
+              f"en {stats['seconds']:.2f} s ({stats['rows_per_sec']:.0f} lignes/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
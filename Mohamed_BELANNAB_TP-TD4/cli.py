@@ -0,0 +1,240 @@
+# cli.py
+"""
+Interface en ligne de commande non interactive, pour les scripts.
+
+    export PM_SESSION_TOKEN=$(python cli.py login --user alice --password-stdin <<< "$PW" | jq -r .token)
+    python cli.py add --site github.com --username alice --password-stdin <<< "$SECRET"
+    python cli.py list --all
+    python cli.py get 42
+    python cli.py search git --fuzzy
+    python cli.py update 42 --notes "compte pro"
+    python cli.py delete 42
+    python cli.py batch < operations.jsonl
+
+Chaque résultat est écrit sur la sortie standard en JSON, une ligne par objet ;
+les journaux et messages destinés aux humains partent sur la sortie d'erreur.
+"""
+import argparse
+import contextlib
+import getpass
+import json
+import logging
+import os
+import sys
+from typing import Dict, Any, Optional, TextIO
+
+TOKEN_ENV = "PM_SESSION_TOKEN"
+
+class CliError(Exception):
+    """Erreur remontée à l'utilisateur de la CLI avec un code de sortie non nul."""
+
+def _emit(out: TextIO, obj: Dict[str, Any]) -> None:
+    out.write(json.dumps(obj, ensure_ascii=False, default=str) + "\n")
+
+def _read_secret(args, prompt: str) -> str:
+    """Lire un secret sur l'entrée standard (--password-stdin) ou au clavier."""
+    if getattr(args, "password_stdin", False):
+        return sys.stdin.readline().rstrip("\n")
+    return getpass.getpass(prompt)
+
+def _resolve_token(manager, token: Optional[str]) -> str:
+    token = token or os.environ.get(TOKEN_ENV)
+    if not token:
+        raise CliError(f"Jeton de session requis (--token ou ${TOKEN_ENV}); lancez d'abord `login`")
+    if not manager.resume_session(token):
+        raise CliError("Session invalide ou expirée; reconnectez-vous avec `login`")
+    return token
+
+def _redirect_console_logs() -> None:
+    """Envoyer les journaux console sur stderr pour garder stdout en JSON pur."""
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler) and getattr(handler, "stream", None) is sys.stdout:
+            handler.setStream(sys.stderr)
+
+def run_operation(manager, token: Optional[str], op: Dict[str, Any], out: TextIO) -> bool:
+    """
+    Exécuter une opération décrite par un dictionnaire et écrire son résultat.
+    Utilisé à la fois par les sous-commandes et par le mode `batch`.
+    Retourne True si l'opération a réussi.
+    """
+    name = op.get("op")
+    if name == "add":
+        notes = op.get("notes")
+        ok = manager.store_password(
+            token, op.get("site_name", ""), op.get("username", ""), op.get("password", ""),
+            notes if notes is not None else ""
+        )
+        _emit(out, {"op": name, "ok": ok})
+        return ok
+    if name == "get":
+        entry = manager.retrieve_password(token, int(op["id"]))
+        _emit(out, {"op": name, "ok": entry is not None, "entry": entry})
+        return entry is not None
+    if name == "list":
+        columns = op.get("columns")
+        if op.get("all"):
+            for entry in manager.iter_passwords(token, columns=columns):
+                _emit(out, {"op": name, "entry": entry})
+        else:
+            page = manager.retrieve_passwords(token, int(op.get("after_id", 0)), int(op.get("limit", 50)), columns)
+            for entry in page:
+                _emit(out, {"op": name, "entry": entry})
+        return True
+    if name == "update":
+        ok = manager.update_password(token, int(op["id"]), op.get("site_name"), op.get("username"),
+                                     op.get("password"), op.get("notes"))
+        _emit(out, {"op": name, "ok": ok, "id": op["id"]})
+        return ok
+    if name == "delete":
+        ok = manager.delete_password(token, int(op["id"]))
+        _emit(out, {"op": name, "ok": ok, "id": op["id"]})
+        return ok
+    if name == "search":
+        results = manager.search_passwords(token, op.get("query", ""), op.get("limit"), bool(op.get("fuzzy")),
+                                           op.get("columns"))
+        for entry in results:
+            _emit(out, {"op": name, "entry": entry})
+        return True
+    if name == "import":
+        stats = manager.import_passwords(token, op["file"], op.get("format"))
+        _emit(out, {"op": name, "ok": True, **stats})
+        return True
+    if name == "export":
+        stats = manager.export_passwords(token, op["file"], op.get("format"))
+        _emit(out, {"op": name, "ok": True, **stats})
+        return True
+    _emit(out, {"op": name, "ok": False, "error": f"Opération inconnue: {name}"})
+    return False
+
+def run_batch(manager, token: str, lines, out: TextIO, atomic: bool = False) -> int:
+    """
+    Exécuter des opérations JSON (une par ligne) dans une seule transaction du stockage.
+    En mode `atomic`, la première erreur annule toute la transaction.
+    Retourne le nombre d'opérations en échec.
+    """
+    failures = 0
+    try:
+        with manager.storage.transaction():
+            for line_number, line in enumerate(lines, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    op = json.loads(line)
+                    if not isinstance(op, dict):
+                        raise TypeError(f"objet JSON attendu, {type(op).__name__} reçu")
+                    ok = run_operation(manager, token, op, out)
+                except (ValueError, KeyError, TypeError, AttributeError, PermissionError) as e:
+                    _emit(out, {"line": line_number, "ok": False, "error": str(e)})
+                    ok = False
+                if not ok:
+                    failures += 1
+                    if atomic:
+                        raise CliError(f"Échec de l'opération ligne {line_number}, transaction annulée")
+    except CliError as e:
+        _emit(out, {"op": "batch", "ok": False, "error": str(e)})
+    return failures
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Gestionnaire de mots de passe (CLI non interactive)")
+    parser.add_argument("--token", help=f"Jeton de session (par défaut ${TOKEN_ENV})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    login = subparsers.add_parser("login", help="Ouvrir une session et afficher son jeton")
+    login.add_argument("--user", required=True)
+    login.add_argument("--password-stdin", action="store_true")
+    login.add_argument("--ttl", type=float, default=None, help="Durée de validité en secondes")
+
+    subparsers.add_parser("logout", help="Fermer la session")
+
+    add = subparsers.add_parser("add", help="Stocker un mot de passe")
+    add.add_argument("--site", required=True)
+    add.add_argument("--username", required=True)
+    add.add_argument("--notes", default="")
+    add.add_argument("--password-stdin", action="store_true")
+
+    get = subparsers.add_parser("get", help="Afficher un mot de passe déchiffré")
+    get.add_argument("id", type=int)
+
+    update = subparsers.add_parser("update", help="Modifier une entrée (seuls les champs fournis changent)")
+    update.add_argument("id", type=int)
+    update.add_argument("--site")
+    update.add_argument("--username")
+    update.add_argument("--notes")
+    update.add_argument("--password-stdin", action="store_true", help="Lire le nouveau mot de passe sur stdin")
+
+    delete = subparsers.add_parser("delete", help="Supprimer une entrée")
+    delete.add_argument("id", type=int)
+
+    listing = subparsers.add_parser("list", help="Lister les entrées")
+    listing.add_argument("--after-id", type=int, default=0)
+    listing.add_argument("--limit", type=int, default=50)
+    listing.add_argument("--all", action="store_true", help="Parcourir tout le coffre page par page")
+    listing.add_argument("--columns", help="Colonnes séparées par des virgules")
+
+    search = subparsers.add_parser("search", help="Rechercher dans les sites, utilisateurs et notes")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=None)
+    search.add_argument("--fuzzy", action="store_true", help="Tolérer les fautes de frappe")
+    search.add_argument("--columns", help="Colonnes séparées par des virgules")
+
+    for name, help_text in (("import", "Importer un fichier CSV/JSON/JSONL"), ("export", "Exporter le coffre")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("file")
+        sub.add_argument("--format", choices=["csv", "json", "jsonl"], default=None)
+
+    batch = subparsers.add_parser("batch", help="Exécuter des opérations JSON lues sur stdin")
+    batch.add_argument("--atomic", action="store_true", help="Annuler toute la transaction à la première erreur")
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    out = sys.stdout
+
+    # Import tardif : main.py configure la journalisation au chargement
+    from main import PasswordManager
+    _redirect_console_logs()
+
+    # Les messages print() du gestionnaire vont sur stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        manager = PasswordManager()
+        try:
+            if args.command == "login":
+                token = manager.login_user(args.user, _read_secret(args, "Mot de passe: "), f"uid:{os.getuid()}")
+                if not token:
+                    raise CliError("Nom d'utilisateur ou mot de passe incorrect")
+                manager.persist_session(token, args.ttl)
+                _emit(out, {"op": "login", "ok": True, "token": token})
+                return 0
+
+            token = _resolve_token(manager, args.token)
+            if args.command == "logout":
+                manager.logout(token)
+                _emit(out, {"op": "logout", "ok": True})
+                return 0
+            if args.command == "batch":
+                return 1 if run_batch(manager, token, sys.stdin, out, args.atomic) else 0
+
+            op: Dict[str, Any] = {"op": args.command}
+            if args.command == "add":
+                op.update(site_name=args.site, username=args.username, notes=args.notes,
+                          password=_read_secret(args, "Mot de passe à stocker: "))
+            elif args.command == "get" or args.command == "delete":
+                op["id"] = args.id
+            elif args.command == "update":
+                op.update(id=args.id, site_name=args.site, username=args.username, notes=args.notes,
+                          password=_read_secret(args, "Nouveau mot de passe: ") if args.password_stdin else None)
+            elif args.command == "list":
+                op.update(after_id=args.after_id, limit=args.limit, all=args.all,
+                          columns=args.columns.split(",") if args.columns else None)
+            elif args.command == "search":
+                op.update(query=args.query, limit=args.limit, fuzzy=args.fuzzy,
+                          columns=args.columns.split(",") if args.columns else None)
+            else:
+                op.update(file=args.file, format=args.format)
+            return 0 if run_operation(manager, token, op, out) else 1
+        except CliError as e:
+            _emit(out, {"op": args.command, "ok": False, "error": str(e)})
+            return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
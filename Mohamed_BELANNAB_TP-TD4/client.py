@@ -0,0 +1,111 @@
+# client.py
+"""
+Bibliothèque cliente du serveur local (server.py).
+
+    with PasswordManagerClient() as client:
+        client.login("alice", "S3cret!pass", cache=True)
+        entry = client.get(42)
+        entries = client.pipeline([("get", {"id": i}) for i in ids])
+"""
+import itertools
+import socket
+from typing import Dict, Any, List, Optional, Tuple
+
+from config import Config
+from protocol import HEADER, ProtocolError, encode_frame, decode_payload, read_length
+
+class ServerError(Exception):
+    """Erreur renvoyée par le serveur pour une requête."""
+
+class PasswordManagerClient:
+    """Client synchrone ; une instance correspond à une connexion et à une session."""
+
+    def __init__(self, socket_path: Optional[str] = None, token: Optional[str] = None, timeout: float = 30.0):
+        self.socket_path = socket_path or Config.SERVER_SOCKET_PATH
+        self.token = token
+        self._ids = itertools.count(1)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(self.socket_path)
+        self._file = self._sock.makefile("rb")
+
+    def _recv_frame(self) -> Dict[str, Any]:
+        header = self._file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ProtocolError("Connexion fermée par le serveur")
+        length = read_length(header)
+        payload = self._file.read(length)
+        if len(payload) < length:
+            raise ProtocolError("Connexion fermée par le serveur")
+        return decode_payload(payload)
+
+    def _request(self, op: str, args: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        request_id = next(self._ids)
+        return {"id": request_id, "op": op, "token": self.token, "args": args or {}}
+
+    def call(self, op: str, args: Optional[Dict[str, Any]] = None) -> Any:
+        """Envoyer une requête et attendre sa réponse."""
+        return self.pipeline([(op, args)])[0]
+
+    def pipeline(self, operations: List[Tuple[str, Optional[Dict[str, Any]]]], raise_errors: bool = True) -> List[Any]:
+        """
+        Envoyer plusieurs requêtes d'un coup puis lire les réponses,
+        remises dans l'ordre des requêtes. Avec `raise_errors=False`,
+        une requête en échec donne une ServerError dans la liste au lieu de lever.
+        """
+        requests = [self._request(op, args) for op, args in operations]
+        self._sock.sendall(b"".join(encode_frame(request) for request in requests))
+        responses = {}
+        while len(responses) < len(requests):
+            response = self._recv_frame()
+            responses[response.get("id")] = response
+
+        results = []
+        for request in requests:
+            response = responses[request["id"]]
+            if response.get("ok"):
+                results.append(response.get("result"))
+            elif raise_errors:
+                raise ServerError(response.get("error"))
+            else:
+                results.append(ServerError(response.get("error")))
+        return results
+
+    def login(self, username: str, password: str, cache: bool = False) -> str:
+        self.token = self.call("login", {"username": username, "password": password, "cache": cache})["token"]
+        return self.token
+
+    def logout(self) -> None:
+        self.call("logout")
+        self.token = None
+
+    def add(self, site_name: str, username: str, password: str, notes: str = "") -> bool:
+        return self.call("add", {"site_name": site_name, "username": username, "password": password, "notes": notes})
+
+    def get(self, password_id: int) -> Optional[Dict[str, Any]]:
+        return self.call("get", {"id": password_id})
+
+    def update(self, password_id: int, site_name: Optional[str] = None, username: Optional[str] = None,
+               password: Optional[str] = None, notes: Optional[str] = None) -> bool:
+        return self.call("update", {"id": password_id, "site_name": site_name, "username": username,
+                                    "password": password, "notes": notes})
+
+    def delete(self, password_id: int) -> bool:
+        return self.call("delete", {"id": password_id})
+
+    def list(self, after_id: int = 0, limit: int = 50, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return self.call("list", {"after_id": after_id, "limit": limit, "columns": columns})
+
+    def search(self, query: str, limit: Optional[int] = None, fuzzy: bool = False,
+               columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return self.call("search", {"query": query, "limit": limit, "fuzzy": fuzzy, "columns": columns})
+
+    def close(self) -> None:
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
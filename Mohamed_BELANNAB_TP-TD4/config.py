@@ -1,23 +1,131 @@
 # config.py
 import os
-from cryptography.fernet import Fernet
 
 class Config:
     # Configuration de la base de données
     DATABASE_PATH = "passwords.db"
     
+    # Moteur de stockage (storage.py) : "sqlite", "memory" (essais, bancs d'essai)
+    # ou "cached" (SQLite derrière un cache de lecture)
+    STORAGE_BACKEND = os.environ.get("PASSWORD_MANAGER_STORAGE", "sqlite")
+    STORAGE_CACHE_SIZE = 10000  # lignes gardées par le moteur "cached"
+    STORAGE_CACHE_TTL = 30.0  # secondes ; borne le retard sur les écritures d'autres processus
+    
+    # Pool de connexions SQLite
+    DB_POOL_SIZE = 5
+    DB_POOL_TIMEOUT = 5.0  # secondes d'attente maximale pour obtenir une connexion
+    DB_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -8000,  # ~8 Mo (valeur négative = Kio)
+        "mmap_size": 268435456,  # 256 Mo
+        "busy_timeout": 5000,  # ms
+    }
+    
+    # Gestionnaire asynchrone : threads dédiés à bcrypt/Fernet et hachages simultanés maximum
+    ASYNC_CRYPTO_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+    ASYNC_HASH_CONCURRENCY = os.cpu_count() or 1
+    
+    # Clé de chiffrement principale et anciennes clés conservées pour déchiffrer
+    # pendant une rotation (une par ligne, la plus récente en premier)
+    ENCRYPTION_KEY_PATH = "encryption_key.key"
+    RETIRED_KEYS_PATH = "encryption_key.retired"
+    # Délai de revérification des fichiers de clés par les processus déjà lancés
+    KEY_FILES_CHECK_INTERVAL = 1.0  # secondes
+    
     # Génération et stockage de la clé de chiffrement
     @staticmethod
     def get_encryption_key():
-        key_file = "encryption_key.key"
+        key_file = Config.ENCRYPTION_KEY_PATH
         if os.path.exists(key_file):
             with open(key_file, "rb") as f:
                 return f.read()
         else:
+            from cryptography.fernet import Fernet
             key = Fernet.generate_key()
             with open(key_file, "wb") as f:
                 f.write(key)
             return key
     
+    @staticmethod
+    def get_retired_encryption_keys():
+        if not os.path.exists(Config.RETIRED_KEYS_PATH):
+            return []
+        with open(Config.RETIRED_KEYS_PATH, "rb") as f:
+            return [line.strip() for line in f if line.strip()]
+    
+    # Rotation de clé (key_rotation.py) : lignes rechiffrées par transaction et processus de chiffrement
+    KEY_ROTATION_CHUNK_SIZE = 1000
+    KEY_ROTATION_WORKERS = os.cpu_count() or 1
+    
+    # Clés de données par utilisateur (data_keys.py) : délai de revérification de
+    # la clé active avant un chiffrement, et délai avant qu'une clé remplacée
+    # puisse être supprimée (`rekey --purge`)
+    DATA_KEY_CHECK_TTL = 5.0  # secondes
+    DATA_KEY_PURGE_GRACE = 24 * 3600  # secondes
+    
+    # Sauvegardes chiffrées (backup.py) : répertoire des archives, taille des blocs
+    # chiffrés et niveau de compression zlib (les secrets, déjà chiffrés, ne se compressent pas)
+    BACKUP_DIR = os.environ.get("PASSWORD_MANAGER_BACKUP_DIR", "backups")
+    BACKUP_CHUNK_SIZE = 1 << 20  # 1 Mio
+    BACKUP_COMPRESSION_LEVEL = 1  # 6 : archives ~7 % plus petites, deux fois plus lent
+    
+    # Coût bcrypt (log2 du nombre d'itérations). Ajuster avec `python security.py calibrate`.
+    # Les hachages existants sont mis à jour à la prochaine connexion réussie.
+    BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+    
+    # Politique des mots de passe de compte (password_policy.py)
+    PASSWORD_MIN_LENGTH = 8
+    PASSWORD_MAX_LENGTH = None
+    PASSWORD_REQUIRED_CLASSES = ("upper", "lower", "digit", "special")
+    PASSWORD_MIN_ENTROPY_BITS = 0.0  # 0 = pas d'exigence d'entropie
+    PASSWORD_BLOCKLIST_PATH = None  # fichier texte, un mot de passe interdit par ligne
+    # Index local de mots de passe divulgués (`python breach_index.py build`) ; ignoré s'il est absent
+    BREACHED_PASSWORDS_INDEX_PATH = "breached_passwords.idx"
+    # Refuser aussi ces mots de passe dans le coffre (sinon simple avertissement)
+    REJECT_BREACHED_STORED_PASSWORDS = False
+    
+    # Sessions : durée d'inactivité maximale (secondes) et nombre de sessions en mémoire
+    SESSION_TTL = 900
+    SESSION_MAX = 10000
+    CLI_SESSION_TTL = 3600  # sessions persistées par `cli.py login`
+    
+    # Limitation des tentatives de connexion (throttle.py) : seau de jetons par
+    # nom d'utilisateur et par source, puis verrouillage exponentiel après des échecs
+    LOGIN_USER_BURST = 5  # tentatives consécutives autorisées par nom d'utilisateur
+    LOGIN_USER_RATE = 0.1  # jetons regagnés par seconde (6 tentatives/minute)
+    LOGIN_SOURCE_BURST = 20
+    LOGIN_SOURCE_RATE = 1.0
+    LOGIN_LOCKOUT_THRESHOLD = 5  # échecs consécutifs avant verrouillage
+    LOGIN_LOCKOUT_BASE = 30.0  # secondes, doublées à chaque échec supplémentaire
+    LOGIN_LOCKOUT_MAX = 900.0
+    LOGIN_FAILURE_RESET = 900.0  # secondes sans échec avant la remise à zéro du compteur d'échecs
+    LOGIN_THROTTLE_MAX_ENTRIES = 100000
+    LOGIN_THROTTLE_PERSIST = True  # conserver échecs et verrouillages dans le stockage (utile pour la CLI)
+    
+    # Journal d'audit (audit.py) : événements écrits par lots par un thread dédié
+    AUDIT_ENABLED = True
+    AUDIT_BATCH_SIZE = 500  # événements maximum par transaction
+    AUDIT_FLUSH_INTERVAL = 1.0  # secondes d'attente maximale avant l'écriture d'un lot
+    AUDIT_QUEUE_MAX = 100000  # au-delà, les événements sont perdus (et comptés)
+    AUDIT_FLUSH_TIMEOUT = 5.0  # secondes d'attente de l'écriture avant une lecture du journal
+    AUDIT_CLOSE_TIMEOUT = 5.0  # secondes de nouveaux essais à l'arrêt avant d'abandonner le dernier lot
+    
+    # Cache optionnel des secrets déchiffrés (par session)
+    SECRET_CACHE_SIZE = 128
+    SECRET_CACHE_TTL = 60  # secondes
+    
+    # Recherche plein texte : nombre de résultats par défaut et plafond
+    SEARCH_DEFAULT_LIMIT = 20
+    SEARCH_MAX_LIMIT = 200
+    
+    # Serveur local (server.py) : chemin de la socket Unix
+    SERVER_SOCKET_PATH = os.environ.get("PASSWORD_MANAGER_SOCKET", "password_manager.sock")
+    # Requêtes en cours par connexion au-delà desquelles le serveur cesse de lire la socket
+    SERVER_MAX_INFLIGHT = 32
+    # Seul répertoire où les opérations import/export de la socket lisent et écrivent
+    # (None : opérations refusées, un client ne choisit pas un chemin du serveur)
+    SERVER_TRANSFER_DIR = os.environ.get("PASSWORD_MANAGER_TRANSFER_DIR")
+    
     # Configuration du logging
     LOGGING_CONFIG_PATH = "logging_config.yaml"
\ No newline at end of file
@@ -0,0 +1,24 @@
+# conftest.py
+"""Fixtures partagées des tests : base, clés et sauvegardes dans un répertoire temporaire."""
+import pytest
+
+from config import Config
+
+@pytest.fixture
+def isolated(tmp_path, monkeypatch):
+    """Base SQLite, clé principale et répertoire de sauvegarde propres au test."""
+    import database
+    import security
+    from data_keys import reset_user_ciphers
+
+    monkeypatch.setattr(Config, "DATABASE_PATH", str(tmp_path / "passwords.db"))
+    monkeypatch.setattr(Config, "ENCRYPTION_KEY_PATH", str(tmp_path / "encryption_key.key"))
+    monkeypatch.setattr(Config, "RETIRED_KEYS_PATH", str(tmp_path / "encryption_key.retired"))
+    monkeypatch.setattr(Config, "BACKUP_DIR", str(tmp_path / "backups"))
+    security.reset_cipher()
+    reset_user_ciphers()
+    database.initialize_database()
+    yield tmp_path
+    database.close_pool()
+    security.reset_cipher()
+    reset_user_ciphers()
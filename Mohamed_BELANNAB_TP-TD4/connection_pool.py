@@ -0,0 +1,119 @@
+# connection_pool.py
+import sqlite3
+import threading
+import logging
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class PooledConnection(sqlite3.Connection):
+    """Connexion SQLite qui connaît le pool auquel elle doit être rendue."""
+    pool = None
+    # Vrai pendant database.transaction() : les commit() intermédiaires sont ignorés
+    defer_commit = False
+
+    def commit(self):
+        if not self.defer_commit:
+            super().commit()
+
+class ConnectionPool:
+    """
+    Pool de connexions SQLite réutilisables et thread-safe.
+    Les connexions sont créées à la demande jusqu'à `max_size`, configurées
+    une seule fois avec les PRAGMAs fournis, puis recyclées entre les appels.
+    """
+
+    def __init__(self, database_path: str, max_size: int = 5, timeout: float = 5.0,
+                 pragmas: Optional[Dict[str, Any]] = None):
+        if max_size < 1:
+            raise ValueError("La taille du pool doit être au moins 1")
+        self.database_path = database_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = dict(pragmas or {})
+        self._idle: List[sqlite3.Connection] = []
+        self._in_use = 0
+        self._closed = False
+        self._condition = threading.Condition(threading.Lock())
+        self._stats = {"checkouts": 0, "waits": 0, "created": 0, "discarded": 0}
+
+    def _create_connection(self) -> sqlite3.Connection:
+        """Ouvrir une nouvelle connexion et lui appliquer les PRAGMAs."""
+        # Une connexion n'est utilisée que par un seul thread à la fois,
+        # mais elle peut changer de thread entre deux emprunts.
+        conn = sqlite3.connect(self.database_path, check_same_thread=False, factory=PooledConnection)
+        conn.pool = self
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Emprunter une connexion, en attendant au plus `timeout` secondes si le pool est plein."""
+        with self._condition:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Le pool de connexions est fermé")
+            if not self._idle and self._in_use >= self.max_size:
+                self._stats["waits"] += 1
+                if not self._condition.wait_for(
+                    lambda: self._idle or self._in_use < self.max_size or self._closed,
+                    timeout=self.timeout
+                ):
+                    raise sqlite3.OperationalError(
+                        f"Aucune connexion disponible après {self.timeout} secondes"
+                    )
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Le pool de connexions est fermé")
+            self._stats["checkouts"] += 1
+            self._in_use += 1
+            if self._idle:
+                return self._idle.pop()
+
+        # Création hors du verrou : l'ouverture du fichier peut être lente
+        try:
+            conn = self._create_connection()
+        except sqlite3.Error:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._stats["created"] += 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Rendre une connexion au pool après avoir annulé toute transaction restée ouverte."""
+        discard = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.warning(f"Connexion écartée du pool après une erreur: {e}")
+            discard = True
+
+        with self._condition:
+            self._in_use -= 1
+            if discard or self._closed:
+                self._stats["discarded"] += 1
+                conn.close()
+            else:
+                self._idle.append(conn)
+            self._condition.notify()
+
+    def close(self) -> None:
+        """Fermer toutes les connexions inactives et refuser les nouveaux emprunts."""
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                self._idle.pop().close()
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Retourner un instantané des statistiques du pool."""
+        with self._condition:
+            return {
+                **self._stats,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "max_size": self.max_size,
+            }
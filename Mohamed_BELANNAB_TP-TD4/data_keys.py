@@ -0,0 +1,330 @@
+# data_keys.py
+"""
+Clés de données par utilisateur (chiffrement par enveloppe).
+
+    python data_keys.py status
+    python data_keys.py migrate [--chunk-size N]      # anciens jetons Fernet -> format binaire
+    python data_keys.py rekey --user alice [--purge]   # nouvelle clé de données pour un coffre
+    python data_keys.py purge --user alice             # supprimer les clés remplacées et inutilisées
+    python data_keys.py compare [--rows N]             # taille et débit des deux formats
+
+Chaque utilisateur a ses propres clés AES-256-GCM, stockées chiffrées par la clé
+principale (table user_keys). Les entrées du coffre sont des BLOB (voir
+security.UserCipher) : 33 octets de plus que le mot de passe, là où un jeton
+Fernet en base64 en ajoute plus de 70. Changer la clé d'un coffre ne rechiffre
+que ce coffre, et une rotation de la clé principale (key_rotation.py) ne fait
+que réenvelopper les clés de données.
+
+Les processus déjà lancés (server.py) gardent les clés en mémoire : ils relisent
+les clés quand une entrée porte un id de clé inconnu, et revérifient la clé
+active avant de chiffrer (au plus toutes les DATA_KEY_CHECK_TTL secondes). Une
+clé remplacée n'est supprimée qu'après DATA_KEY_PURGE_GRACE secondes, et
+seulement si plus aucune entrée ne l'utilise : un processus qui chiffrait encore
+avec elle a eu le temps de passer à la nouvelle.
+"""
+import argparse
+import logging
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from config import Config
+from security import (
+    UserCipher, blob_key_id, generate_data_key, wrap_data_key, unwrap_data_key,
+    get_cipher, encrypt_password, decrypt_password
+)
+from storage import StorageBackend, get_backend
+
+logger = logging.getLogger(__name__)
+
+# (moteur de stockage, user_id) -> chiffreur avec les clés de données en clair
+_ciphers: Dict[Any, UserCipher] = {}
+# (moteur de stockage, user_id) -> dernière vérification de la clé active (time.monotonic)
+_checked_at: Dict[Any, float] = {}
+_ciphers_lock = threading.Lock()
+
+def _load_cipher(user_id: int, storage: StorageBackend) -> Optional[UserCipher]:
+    keys = storage.get_user_keys(user_id)
+    if not keys:
+        return None
+    return UserCipher(user_id, {key["id"]: unwrap_data_key(key["wrapped_key"]) for key in keys})
+
+def get_user_cipher(user_id: int, storage: Optional[StorageBackend] = None,
+                    encrypted_passwords: Iterable = (), refresh: bool = False) -> UserCipher:
+    """
+    Chiffreur du coffre d'un utilisateur ; sa première clé de données est créée
+    au premier usage. Les clés sont relues si l'une des entrées fournies a été
+    chiffrée avec une clé inconnue de ce processus (changement de clé ailleurs).
+    Sans entrée fournie (chiffrement), la clé active est revérifiée au plus toutes
+    les DATA_KEY_CHECK_TTL secondes, pour ne pas chiffrer avec une clé remplacée.
+    """
+    storage = storage or get_backend()
+    cache_key = (storage, user_id)
+    cipher = _ciphers.get(cache_key)
+    if cipher is not None and not refresh:
+        needed = {blob_key_id(token) for token in encrypted_passwords}
+        needed.discard(None)
+        if needed:
+            if needed <= cipher.keys.keys():
+                return cipher
+        elif not _active_key_changed(cache_key, cipher, storage):
+            return cipher
+    with _ciphers_lock:
+        cipher = _load_cipher(user_id, storage)
+        if cipher is None:
+            storage.add_user_key(user_id, wrap_data_key(generate_data_key()), time.time())
+            cipher = _load_cipher(user_id, storage)
+            logger.info(f"Clé de données créée pour l'utilisateur {user_id}")
+        _ciphers[cache_key] = cipher
+        _checked_at[cache_key] = time.monotonic()
+    return cipher
+
+def _active_key_changed(cache_key, cipher: UserCipher, storage: StorageBackend) -> bool:
+    """Vrai si une clé plus récente que celle du chiffreur existe (vérifié au plus toutes les DATA_KEY_CHECK_TTL s)."""
+    now = time.monotonic()
+    checked_at = _checked_at.get(cache_key)
+    if checked_at is not None and now - checked_at < Config.DATA_KEY_CHECK_TTL:
+        return False
+    _checked_at[cache_key] = now
+    return storage.get_active_user_key_id(cipher.user_id) != cipher.active_key_id
+
+def reset_user_ciphers() -> None:
+    """Oublier les clés de données en mémoire (après un changement de base ou de clé principale)."""
+    with _ciphers_lock:
+        _ciphers.clear()
+        _checked_at.clear()
+
+def rekey_user(user_id: int, storage: Optional[StorageBackend] = None, chunk_size: Optional[int] = None,
+               purge: bool = False) -> Dict[str, Any]:
+    """
+    Donner une nouvelle clé de données à un utilisateur et rechiffrer son coffre
+    par pages. Les anciennes clés restent lisibles ; avec `purge`, celles qui ne
+    chiffrent plus aucune entrée sont supprimées (voir purge_user_keys : la clé
+    tout juste remplacée est conservée pendant le délai de grâce).
+    """
+    storage = storage or get_backend()
+    chunk_size = chunk_size or Config.KEY_ROTATION_CHUNK_SIZE
+    start_time = time.perf_counter()
+    get_user_cipher(user_id, storage)
+    storage.add_user_key(user_id, wrap_data_key(generate_data_key()), time.time())
+    cipher = get_user_cipher(user_id, storage, refresh=True)
+
+    stats = {"user_id": user_id, "key_id": cipher.active_key_id, "rows": 0, "reencrypted": 0, "failed": 0,
+             "purged_keys": 0}
+    for rows in storage.iter_passwords_by_user_id(user_id, chunk_size, ("id", "encrypted_password")):
+        stats["rows"] += len(rows)
+        updates = []
+        for row in rows:
+            token = row["encrypted_password"]
+            try:
+                new_token = cipher.reencrypt(token)
+            except Exception as e:
+                # Entrée illisible (altérée ou d'une clé inconnue) : laissée telle quelle
+                logger.error(f"Entrée {row['id']} non rechiffrée pour l'utilisateur {user_id}: {e!r}")
+                stats["failed"] += 1
+                continue
+            if new_token is not token:
+                updates.append((new_token, row["id"], token))
+        # Une entrée modifiée entre-temps n'est pas écrasée (elle garde sa clé)
+        stats["reencrypted"] += storage.replace_encrypted_passwords(updates)
+
+    if purge:
+        stats["purged_keys"] = purge_user_keys(user_id, storage, chunk_size)
+
+    stats["seconds"] = time.perf_counter() - start_time
+    stats["rows_per_sec"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    logger.info(
+        f"Clé de données {cipher.active_key_id} pour l'utilisateur {user_id}: {stats['reencrypted']} entrées "
+        f"rechiffrées ({stats['rows_per_sec']:.0f} lignes/s), {stats['purged_keys']} ancienne(s) clé(s) supprimée(s)"
+    )
+    return stats
+
+def purge_user_keys(user_id: int, storage: Optional[StorageBackend] = None, chunk_size: Optional[int] = None,
+                    grace: Optional[float] = None) -> int:
+    """
+    Supprimer les clés de données d'un utilisateur remplacées depuis plus de
+    `grace` secondes (DATA_KEY_PURGE_GRACE par défaut) et qui ne chiffrent plus
+    aucune entrée. Pendant ce délai, un processus qui chiffrait encore avec une
+    ancienne clé passe à la nouvelle, et ses entrées la gardent utilisée.
+    Retourne le nombre de clés supprimées.
+    """
+    storage = storage or get_backend()
+    chunk_size = chunk_size or Config.KEY_ROTATION_CHUNK_SIZE
+    grace = Config.DATA_KEY_PURGE_GRACE if grace is None else grace
+    keys = storage.get_user_keys(user_id)
+    # Une clé est remplacée à la création de la suivante ; la clé active n'est jamais candidate
+    cutoff = time.time() - grace
+    candidates = {key["id"] for key, successor in zip(keys, keys[1:]) if successor["created_at"] <= cutoff}
+    if not candidates:
+        return 0
+    for rows in storage.iter_passwords_by_user_id(user_id, chunk_size, ("id", "encrypted_password")):
+        candidates.difference_update(blob_key_id(row["encrypted_password"]) for row in rows)
+    purged = storage.delete_user_keys(user_id, sorted(candidates)) if candidates else 0
+    get_user_cipher(user_id, storage, refresh=True)
+    return purged
+
+def migrate_vault(chunk_size: Optional[int] = None, storage: Optional[StorageBackend] = None) -> Dict[str, Any]:
+    """
+    Convertir les entrées encore au format Fernet (TEXT) vers le format binaire
+    chiffré par la clé de données de leur propriétaire. Seules les lignes TEXT
+    sont lues : une migration interrompue reprend simplement où elle en était.
+    Une entrée indéchiffrable est laissée telle quelle et comptée dans `failed`.
+    """
+    storage = storage or get_backend()
+    chunk_size = chunk_size or Config.KEY_ROTATION_CHUNK_SIZE
+    stats = {"migrated": 0, "failed": 0, "bytes_before": 0, "bytes_after": 0}
+    start_time = time.perf_counter()
+    last_report = start_time
+    last_id = 0
+    while True:
+        page = storage.get_legacy_passwords_page(last_id, chunk_size)
+        if not page:
+            break
+        updates = []
+        for password_id, user_id, token in page:
+            try:
+                new_token = get_user_cipher(user_id, storage).encrypt(decrypt_password(token))
+            except Exception as e:
+                # Jeton altéré ou d'une clé principale inconnue : la suite de la migration continue
+                logger.error(f"Entrée {password_id} non migrée pour l'utilisateur {user_id}: {e!r}")
+                stats["failed"] += 1
+                continue
+            updates.append((new_token, password_id, token))
+            stats["bytes_before"] += len(token)
+            stats["bytes_after"] += len(new_token)
+        stats["migrated"] += storage.replace_encrypted_passwords(updates)
+        last_id = page[-1][0]
+        if time.perf_counter() - last_report >= 5.0:
+            last_report = time.perf_counter()
+            logger.info(f"Migration du format de chiffrement: {stats['migrated']} entrées converties")
+
+    stats["seconds"] = time.perf_counter() - start_time
+    stats["rows_per_sec"] = stats["migrated"] / stats["seconds"] if stats["seconds"] else 0.0
+    logger.info(
+        f"Migration terminée: {stats['migrated']} entrées, {stats['bytes_before']} -> {stats['bytes_after']} octets "
+        f"({stats['rows_per_sec']:.0f} lignes/s), {stats['failed']} en échec"
+    )
+    return stats
+
+def rewrap_user_keys(chunk_size: Optional[int] = None) -> int:
+    """
+    Réenvelopper toutes les clés de données avec la clé principale actuelle
+    (après `key_rotation.py rotate`). Retourne le nombre de clés réenveloppées.
+    """
+    from database import get_user_keys_page, rewrap_user_keys as replace_wrapped_keys
+
+    cipher = get_cipher()
+    if not hasattr(cipher, "rotate"):
+        # Une seule clé principale : rien à réenvelopper
+        return 0
+    chunk_size = chunk_size or Config.KEY_ROTATION_CHUNK_SIZE
+    rewrapped, last_id = 0, 0
+    while True:
+        page = get_user_keys_page(last_id, chunk_size)
+        if not page:
+            break
+        rewrapped += replace_wrapped_keys([(cipher.rotate(bytes(wrapped)), key_id, wrapped) for key_id, wrapped in page])
+        last_id = page[-1][0]
+    logger.info(f"{rewrapped} clé(s) de données réenveloppée(s) avec la clé principale")
+    return rewrapped
+
+def _sqlite_bytes(tokens) -> int:
+    """Taille occupée par une colonne de jetons dans une base SQLite en mémoire."""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, encrypted_password TEXT NOT NULL)")
+        conn.executemany("INSERT INTO t (encrypted_password) VALUES (?)", ((token,) for token in tokens))
+        conn.commit()
+        return conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        conn.close()
+
+def compare_formats(rows: int = 10000) -> Dict[str, Dict[str, float]]:
+    """Comparer taille et débit de chiffrement des jetons Fernet et du format binaire."""
+    passwords = [secrets.token_urlsafe(9 + i % 12) for i in range(rows)]
+    cipher = UserCipher(0, {1: generate_data_key()})
+    results = {}
+    for name, encrypt, decrypt in (("fernet", encrypt_password, decrypt_password),
+                                   ("blob", cipher.encrypt, cipher.decrypt)):
+        start = time.perf_counter()
+        tokens = [encrypt(password) for password in passwords]
+        encrypt_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        for token in tokens:
+            decrypt(token)
+        decrypt_seconds = time.perf_counter() - start
+        total = sum(len(token) for token in tokens)
+        results[name] = {
+            "bytes_per_row": total / rows,
+            "total_bytes": total,
+            "sqlite_bytes": _sqlite_bytes(tokens),
+            "encrypt_rows_per_sec": rows / encrypt_seconds,
+            "decrypt_rows_per_sec": rows / decrypt_seconds,
+        }
+    return results
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Clés de données par utilisateur et format de chiffrement")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="Entrées par format et clés de données")
+    migrate = subparsers.add_parser("migrate", help="Convertir les anciens jetons Fernet au format binaire")
+    migrate.add_argument("--chunk-size", type=int, default=None)
+    rekey = subparsers.add_parser("rekey", help="Nouvelle clé de données pour un utilisateur")
+    rekey.add_argument("--user", required=True, help="Nom d'utilisateur du coffre")
+    rekey.add_argument("--purge", action="store_true", help="Supprimer les clés qui ne chiffrent plus rien")
+    rekey.add_argument("--chunk-size", type=int, default=None)
+    purge = subparsers.add_parser("purge", help="Supprimer les clés remplacées qui ne chiffrent plus rien")
+    purge.add_argument("--user", required=True, help="Nom d'utilisateur du coffre")
+    purge.add_argument("--chunk-size", type=int, default=None)
+    compare = subparsers.add_parser("compare", help="Taille et débit des deux formats")
+    compare.add_argument("--rows", type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    # Import tardif : main.py configure la journalisation au chargement
+    from main import PasswordManager
+    manager = PasswordManager()
+
+    if args.command == "compare":
+        results = compare_formats(args.rows)
+        for name, stats in results.items():
+            print(f"{name:<7} {stats['bytes_per_row']:6.1f} o/ligne  base {stats['sqlite_bytes'] / 1024:8.0f} Kio  "
+                  f"chiffrement {stats['encrypt_rows_per_sec']:9.0f} lignes/s  "
+                  f"déchiffrement {stats['decrypt_rows_per_sec']:9.0f} lignes/s")
+        return 0
+    if args.command == "status":
+        from database import get_encryption_format_stats
+        for name, stats in sorted(get_encryption_format_stats().items()):
+            label = {"text": "Fernet (texte)", "blob": "binaire"}.get(name, name)
+            print(f"{label}: {stats['count']} entrées, {stats['bytes'] or 0} octets")
+        return 0
+    if args.command == "migrate":
+        stats = migrate_vault(args.chunk_size, manager.storage)
+        print(f"{stats['migrated']} entrées converties, {stats['bytes_before']} -> {stats['bytes_after']} octets "
+              f"en {stats['seconds']:.2f} s ({stats['rows_per_sec']:.0f} lignes/s)")
+        if stats["failed"]:
+            print(f"Erreur: {stats['failed']} entrée(s) illisible(s) non convertie(s), voir le journal")
+            return 1
+        return 0
+
+    user = manager.storage.get_user_by_username(args.user)
+    if user is None:
+        print(f"Erreur: utilisateur {args.user} inconnu")
+        return 1
+    if args.command == "purge":
+        purged = purge_user_keys(user["id"], manager.storage, args.chunk_size)
+        print(f"{purged} ancienne(s) clé(s) supprimée(s) (clés remplacées depuis moins de "
+              f"{Config.DATA_KEY_PURGE_GRACE} s conservées)")
+        return 0
+    stats = rekey_user(user["id"], manager.storage, args.chunk_size, args.purge)
+    print(f"Clé {stats['key_id']}: {stats['reencrypted']}/{stats['rows']} entrées rechiffrées "
+          f"en {stats['seconds']:.2f} s, {stats['purged_keys']} ancienne(s) clé(s) supprimée(s)")
+    if stats["failed"]:
+        print(f"Erreur: {stats['failed']} entrée(s) illisible(s) non rechiffrée(s), voir le journal")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
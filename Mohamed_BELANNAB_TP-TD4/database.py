@@ -1,24 +1,184 @@
 # database.py
 import sqlite3
 import logging
+import threading
+from contextlib import contextmanager
 from config import Config
+from connection_pool import ConnectionPool
+from migrations import apply_migrations, check_query_plans, LATEST_VERSION
 
 logger = logging.getLogger(__name__)
 
+# Requêtes critiques, partagées avec la vérification des plans d'exécution
+SELECT_USER_BY_USERNAME = "SELECT * FROM users WHERE username = ?"
+SELECT_PASSWORDS_BY_USER_ID = "SELECT * FROM passwords WHERE user_id = ?"
+SELECT_PASSWORD_BY_ID = "SELECT * FROM passwords WHERE id = ? AND user_id = ?"
+SELECT_SESSION = "SELECT user_id, username, expires_at FROM sessions WHERE token_hash = ?"
+SELECT_PASSWORDS_PAGE = "SELECT {columns} FROM passwords WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?"
+SELECT_PASSWORDS_BY_IDS = "SELECT {columns} FROM passwords WHERE user_id = ? AND id IN ({placeholders})"
+# Ids par requête IN (sous la limite historique de 999 paramètres de SQLite)
+MAX_IDS_PER_QUERY = 500
+SELECT_USER_KEYS = "SELECT id, wrapped_key, created_at FROM user_keys WHERE user_id = ? ORDER BY id"
+SELECT_ACTIVE_USER_KEY_ID = "SELECT MAX(id) FROM user_keys WHERE user_id = ?"
+# Journal d'audit : filtres optionnels (utilisateur, entrée, période, événements)
+SELECT_AUDIT_EVENTS = (
+    "SELECT a.id, a.ts, a.event, a.user_id, u.username, a.entry_id, a.subject, a.source "
+    "FROM audit_events a LEFT JOIN users u ON u.id = a.user_id "
+    "WHERE {conditions} ORDER BY a.ts, a.id LIMIT ?"
+)
+# Recherche plein texte : les entrées dont le site commence par le premier terme
+# passent en tête, puis classement bm25 (voir la migration 5)
+SEARCH_PASSWORDS = (
+    "SELECT {columns} FROM passwords_fts JOIN passwords p ON p.id = passwords_fts.rowid "
+    "WHERE passwords_fts MATCH ? AND p.user_id = ? "
+    "ORDER BY p.site_name LIKE ? ESCAPE '\\' DESC, passwords_fts.rank LIMIT ?"
+)
+# Termes de moins de 3 caractères : trop courts pour l'index de trigrammes,
+# recherche par préfixe limitée aux entrées de l'utilisateur
+SEARCH_PASSWORDS_PREFIX = "SELECT {columns} FROM passwords p WHERE p.user_id = ? AND {conditions} ORDER BY p.site_name LIMIT ?"
+
+# Colonnes autorisées pour les listes projetées
+PASSWORD_COLUMNS = {
+    "id", "user_id", "site_name", "username", "encrypted_password", "notes", "created_at", "updated_at"
+}
+DEFAULT_LIST_COLUMNS = ("id", "site_name", "username")
+# Colonnes lues par la récupération groupée avec déchiffrement (retrieve_password_bulk)
+SECRET_COLUMNS = ("id", "site_name", "username", "encrypted_password", "notes", "created_at", "updated_at")
+# Colonnes modifiables par update_password
+UPDATABLE_PASSWORD_COLUMNS = ("site_name", "username", "encrypted_password", "notes")
+
+HOT_QUERIES = {
+    "get_user_by_username": (SELECT_USER_BY_USERNAME, ("",)),
+    "get_passwords_by_user_id": (SELECT_PASSWORDS_BY_USER_ID, (0,)),
+    "get_password_by_id": (SELECT_PASSWORD_BY_ID, (0, 0)),
+    "get_passwords_page": (SELECT_PASSWORDS_PAGE.format(columns="id, site_name, username"), (0, 0, 50)),
+    "get_passwords_by_ids": (
+        SELECT_PASSWORDS_BY_IDS.format(columns="id, encrypted_password", placeholders="?, ?, ?"), (0, 1, 2, 3)
+    ),
+    "get_persisted_session": (SELECT_SESSION, ("",)),
+    "get_user_keys": (SELECT_USER_KEYS, (0,)),
+    "get_active_user_key_id": (SELECT_ACTIVE_USER_KEY_ID, (0,)),
+    "audit_events_by_user": (
+        SELECT_AUDIT_EVENTS.format(conditions="a.user_id = ? AND a.ts >= ? AND a.ts < ?"), (0, 0.0, 0.0, 100)
+    ),
+    "audit_events_by_entry": (
+        SELECT_AUDIT_EVENTS.format(conditions="a.entry_id = ? AND a.ts >= ? AND a.ts < ?"), (0, 0.0, 0.0, 100)
+    ),
+    "audit_events_by_time": (SELECT_AUDIT_EVENTS.format(conditions="a.ts >= ? AND a.ts < ?"), (0.0, 0.0, 100)),
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+_transaction_local = threading.local()
+
+def get_pool():
+    """Retourner le pool de connexions, en le (re)créant si le chemin de la base a changé."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.database_path != Config.DATABASE_PATH:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(
+                Config.DATABASE_PATH,
+                max_size=Config.DB_POOL_SIZE,
+                timeout=Config.DB_POOL_TIMEOUT,
+                pragmas=Config.DB_PRAGMAS
+            )
+        return _pool
+
 def get_db_connection():
-    """Établir une connexion à la base de données SQLite."""
-    try:
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
+    """
+    Emprunter une connexion à la base de données SQLite depuis le pool.
+    À l'intérieur d'un bloc `transaction()`, retourne la connexion de la transaction.
+    """
+    conn = getattr(_transaction_local, "conn", None)
+    if conn is not None:
         return conn
+    try:
+        return get_pool().acquire()
     except sqlite3.Error as e:
         logger.error(f"Erreur lors de la connexion à la base de données: {e}")
         raise
 
+def release_db_connection(conn):
+    """Rendre une connexion au pool dont elle provient (sauf pendant une transaction)."""
+    if conn is getattr(_transaction_local, "conn", None):
+        return
+    conn.pool.release(conn)
+
+@contextmanager
+def transaction():
+    """
+    Regrouper plusieurs appels de ce module dans une seule transaction.
+    La connexion est réservée au thread courant et les commit() intermédiaires
+    sont différés jusqu'à la sortie du bloc ; une exception annule tout.
+    """
+    if getattr(_transaction_local, "conn", None) is not None:
+        # Transaction déjà ouverte : le bloc externe décide du commit
+        yield _transaction_local.conn
+        return
+    conn = get_pool().acquire()
+    conn.defer_commit = True
+    _transaction_local.conn = conn
+    _transaction_local.after_commit = callbacks = []
+    try:
+        yield conn
+        conn.defer_commit = False
+        conn.commit()
+    except BaseException:
+        conn.defer_commit = False
+        conn.rollback()
+        raise
+    finally:
+        conn.defer_commit = False
+        _transaction_local.conn = None
+        _transaction_local.after_commit = None
+        conn.pool.release(conn)
+    for callback in callbacks:
+        callback()
+
+def after_commit(callback):
+    """
+    Exécuter `callback` après le commit de la transaction() ouverte dans ce
+    thread (aussitôt s'il n'y en a pas). Si la transaction est annulée, il
+    n'est jamais appelé.
+    """
+    callbacks = getattr(_transaction_local, "after_commit", None)
+    if callbacks is None:
+        callback()
+    else:
+        callbacks.append(callback)
+
+def get_pool_stats():
+    """Statistiques du pool (emprunts, attentes, connexions créées) pour le dimensionner."""
+    return get_pool().stats()
+
+def close_pool():
+    """Fermer toutes les connexions du pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+def _schema_is_current(conn):
+    """Vérifier sans DDL que la base est déjà à la dernière version du schéma."""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        # Table absente : base neuve ou antérieure aux migrations
+        return False
+    return (row[0] or 0) >= LATEST_VERSION
+
 def initialize_database():
     """Créer les tables nécessaires si elles n'existent pas."""
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
+        # Démarrage rapide : rien à faire si le schéma est à jour
+        if _schema_is_current(conn):
+            logger.debug("Schéma de la base de données déjà à jour")
+            return
+        
         cursor = conn.cursor()
         
         # Table des utilisateurs
@@ -48,17 +208,28 @@ def initialize_database():
         ''')
         
         conn.commit()
+        
+        # Index et évolutions du schéma
+        apply_migrations(conn)
         logger.info("Base de données initialisée avec succès")
     except sqlite3.Error as e:
         logger.error(f"Erreur lors de l'initialisation de la base de données: {e}")
         raise
     finally:
-        conn.close()
+        release_db_connection(conn)
+
+def verify_query_plans():
+    """Vérifier via EXPLAIN QUERY PLAN que les requêtes critiques utilisent un index."""
+    conn = get_db_connection()
+    try:
+        return check_query_plans(conn, HOT_QUERIES)
+    finally:
+        release_db_connection(conn)
 
 def add_user(username, password_hash, email):
     """Ajouter un nouvel utilisateur à la base de données."""
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
         cursor.execute(
@@ -77,15 +248,15 @@ def add_user(username, password_hash, email):
         logger.error(f"Erreur lors de l'ajout de l'utilisateur: {e}")
         raise
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def get_user_by_username(username):
     """Récupérer les informations d'un utilisateur par son nom d'utilisateur."""
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
+        cursor.execute(SELECT_USER_BY_USERNAME, (username,))
         user = cursor.fetchone()
         
         return dict(user) if user else None
@@ -93,12 +264,25 @@ def get_user_by_username(username):
         logger.error(f"Erreur lors de la récupération de l'utilisateur: {e}")
         raise
     finally:
-        conn.close()
+        release_db_connection(conn)
+
+def update_user_password_hash(user_id, password_hash):
+    """Remplacer le hash du mot de passe d'un utilisateur (rehachage au nouveau coût)."""
+    conn = get_db_connection()
+    try:
+        conn.execute("UPDATE users SET password_hash = ? WHERE id = ?", (password_hash, user_id))
+        conn.commit()
+        logger.info(f"Hash du mot de passe mis à jour pour l'utilisateur {user_id}")
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la mise à jour du hash: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
 
 def add_password(user_id, site_name, username, encrypted_password, notes=None):
     """Ajouter un nouveau mot de passe pour un utilisateur."""
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
         cursor.execute(
@@ -114,15 +298,15 @@ def add_password(user_id, site_name, username, encrypted_password, notes=None):
         logger.error(f"Erreur lors de l'ajout du mot de passe: {e}")
         raise
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def get_passwords_by_user_id(user_id):
     """Récupérer tous les mots de passe d'un utilisateur."""
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT * FROM passwords WHERE user_id = ?", (user_id,))
+        cursor.execute(SELECT_PASSWORDS_BY_USER_ID, (user_id,))
         passwords = cursor.fetchall()
         
         return [dict(pw) for pw in passwords]
@@ -130,15 +314,15 @@ def get_passwords_by_user_id(user_id):
         logger.error(f"Erreur lors de la récupération des mots de passe: {e}")
         raise
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def get_password_by_id(password_id, user_id):
     """Récupérer un mot de passe spécifique d'un utilisateur."""
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT * FROM passwords WHERE id = ? AND user_id = ?", (password_id, user_id))
+        cursor.execute(SELECT_PASSWORD_BY_ID, (password_id, user_id))
         password = cursor.fetchone()
         
         return dict(password) if password else None
@@ -146,4 +330,575 @@ def get_password_by_id(password_id, user_id):
         logger.error(f"Erreur lors de la récupération du mot de passe: {e}")
         raise
     finally:
-        conn.close()
\ No newline at end of file
+        release_db_connection(conn)
+
+def add_passwords_bulk(user_id, entries):
+    """
+    Ajouter plusieurs mots de passe en une seule transaction.
+    `entries` est une séquence de tuples (site_name, username, encrypted_password, notes).
+    """
+    conn = get_db_connection()
+    try:
+        conn.executemany(
+            "INSERT INTO passwords (user_id, site_name, username, encrypted_password, notes) VALUES (?, ?, ?, ?, ?)",
+            ((user_id, *entry) for entry in entries)
+        )
+        conn.commit()
+        logger.debug(f"{len(entries)} mots de passe ajoutés en lot pour l'utilisateur {user_id}")
+        return len(entries)
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de l'ajout en lot des mots de passe: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def update_password(password_id, user_id, changes):
+    """
+    Modifier une entrée d'un utilisateur. `changes` associe les colonnes à mettre
+    à jour (parmi UPDATABLE_PASSWORD_COLUMNS) à leur nouvelle valeur ; updated_at
+    est renseigné automatiquement. Retourne True si l'entrée existe.
+    """
+    unknown = set(changes) - set(UPDATABLE_PASSWORD_COLUMNS)
+    if unknown:
+        raise ValueError(f"Colonnes non modifiables: {', '.join(sorted(unknown))}")
+    if not changes:
+        return get_password_by_id(password_id, user_id) is not None
+    assignments = ", ".join(f"{column} = ?" for column in changes)
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            f"UPDATE passwords SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ? AND user_id = ?",
+            (*changes.values(), password_id, user_id)
+        )
+        conn.commit()
+        if cursor.rowcount:
+            logger.info(f"Mot de passe mis à jour: ID {password_id}")
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la mise à jour du mot de passe: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def delete_password(password_id, user_id):
+    """Supprimer une entrée d'un utilisateur. Retourne True si elle existait."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute("DELETE FROM passwords WHERE id = ? AND user_id = ?", (password_id, user_id))
+        conn.commit()
+        if cursor.rowcount:
+            logger.info(f"Mot de passe supprimé: ID {password_id}")
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la suppression du mot de passe: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def _validate_columns(columns):
+    """Vérifier les colonnes demandées ; l'id est toujours inclus."""
+    columns = tuple(columns) if columns else DEFAULT_LIST_COLUMNS
+    unknown = set(columns) - PASSWORD_COLUMNS
+    if unknown:
+        raise ValueError(f"Colonnes inconnues: {', '.join(sorted(unknown))}")
+    if "id" not in columns:
+        columns = ("id",) + columns
+    return columns
+
+def _select_password_page(columns):
+    """Construire la requête de pagination par clé (keyset) pour les colonnes demandées."""
+    # L'id sert de curseur pour la page suivante
+    return SELECT_PASSWORDS_PAGE.format(columns=", ".join(_validate_columns(columns)))
+
+def get_passwords_page(user_id, after_id=0, limit=50, columns=None):
+    """
+    Récupérer une page de mots de passe d'un utilisateur, triée par id.
+    Passer l'id de la dernière ligne reçue dans `after_id` pour obtenir la page suivante.
+    Seules les colonnes demandées sont lues (par défaut id, site_name, username).
+    """
+    query = _select_password_page(columns)
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(query, (user_id, after_id, limit))
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la récupération d'une page de mots de passe: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def iter_passwords_by_user_id(user_id, chunk_size=1000, columns=None):
+    """
+    Parcourir les mots de passe d'un utilisateur page par page, sans tout charger en mémoire.
+    La connexion est rendue au pool entre deux pages.
+    """
+    after_id = 0
+    while True:
+        rows = get_passwords_page(user_id, after_id, chunk_size, columns)
+        if not rows:
+            break
+        yield rows
+        if len(rows) < chunk_size:
+            break
+        after_id = rows[-1]["id"]
+
+def get_passwords_by_ids(user_id, password_ids, columns=None):
+    """
+    Récupérer les entrées d'un utilisateur dont l'id figure dans `password_ids`,
+    triées par id, avec une requête IN par bloc de MAX_IDS_PER_QUERY ids sur une
+    seule connexion. Les ids inconnus ou d'un autre utilisateur sont ignorés.
+    """
+    select_columns = ", ".join(_validate_columns(columns))
+    password_ids = sorted(set(password_ids))
+    conn = get_db_connection()
+    try:
+        rows = []
+        for start in range(0, len(password_ids), MAX_IDS_PER_QUERY):
+            chunk = password_ids[start:start + MAX_IDS_PER_QUERY]
+            cursor = conn.execute(
+                SELECT_PASSWORDS_BY_IDS.format(columns=select_columns, placeholders=", ".join("?" * len(chunk))),
+                (user_id, *chunk)
+            )
+            rows.extend(dict(row) for row in cursor.fetchall())
+        # Tri en Python plutôt qu'ORDER BY, qui ajoute un B-tree temporaire au plan
+        rows.sort(key=lambda row: row["id"])
+        return rows
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la récupération groupée de mots de passe: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def count_passwords(after_id=0):
+    """Compter les entrées de tous les utilisateurs au-delà de `after_id`."""
+    conn = get_db_connection()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM passwords WHERE id > ?", (after_id,)).fetchone()[0]
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors du comptage des mots de passe: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def get_encrypted_passwords_page(after_id=0, limit=1000):
+    """Lire (id, encrypted_password) de tous les utilisateurs par pages triées par id."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            "SELECT id, encrypted_password FROM passwords WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit)
+        )
+        return [(row["id"], row["encrypted_password"]) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la lecture des mots de passe chiffrés: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def replace_encrypted_passwords(updates):
+    """
+    Remplacer des mots de passe chiffrés. `updates` est une séquence de tuples
+    (nouveau, id, ancien) : une ligne modifiée entre-temps n'est pas écrasée.
+    updated_at est mis à jour pour que la prochaine sauvegarde incrémentale
+    emporte le nouveau chiffré. Retourne le nombre de lignes remplacées.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.executemany(
+            "UPDATE passwords SET encrypted_password = ?, updated_at = CURRENT_TIMESTAMP "
+            "WHERE id = ? AND encrypted_password = ?",
+            updates
+        )
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors du remplacement des mots de passe chiffrés: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def get_legacy_passwords_page(after_id=0, limit=1000):
+    """Lire (id, user_id, encrypted_password) des entrées encore au format Fernet (TEXT), triées par id."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            "SELECT id, user_id, encrypted_password FROM passwords "
+            "WHERE id > ? AND typeof(encrypted_password) = 'text' ORDER BY id LIMIT ?",
+            (after_id, limit)
+        )
+        return [(row["id"], row["user_id"], row["encrypted_password"]) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la lecture des mots de passe à migrer: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def get_encryption_format_stats():
+    """Nombre d'entrées et octets stockés par format (text = Fernet, blob = clés de données)."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            "SELECT typeof(encrypted_password) AS format, COUNT(*) AS count, "
+            "SUM(length(CAST(encrypted_password AS BLOB))) AS bytes FROM passwords GROUP BY format"
+        )
+        return {row["format"]: {"count": row["count"], "bytes": row["bytes"]} for row in cursor.fetchall()}
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors du comptage des formats de chiffrement: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def get_user_keys(user_id):
+    """Clés de données (enveloppées) d'un utilisateur, de la plus ancienne à la plus récente."""
+    conn = get_db_connection()
+    try:
+        return [dict(row) for row in conn.execute(SELECT_USER_KEYS, (user_id,)).fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la lecture des clés de données: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def get_active_user_key_id(user_id):
+    """Id de la clé de données active (la plus récente) d'un utilisateur, ou None."""
+    conn = get_db_connection()
+    try:
+        return conn.execute(SELECT_ACTIVE_USER_KEY_ID, (user_id,)).fetchone()[0]
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la lecture de la clé de données active: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def add_user_key(user_id, wrapped_key, created_at):
+    """Enregistrer une nouvelle clé de données (enveloppée) et retourner son id."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            "INSERT INTO user_keys (user_id, wrapped_key, created_at) VALUES (?, ?, ?)",
+            (user_id, wrapped_key, created_at)
+        )
+        conn.commit()
+        return cursor.lastrowid
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de l'enregistrement de la clé de données: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def delete_user_keys(user_id, key_ids):
+    """Supprimer des clés de données d'un utilisateur qui ne chiffrent plus aucune entrée."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.executemany(
+            "DELETE FROM user_keys WHERE id = ? AND user_id = ?", ((key_id, user_id) for key_id in key_ids)
+        )
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la suppression des clés de données: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def get_user_keys_page(after_id=0, limit=1000):
+    """Lire (id, wrapped_key) des clés de données de tous les utilisateurs, triées par id."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            "SELECT id, wrapped_key FROM user_keys WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+        )
+        return [(row["id"], row["wrapped_key"]) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la lecture des clés de données: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def rewrap_user_keys(updates):
+    """
+    Remplacer des clés de données enveloppées. `updates` est une séquence de
+    tuples (nouvelle, id, ancienne). Retourne le nombre de clés remplacées.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.executemany("UPDATE user_keys SET wrapped_key = ? WHERE id = ? AND wrapped_key = ?", updates)
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors du remplacement des clés de données: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def get_key_rotation(key_fingerprint):
+    """Récupérer l'état de la rotation vers la clé d'empreinte donnée."""
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT * FROM key_rotations WHERE key_fingerprint = ?", (key_fingerprint,)).fetchone()
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la lecture de la rotation de clé: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def create_key_rotation(key_fingerprint, total_rows, started_at):
+    """Enregistrer le début d'une rotation de clé et retourner son état."""
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            "INSERT INTO key_rotations (key_fingerprint, total_rows, started_at, updated_at) VALUES (?, ?, ?, ?)",
+            (key_fingerprint, total_rows, started_at, started_at)
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de l'enregistrement de la rotation de clé: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+    return get_key_rotation(key_fingerprint)
+
+def update_key_rotation(rotation_id, last_id, rows_done, updated_at, status="running", finished_at=None):
+    """Enregistrer le point de reprise d'une rotation de clé."""
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            "UPDATE key_rotations SET last_id = ?, rows_done = ?, updated_at = ?, status = ?, finished_at = ? "
+            "WHERE id = ?",
+            (last_id, rows_done, updated_at, status, finished_at, rotation_id)
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la mise à jour de la rotation de clé: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def get_throttle_state(throttle_key):
+    """Récupérer l'état persisté (échecs, verrouillage) d'une clé de limitation des connexions."""
+    conn = get_db_connection()
+    try:
+        row = conn.execute(
+            "SELECT failures, locked_until, updated_at FROM login_throttle WHERE throttle_key = ?", (throttle_key,)
+        ).fetchone()
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la lecture de l'état de limitation: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def save_throttle_state(throttle_key, failures, locked_until, updated_at):
+    """Persister l'état d'une clé de limitation des connexions."""
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO login_throttle (throttle_key, failures, locked_until, updated_at) VALUES (?, ?, ?, ?)",
+            (throttle_key, failures, locked_until, updated_at)
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de l'enregistrement de l'état de limitation: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def delete_throttle_state(throttle_key=None, before=None):
+    """Supprimer l'état d'une clé, ou tous ceux non modifiés depuis `before`."""
+    conn = get_db_connection()
+    try:
+        if throttle_key is not None:
+            cursor = conn.execute("DELETE FROM login_throttle WHERE throttle_key = ?", (throttle_key,))
+        else:
+            cursor = conn.execute("DELETE FROM login_throttle WHERE updated_at <= ?", (before,))
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la suppression de l'état de limitation: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def _fts_string(text):
+    """Citer un texte pour une expression MATCH (aucun opérateur FTS5 interprété)."""
+    return '"' + text.replace('"', '""') + '"'
+
+def _like_prefix(text):
+    """Motif LIKE « commence par », caractères spéciaux échappés."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def _trigrams(terms):
+    """Trigrammes distincts des termes, dans l'ordre d'apparition."""
+    return list(dict.fromkeys(
+        term[i:i + 3].lower() for term in terms for i in range(len(term) - 2)
+    ))
+
+def search_passwords(user_id, query, limit=20, fuzzy=False, columns=None):
+    """
+    Rechercher les entrées d'un utilisateur dont le site, le nom d'utilisateur
+    ou les notes contiennent tous les termes de `query` (sous-chaînes, sans
+    tenir compte de la casse), les meilleurs résultats en premier.
+    Avec `fuzzy`, il suffit de partager des trigrammes avec la requête : les
+    fautes de frappe sont tolérées et les entrées les plus proches sont en tête.
+    Les termes de moins de 3 caractères sont cherchés comme préfixes du site
+    ou du nom d'utilisateur.
+    """
+    terms = query.split()
+    if not terms:
+        return []
+    columns = ", ".join(f"p.{column}" for column in _validate_columns(columns))
+
+    if fuzzy:
+        grams = _trigrams(terms)
+        match = " OR ".join(_fts_string(gram) for gram in grams)
+    elif all(len(term) >= 3 for term in terms):
+        match = " ".join(_fts_string(term) for term in terms)
+    else:
+        match = None
+
+    if match:
+        sql = SEARCH_PASSWORDS.format(columns=columns)
+        params = (match, user_id, _like_prefix(terms[0]), limit)
+    else:
+        conditions = " AND ".join(
+            "(p.site_name LIKE ? ESCAPE '\\' OR p.username LIKE ? ESCAPE '\\')" for _ in terms
+        )
+        sql = SEARCH_PASSWORDS_PREFIX.format(columns=columns, conditions=conditions)
+        params = (user_id, *(pattern for term in terms for pattern in (_like_prefix(term),) * 2), limit)
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(sql, params)
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la recherche de mots de passe: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def save_session(token_hash, user_id, username, expires_at):
+    """Persister une session (seul le hash du jeton est stocké)."""
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (token_hash, user_id, username, expires_at) VALUES (?, ?, ?, ?)",
+            (token_hash, user_id, username, expires_at)
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de l'enregistrement de la session: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def get_persisted_session(token_hash):
+    """Récupérer une session persistée par le hash de son jeton."""
+    conn = get_db_connection()
+    try:
+        row = conn.execute(SELECT_SESSION, (token_hash,)).fetchone()
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la récupération de la session: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def delete_persisted_session(token_hash=None, before=None):
+    """Supprimer une session persistée, ou toutes celles expirées avant `before`."""
+    conn = get_db_connection()
+    try:
+        if token_hash is not None:
+            cursor = conn.execute("DELETE FROM sessions WHERE token_hash = ?", (token_hash,))
+        else:
+            cursor = conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (before,))
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la suppression de session: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def get_audit_head():
+    """Dernier événement du journal d'audit : (id, empreinte), ou None si le journal est vide."""
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT id, hash FROM audit_events ORDER BY id DESC LIMIT 1").fetchone()
+        return (row["id"], bytes(row["hash"])) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la lecture du journal d'audit: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def append_audit_events(rows):
+    """
+    Ajouter un lot d'événements (id, ts, event, user_id, entry_id, subject, source, hash)
+    dans une seule transaction. Retourne False, sans rien écrire, si un autre
+    processus a déjà utilisé l'un des ids : l'appelant relit la tête du journal.
+    """
+    conn = get_db_connection()
+    try:
+        conn.executemany(
+            "INSERT INTO audit_events (id, ts, event, user_id, entry_id, subject, source, hash) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        conn.commit()
+        return True
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        return False
+    except sqlite3.Error as e:
+        conn.rollback()
+        logger.error(f"Erreur lors de l'écriture du journal d'audit: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def get_audit_events_page(after_id=0, limit=1000):
+    """Lire les événements d'audit bruts (avec leur empreinte), triés par id."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            "SELECT id, ts, event, user_id, entry_id, subject, source, hash FROM audit_events "
+            "WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit)
+        )
+        return [tuple(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la lecture du journal d'audit: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
+
+def query_audit_events(start=None, end=None, user_id=None, entry_id=None, events=None, limit=1000):
+    """Événements d'audit de [start, end[, filtrés par utilisateur, entrée et type, par date croissante."""
+    conditions, params = [], []
+    if user_id is not None:
+        conditions.append("a.user_id = ?")
+        params.append(user_id)
+    if entry_id is not None:
+        conditions.append("a.entry_id = ?")
+        params.append(entry_id)
+    if start is not None:
+        conditions.append("a.ts >= ?")
+        params.append(start)
+    if end is not None:
+        conditions.append("a.ts < ?")
+        params.append(end)
+    if events:
+        conditions.append(f"a.event IN ({', '.join('?' * len(events))})")
+        params.extend(events)
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            SELECT_AUDIT_EVENTS.format(conditions=" AND ".join(conditions) or "1"), (*params, limit)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors de la recherche dans le journal d'audit: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
@@ -1,51 +1,69 @@
 # decorators.py
+import functools
 import logging
 import time
 from typing import Callable, Any
 
+from metrics import registry
+
 logger = logging.getLogger(__name__)
 
+def _mask(value: Any) -> Any:
+    """Masquer les chaînes longues (mots de passe, jetons) dans les logs."""
+    return "*****" if isinstance(value, str) and len(value) > 10 else value
+
 def log_function_call(func: Callable) -> Callable:
     """
-    Décorateur pour journaliser les appels de fonction.
-    Enregistre les informations sur l'entrée et la sortie de la fonction,
-    ainsi que le temps d'exécution.
+    Décorateur d'instrumentation des appels de fonction.
+    Chaque appel alimente en mémoire le nombre d'appels, d'erreurs et un
+    histogramme de latence (voir metrics.registry). Les arguments masqués et
+    la durée ne sont formatés et journalisés que si le niveau DEBUG est actif.
     """
+    metric = registry.get(func.__qualname__)
+    perf_counter = time.perf_counter
 
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        func_name = func.__name__
-        logger.info(f"Appel de la fonction {func_name}")
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug(
+                "Appel de %s - Arguments: %s, Kwargs: %s",
+                func.__qualname__,
+                [_mask(arg) for arg in args],
+                {k: _mask(v) for k, v in kwargs.items()}
+            )
         
+        start_time = perf_counter()
         try:
-            # Masquer les informations sensibles dans les logs
-            safe_args = ["*****" if isinstance(arg, str) and len(arg) > 10 else arg for arg in args]
-            safe_kwargs = {k: "*****" if isinstance(v, str) and len(v) > 10 else v for k, v in kwargs.items()}
-            
-            logger.debug(f"Arguments: {safe_args}, Kwargs: {safe_kwargs}")
-            
-            start_time = time.time()
             result = func(*args, **kwargs)
-            execution_time = time.time() - start_time
-            
-            logger.info(f"Fonction {func_name} exécutée en {execution_time:.4f} secondes")
-            return result
         except Exception as e:
-            logger.error(f"Erreur lors de l'exécution de {func_name}: {str(e)}")
+            metric.observe(perf_counter() - start_time, failed=True)
+            logger.error("Erreur lors de l'exécution de %s: %s", func.__qualname__, e)
             raise
+        execution_time = perf_counter() - start_time
+        metric.observe(execution_time)
+        
+        if debug:
+            logger.debug("Fonction %s exécutée en %.4f secondes", func.__qualname__, execution_time)
+        return result
     
     return wrapper
 
 def requires_auth(func: Callable) -> Callable:
     """
     Décorateur pour vérifier l'authentification de l'utilisateur.
-    Vérifie si l'utilisateur est connecté avant d'autoriser l'accès à la fonction.
+    La méthode décorée est appelée avec un jeton de session en premier argument ;
+    le jeton est validé en mémoire via `self.sessions` (sans accès à la base)
+    et remplacé par l'objet Session correspondant avant l'appel.
     """
-    def wrapper(self, *args, **kwargs):
-        if not hasattr(self, 'current_user') or self.current_user is None:
+    @functools.wraps(func)
+    def wrapper(self, session_token, *args, **kwargs):
+        session = self.sessions.get(session_token)
+        if session is None:
             logger.warning("Tentative d'accès non autorisé à une fonction protégée")
             raise PermissionError("Authentification requise pour accéder à cette fonctionnalité")
         
-        logger.info(f"Accès autorisé pour l'utilisateur {self.current_user['username']} à la fonction {func.__name__}")
-        return func(self, *args, **kwargs)
+        logger.debug("Accès autorisé pour l'utilisateur %s à la fonction %s", session.username, func.__name__)
+        return func(self, session, *args, **kwargs)
     
     return wrapper
\ No newline at end of file
@@ -0,0 +1,258 @@
+# key_rotation.py
+"""
+Rotation de la clé de chiffrement Fernet.
+
+    python key_rotation.py rotate [--workers N] [--chunk-size N]   # nouvelle clé + rechiffrement
+    python key_rotation.py resume                                  # reprendre un rechiffrement interrompu
+    python key_rotation.py status
+    python key_rotation.py retire                                  # supprimer les anciennes clés
+
+Après `rotate`, la nouvelle clé chiffre les nouvelles entrées et les anciennes
+restent utilisables en lecture (MultiFernet) : le coffre reste lisible pendant
+tout le rechiffrement. Les entrées au format binaire ne sont pas rechiffrées :
+seules les clés de données des utilisateurs (data_keys.py) sont réenveloppées.
+Les processus déjà lancés (server.py) relisent les fichiers de clés quand ils
+changent (au plus toutes les KEY_FILES_CHECK_INTERVAL secondes, ou aussitôt
+qu'un jeton est refusé). `retire` vérifie que chaque entrée se déchiffre avec
+la seule clé principale avant d'oublier les anciennes clés.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional
+
+from config import Config
+from database import (
+    transaction, count_passwords, get_encrypted_passwords_page, replace_encrypted_passwords,
+    get_key_rotation, create_key_rotation, update_key_rotation, get_user_keys_page
+)
+from security import reset_cipher, rotate_encrypted_passwords
+
+logger = logging.getLogger(__name__)
+
+def key_fingerprint(key: bytes) -> str:
+    """Empreinte courte d'une clé, pour l'identifier sans la divulguer."""
+    return hashlib.sha256(key.strip()).hexdigest()[:16]
+
+def _write_private(path: str, data: bytes) -> None:
+    """Écrire un fichier de clés lisible par le seul propriétaire, de façon atomique."""
+    tmp_path = f"{path}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def generate_new_key() -> str:
+    """
+    Générer une nouvelle clé principale ; l'ancienne rejoint les clés retirées,
+    encore acceptées en déchiffrement. Retourne l'empreinte de la nouvelle clé.
+    """
+    from cryptography.fernet import Fernet
+
+    old_key = Config.get_encryption_key().strip()
+    retired = [old_key] + [key for key in Config.get_retired_encryption_keys() if key != old_key]
+    # Les anciennes clés sont sauvegardées avant de remplacer la clé principale
+    _write_private(Config.RETIRED_KEYS_PATH, b"\n".join(retired) + b"\n")
+    new_key = Fernet.generate_key()
+    _write_private(Config.ENCRYPTION_KEY_PATH, new_key)
+    reset_cipher()
+    fingerprint = key_fingerprint(new_key)
+    logger.info(f"Nouvelle clé de chiffrement {fingerprint} ({len(retired)} ancienne(s) clé(s) conservée(s))")
+    return fingerprint
+
+class KeyRotationJob:
+    """
+    Rechiffrer tout le coffre avec la clé principale, par blocs triés par id.
+    Chaque bloc et son point de reprise sont validés dans la même transaction :
+    une exécution interrompue reprend au dernier bloc validé.
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None, workers: Optional[int] = None,
+                 progress_interval: float = 5.0):
+        self.chunk_size = chunk_size or Config.KEY_ROTATION_CHUNK_SIZE
+        self.workers = Config.KEY_ROTATION_WORKERS if workers is None else workers
+        self.progress_interval = progress_interval
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._progress: Dict[str, Any] = {"status": "pending", "rows_done": 0, "total_rows": 0, "last_id": 0,
+                                          "rows_per_sec": 0.0, "eta_seconds": None}
+
+    def progress(self) -> Dict[str, Any]:
+        """Avancement : lignes traitées, total, débit (lignes/s) et temps restant estimé."""
+        with self._lock:
+            return dict(self._progress)
+
+    def _update_progress(self, **values) -> None:
+        with self._lock:
+            self._progress.update(values)
+
+    def start(self) -> threading.Thread:
+        """Lancer le rechiffrement dans un thread d'arrière-plan."""
+        self._thread = threading.Thread(target=self.run, name="key-rotation", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Interrompre après le bloc en cours ; le point de reprise reste enregistré."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run(self) -> Dict[str, Any]:
+        fingerprint = key_fingerprint(Config.get_encryption_key())
+        rotation = get_key_rotation(fingerprint)
+        if rotation is None:
+            rotation = create_key_rotation(fingerprint, count_passwords(), time.time())
+        elif rotation["status"] == "completed":
+            logger.info(f"Coffre déjà rechiffré avec la clé {fingerprint}")
+            self._update_progress(status="completed", rows_done=rotation["rows_done"],
+                                  total_rows=rotation["total_rows"], last_id=rotation["last_id"])
+            return self.progress()
+        else:
+            logger.info(f"Reprise du rechiffrement {fingerprint} après l'id {rotation['last_id']}")
+
+        last_id, rows_done = rotation["last_id"], rotation["rows_done"]
+        # Les entrées ajoutées depuis le début de la rotation sont aussi parcourues
+        total_rows = rows_done + count_passwords(last_id)
+        self._update_progress(status="running", rows_done=rows_done, total_rows=total_rows, last_id=last_id)
+
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        start_time = time.perf_counter()
+        last_report = start_time
+        processed = 0
+        try:
+            while not self._stop_event.is_set():
+                page = get_encrypted_passwords_page(last_id, self.chunk_size)
+                if not page:
+                    break
+                rotated = rotate_encrypted_passwords([token for _, token in page], executor)
+                last_id = page[-1][0]
+                rows_done += len(page)
+                with transaction():
+                    replace_encrypted_passwords([
+                        (new_token, password_id, old_token)
+                        for (password_id, old_token), new_token in zip(page, rotated) if new_token != old_token
+                    ])
+                    update_key_rotation(rotation["id"], last_id, rows_done, time.time())
+
+                processed += len(page)
+                elapsed = time.perf_counter() - start_time
+                rate = processed / elapsed if elapsed else 0.0
+                total_rows = max(total_rows, rows_done)
+                self._update_progress(rows_done=rows_done, total_rows=total_rows, last_id=last_id, rows_per_sec=rate,
+                                      eta_seconds=(total_rows - rows_done) / rate if rate else None)
+                if time.perf_counter() - last_report >= self.progress_interval:
+                    last_report = time.perf_counter()
+                    logger.info(f"Rotation {fingerprint}: {rows_done}/{total_rows} lignes ({rate:.0f} lignes/s)")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        if self._stop_event.is_set():
+            logger.info(f"Rotation {fingerprint} interrompue après l'id {last_id}")
+            self._update_progress(status="stopped")
+            return self.progress()
+
+        from data_keys import rewrap_user_keys, reset_user_ciphers
+        rewrap_user_keys(self.chunk_size)
+        reset_user_ciphers()
+        update_key_rotation(rotation["id"], last_id, rows_done, time.time(), status="completed", finished_at=time.time())
+        progress = self.progress()
+        logger.info(
+            f"Rotation {fingerprint} terminée: {processed} lignes rechiffrées "
+            f"({progress['rows_per_sec']:.0f} lignes/s)"
+        )
+        self._update_progress(status="completed", eta_seconds=0)
+        return self.progress()
+
+def retire_old_keys(chunk_size: Optional[int] = None) -> int:
+    """
+    Supprimer les anciennes clés après avoir vérifié que toutes les entrées au
+    format Fernet et toutes les clés de données se déchiffrent avec la clé
+    principale seule. Retourne le nombre d'éléments vérifiés.
+    """
+    from cryptography.fernet import Fernet, InvalidToken
+
+    primary = Fernet(Config.get_encryption_key())
+    chunk_size = chunk_size or Config.KEY_ROTATION_CHUNK_SIZE
+    checked, stale, last_id = 0, 0, 0
+    while True:
+        page = get_encrypted_passwords_page(last_id, chunk_size)
+        if not page:
+            break
+        for _, token in page:
+            if not isinstance(token, str):
+                # Format binaire : chiffré par une clé de données, vérifiée ci-dessous
+                continue
+            try:
+                primary.decrypt(token.encode('utf-8'))
+            except InvalidToken:
+                stale += 1
+        checked += len(page)
+        last_id = page[-1][0]
+    last_id = 0
+    while True:
+        page = get_user_keys_page(last_id, chunk_size)
+        if not page:
+            break
+        for _, wrapped_key in page:
+            try:
+                primary.decrypt(bytes(wrapped_key))
+            except InvalidToken:
+                stale += 1
+        checked += len(page)
+        last_id = page[-1][0]
+    if stale:
+        raise RuntimeError(f"{stale} entrée(s) encore chiffrée(s) avec une ancienne clé; relancez `resume`")
+    if os.path.exists(Config.RETIRED_KEYS_PATH):
+        os.remove(Config.RETIRED_KEYS_PATH)
+    reset_cipher()
+    logger.info(f"Anciennes clés supprimées après vérification de {checked} entrées")
+    return checked
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rotation de la clé de chiffrement")
+    parser.add_argument("action", choices=["rotate", "resume", "status", "retire"])
+    parser.add_argument("--chunk-size", type=int, default=None, help="Lignes rechiffrées par transaction")
+    parser.add_argument("--workers", type=int, default=None, help="Processus de chiffrement (1 = aucun)")
+    args = parser.parse_args(argv)
+
+    # Import tardif : main.py configure la journalisation au chargement
+    from main import PasswordManager
+    PasswordManager()
+
+    if args.action == "status":
+        fingerprint = key_fingerprint(Config.get_encryption_key())
+        rotation = get_key_rotation(fingerprint)
+        retired = len(Config.get_retired_encryption_keys())
+        if rotation is None:
+            print(f"Clé {fingerprint}: aucune rotation enregistrée, {retired} ancienne(s) clé(s)")
+        else:
+            print(f"Clé {fingerprint}: {rotation['status']}, {rotation['rows_done']}/{rotation['total_rows']} lignes, "
+                  f"{retired} ancienne(s) clé(s)")
+        return 0
+    if args.action == "retire":
+        try:
+            print(f"{retire_old_keys(args.chunk_size)} entrées et clés de données vérifiées, anciennes clés supprimées")
+        except RuntimeError as e:
+            print(f"Erreur: {e}")
+            return 1
+        return 0
+
+    if args.action == "rotate":
+        generate_new_key()
+    progress = KeyRotationJob(args.chunk_size, args.workers).run()
+    print(f"{progress['rows_done']}/{progress['total_rows']} lignes rechiffrées "
+          f"({progress['rows_per_sec']:.0f} lignes/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,109 @@
 # logging_config.py
 import os
-import yaml
+import atexit
+import queue
 import logging
 import logging.config
+import logging.handlers
+
+from metrics import registry as metrics_registry
+
+# Options par défaut du mode journalisation en file d'attente (section `queue` du YAML)
+DEFAULT_QUEUE_OPTIONS = {
+    'enabled': True,
+    'maxsize': 10000,
+    'policy': 'drop',  # 'drop' (abandon immédiat, jamais d'attente) ou 'block' (attente bornée, contre-pression)
+    'block_timeout': 0.5,  # secondes, pour la politique 'block'
+    'handlers': ['file', 'error_file']
+}
+
+_listener = None
+_queue_handler = None
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler sur une file bornée. Quand la file est pleine, l'enregistrement est
+    soit abandonné immédiatement ('drop', par défaut : l'appelant n'attend jamais),
+    soit attendu au plus `block_timeout` secondes ('block', contre-pression) avant
+    d'être abandonné. Les abandons sont comptés.
+    """
+
+    def __init__(self, record_queue, policy='drop', block_timeout=0.5):
+        super().__init__(record_queue)
+        if policy not in ('block', 'drop'):
+            raise ValueError(f"Politique de file inconnue: {policy}")
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            if self.policy == 'drop':
+                self.queue.put_nowait(record)
+            else:
+                self.queue.put(record, timeout=self.block_timeout)
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self):
+        return {'queued': self.queue.qsize(), 'maxsize': self.queue.maxsize, 'dropped': self.dropped}
+
+def _stop_listener():
+    """Vider la file et arrêter le thread d'écriture."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+def _enable_queue(options):
+    """
+    Déplacer les gestionnaires choisis de la racine vers un thread d'écriture dédié,
+    derrière un QueueHandler : les appels de journalisation ne touchent plus le disque.
+    """
+    global _listener, _queue_handler
+    root = logging.getLogger()
+    queued = [h for h in root.handlers if h.name in options['handlers']]
+    if not queued:
+        return
+    for handler in queued:
+        root.removeHandler(handler)
+
+    record_queue = queue.Queue(maxsize=options['maxsize'])
+    _queue_handler = BoundedQueueHandler(record_queue, options['policy'], options['block_timeout'])
+    root.addHandler(_queue_handler)
+    _listener = logging.handlers.QueueListener(record_queue, *queued, respect_handler_level=True)
+    _listener.start()
+    metrics_registry.register_gauge(
+        "password_manager_log_queue", "File d'attente de journalisation.", get_log_queue_stats
+    )
+
+def get_log_queue_stats():
+    """Taille de la file de journalisation et nombre d'enregistrements abandonnés."""
+    if _queue_handler is None:
+        return {'queued': 0, 'maxsize': 0, 'dropped': 0}
+    return _queue_handler.stats()
+
+atexit.register(_stop_listener)
 
 def setup_logging(config_path="logging_config.yaml", default_level=logging.INFO):
     """
     Configure la journalisation à partir d'un fichier YAML.
     """
+    import yaml  # importé au premier usage : hors du temps d'import de main
     if os.path.exists(config_path):
         with open(config_path, 'rt') as f:
             try:
-                config = yaml.safe_load(f.read())
+                # Chargeur C de PyYAML quand il est disponible (plus rapide au démarrage)
+                config = yaml.load(f.read(), Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+                queue_options = {**DEFAULT_QUEUE_OPTIONS, **(config.pop('queue', None) or {})}
+                queue_options['enabled'] = bool(queue_options['enabled'])
+                _stop_listener()
                 logging.config.dictConfig(config)
+                if queue_options['enabled']:
+                    _enable_queue(queue_options)
             except Exception as e:
                 print(f"Erreur lors du chargement de la configuration de journalisation: {e}")
                 logging.basicConfig(level=default_level)
@@ -25,6 +116,7 @@ def create_default_logging_config():
     """
     Crée un fichier de configuration YAML par défaut pour la journalisation.
     """
+    import yaml
     config = {
         'version': 1,
         'disable_existing_loggers': False,
@@ -66,7 +158,9 @@ def create_default_logging_config():
                 'level': 'DEBUG',
                 'propagate': True
             }
-        }
+        },
+        # Écriture des fichiers de log dans un thread dédié (voir setup_logging)
+        'queue': dict(DEFAULT_QUEUE_OPTIONS)
     }
     
     with open('logging_config.yaml', 'w') as f:
@@ -1,29 +1,74 @@
 # main.py
 import logging
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Iterable, Iterator
 import getpass
+import hashlib
+import os
 import sys
+import time
 
-from models import UserRegistration, UserLogin, PasswordEntry
-from database import (
-    initialize_database, add_user, get_user_by_username,
-    add_password, get_passwords_by_user_id, get_password_by_id
-)
-from security import hash_password, verify_password, encrypt_password, decrypt_password
+# Les modules lourds (pydantic via models, cryptography, bulk_transfer) sont
+# importés au premier usage pour accélérer le démarrage de la CLI
+from config import Config
+from storage import StorageBackend, get_backend
+from database import SECRET_COLUMNS
+from breach_index import is_breached
+from security import hash_password, verify_password, needs_rehash, decrypt_passwords
+from data_keys import get_user_cipher
 from decorators import log_function_call, requires_auth
+from metrics import registry as metrics_registry
+from sessions import SessionManager, Session
+from throttle import LoginThrottle
+from secret_cache import SecretCache
+import audit
 from logging_config import setup_logging, create_default_logging_config
 
-# Initialiser la journalisation
-create_default_logging_config()
-setup_logging()
 logger = logging.getLogger(__name__)
 
+_logging_configured = False
+
+def configure_logging() -> None:
+    """
+    Initialiser la journalisation une seule fois (le fichier par défaut n'est écrit
+    que s'il manque). Appelé par PasswordManager() plutôt qu'à l'import du module :
+    la lecture du YAML (et l'import de PyYAML) ne pèse plus sur `import main`.
+    """
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+    if not os.path.exists(Config.LOGGING_CONFIG_PATH):
+        create_default_logging_config()
+    setup_logging(Config.LOGGING_CONFIG_PATH)
+
+# Nombre d'entrées affichées par page dans le menu
+PAGE_SIZE = 20
+
 class PasswordManager:
-    def __init__(self):
-        self.current_user = None
+    def __init__(self, storage: Optional[StorageBackend] = None):
+        configure_logging()
+        # Moteur de stockage : celui de Config.STORAGE_BACKEND, sauf s'il est fourni
+        self.storage = storage or get_backend()
+        self.sessions = SessionManager()
+        self.throttle = LoginThrottle(storage=self.storage)
+        self.audit = audit.get_audit_log(self.storage)
+        metrics_registry.register_gauge(
+            "password_manager_sessions", "Sessions actives et compteurs de cycle de vie.", self.sessions.stats
+        )
+        metrics_registry.register_gauge(
+            "password_manager_login_throttle", "Tentatives de connexion autorisées, limitées et verrouillées.",
+            self.throttle.stats
+        )
+        metrics_registry.register_gauge(
+            "password_manager_storage", "Statistiques du moteur de stockage (pool SQLite, cache de lecture).",
+            self.storage.stats
+        )
+        metrics_registry.register_gauge(
+            "password_manager_audit", "Événements d'audit en file, écrits et perdus.", self.audit.stats
+        )
         # Initialiser la base de données
         try:
-            initialize_database()
+            self.storage.initialize()
             logger.info("Application de gestion de mots de passe initialisée")
         except Exception as e:
             logger.critical(f"Échec de l'initialisation de l'application: {e}")
@@ -32,6 +77,7 @@ class PasswordManager:
     @log_function_call
     def register_user(self, username: str, email: str, password: str) -> bool:
         """Enregistrer un nouvel utilisateur."""
+        from models import UserRegistration
         try:
             # Valider les données utilisateur avec Pydantic
             user_data = UserRegistration(username=username, email=email, password=password)
@@ -40,7 +86,7 @@ class PasswordManager:
             hashed_password = hash_password(user_data.password)
             
             # Ajouter l'utilisateur à la base de données
-            user_id = add_user(user_data.username, hashed_password, user_data.email)
+            user_id = self.storage.add_user(user_data.username, hashed_password, user_data.email)
             
             logger.info(f"Utilisateur {username} enregistré avec succès")
             return True
@@ -54,53 +100,90 @@ class PasswordManager:
             return False
     
     @log_function_call
-    def login_user(self, username: str, password: str) -> bool:
-        """Connecter un utilisateur existant."""
+    def login_user(self, username: str, password: str, source: Optional[str] = None) -> Optional[str]:
+        """
+        Connecter un utilisateur existant et retourner un jeton de session (None en cas d'échec).
+        `source` identifie l'origine de la tentative (ex. uid du client) pour la limitation.
+        """
+        from models import UserLogin
         try:
             # Valider les données de connexion
             login_data = UserLogin(username=username, password=password)
             
+            # Refuser les tentatives trop rapprochées avant toute requête ou calcul bcrypt
+            retry_after = self.throttle.acquire(login_data.username, source)
+            if retry_after:
+                logger.warning(f"Tentative de connexion limitée pour {username} (réessayer dans {retry_after:.0f} s)")
+                self.audit.record(audit.LOGIN_THROTTLED, subject=login_data.username, source=source)
+                print(f"Erreur: Trop de tentatives de connexion, réessayez dans {retry_after:.0f} s")
+                return None
+            
             # Récupérer l'utilisateur depuis la base de données
-            user = get_user_by_username(login_data.username)
+            user = self.storage.get_user_by_username(login_data.username)
             if not user:
                 logger.warning(f"Tentative de connexion avec un nom d'utilisateur inexistant: {username}")
+                self.audit.record(audit.LOGIN_FAILED, subject=login_data.username, source=source)
                 print("Erreur: Nom d'utilisateur ou mot de passe incorrect")
-                return False
+                self.throttle.record_failure(login_data.username, source)
+                return None
             
             # Vérifier le mot de passe
             if not verify_password(login_data.password, user['password_hash']):
                 logger.warning(f"Tentative de connexion avec un mot de passe incorrect pour {username}")
+                self.audit.record(audit.LOGIN_FAILED, user['id'], subject=login_data.username, source=source)
                 print("Erreur: Nom d'utilisateur ou mot de passe incorrect")
-                return False
+                self.throttle.record_failure(login_data.username, source)
+                return None
+            self.throttle.record_success(login_data.username, source)
+            
+            # Mettre à jour le hash s'il a été calculé avec un ancien coût bcrypt
+            if needs_rehash(user['password_hash']):
+                self._rehash_user_password(user, login_data.password)
             
-            # Stocker l'utilisateur connecté
-            self.current_user = user
+            # Ouvrir une session pour l'utilisateur connecté
+            session_token = self.sessions.create(user)
+            self.audit.record(audit.LOGIN_SUCCEEDED, user['id'], source=source)
             logger.info(f"Utilisateur {username} connecté avec succès")
-            return True
+            return session_token
         except Exception as e:
             logger.error(f"Erreur lors de la connexion: {e}")
             print(f"Erreur: Une erreur inattendue s'est produite")
-            return False
+            return None
+    
+    def _rehash_user_password(self, user: Dict[str, Any], password: str) -> None:
+        """Recalculer le hash au coût bcrypt actuel après une connexion réussie."""
+        try:
+            self.storage.update_user_password_hash(user['id'], hash_password(password))
+            logger.info(f"Hash du mot de passe de {user['username']} mis à jour au coût actuel")
+        except Exception as e:
+            # Le rehachage ne doit jamais empêcher la connexion
+            logger.error(f"Échec du rehachage du mot de passe de {user['username']}: {e}")
     
     @requires_auth
     @log_function_call
-    def store_password(self, site_name: str, username: str, password: str, notes: Optional[str] = None) -> bool:
-        """Stocker un nouveau mot de passe pour l'utilisateur connecté."""
+    def store_password(self, session: Session, site_name: str, username: str, password: str, notes: Optional[str] = None) -> bool:
+        """Stocker un nouveau mot de passe pour l'utilisateur de la session."""
+        from models import PasswordEntry
         try:
             # Valider les données du mot de passe
             password_data = PasswordEntry(site_name=site_name, username=username, password=password, notes=notes)
             
-            # Chiffrer le mot de passe
-            encrypted_password = encrypt_password(password_data.password)
+            if is_breached(password_data.password):
+                logger.warning(f"Mot de passe divulgué stocké pour {site_name}")
+                print("Attention: ce mot de passe figure dans une liste de mots de passe divulgués, pensez à le changer.")
+            
+            # Chiffrer le mot de passe avec la clé de données de l'utilisateur
+            encrypted_password = get_user_cipher(session.user_id, self.storage).encrypt(password_data.password)
             
             # Ajouter le mot de passe à la base de données
-            add_password(
-                self.current_user['id'],
+            password_id = self.storage.add_password(
+                session.user_id,
                 password_data.site_name,
                 password_data.username,
                 encrypted_password,
                 password_data.notes
             )
+            self.audit.record(audit.SECRET_CREATED, session.user_id, password_id)
             
             logger.info(f"Mot de passe pour {site_name} stocké avec succès")
             return True
@@ -111,36 +194,145 @@ class PasswordManager:
     
     @requires_auth
     @log_function_call
-    def retrieve_passwords(self) -> List[Dict[str, Any]]:
-        """Récupérer tous les mots de passe de l'utilisateur connecté."""
+    def update_password(self, session: Session, password_id: int, site_name: Optional[str] = None,
+                        username: Optional[str] = None, password: Optional[str] = None,
+                        notes: Optional[str] = None) -> bool:
+        """Modifier une entrée de l'utilisateur de la session ; les champs à None restent inchangés."""
+        from models import PasswordEntry
         try:
-            passwords = get_passwords_by_user_id(self.current_user['id'])
-            logger.info(f"Récupération de {len(passwords)} mots de passe pour {self.current_user['username']}")
+            current = self.storage.get_password_by_id(password_id, session.user_id)
+            if not current:
+                logger.warning(f"Tentative de modification d'un mot de passe inexistant: ID {password_id}")
+                print("Erreur: Mot de passe non trouvé")
+                return False
+            
+            # Valider l'entrée telle qu'elle sera après modification
+            # (le mot de passe actuel n'est pas déchiffré pour cela)
+            PasswordEntry(
+                site_name=site_name if site_name is not None else current['site_name'],
+                username=username if username is not None else current['username'],
+                password=password if password is not None else "-",
+                notes=notes if notes is not None else (current['notes'] or "")
+            )
+            
+            changes = {"site_name": site_name, "username": username, "notes": notes}
+            changes = {column: value for column, value in changes.items() if value is not None}
+            if password is not None:
+                if is_breached(password):
+                    logger.warning(f"Mot de passe divulgué enregistré pour l'entrée {password_id}")
+                    print("Attention: ce mot de passe figure dans une liste de mots de passe divulgués, pensez à le changer.")
+                changes["encrypted_password"] = get_user_cipher(session.user_id, self.storage).encrypt(password)
+            
+            updated = self.storage.update_password(password_id, session.user_id, changes)
+            self._invalidate_secret(session.user_id, password_id)
+            if updated:
+                self.audit.record(audit.SECRET_UPDATED, session.user_id, password_id)
+            return updated
+        except Exception as e:
+            logger.error(f"Erreur lors de la modification du mot de passe: {e}")
+            print("Erreur: Une erreur inattendue s'est produite")
+            return False
+    
+    @requires_auth
+    @log_function_call
+    def delete_password(self, session: Session, password_id: int) -> bool:
+        """Supprimer une entrée de l'utilisateur de la session."""
+        try:
+            deleted = self.storage.delete_password(password_id, session.user_id)
+            self._invalidate_secret(session.user_id, password_id)
+            if deleted:
+                self.audit.record(audit.SECRET_DELETED, session.user_id, password_id)
+            else:
+                logger.warning(f"Tentative de suppression d'un mot de passe inexistant: ID {password_id}")
+                print("Erreur: Mot de passe non trouvé")
+            return deleted
+        except Exception as e:
+            logger.error(f"Erreur lors de la suppression du mot de passe: {e}")
+            print("Erreur: Une erreur inattendue s'est produite")
+            return False
+    
+    @requires_auth
+    @log_function_call
+    def retrieve_passwords(self, session: Session, after_id: int = 0, limit: int = 50,
+                           columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Récupérer une page de mots de passe de l'utilisateur de la session.
+        Passer l'id de la dernière entrée reçue dans `after_id` pour obtenir la page suivante.
+        """
+        try:
+            passwords = self.storage.get_passwords_page(session.user_id, after_id, limit, columns)
+            logger.info(f"Récupération de {len(passwords)} mots de passe pour {session.username}")
             return passwords
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des mots de passe: {e}")
-            print(f"Erreur: Une erreur inattendue s'est produite")
+            print("Erreur: Une erreur inattendue s'est produite")
+            return []
+    
+    @requires_auth
+    @log_function_call
+    def search_passwords(self, session: Session, query: str, limit: Optional[int] = None, fuzzy: bool = False,
+                         columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Rechercher dans le site, le nom d'utilisateur et les notes des entrées de la session.
+        Avec `fuzzy`, les fautes de frappe sont tolérées. Les mots de passe ne sont pas déchiffrés.
+        """
+        limit = min(max(limit or Config.SEARCH_DEFAULT_LIMIT, 1), Config.SEARCH_MAX_LIMIT)
+        try:
+            results = self.storage.search_passwords(session.user_id, query, limit, fuzzy, columns)
+            logger.info(f"Recherche pour {session.username}: {len(results)} résultat(s)")
+            return results
+        except Exception as e:
+            logger.error(f"Erreur lors de la recherche de mots de passe: {e}")
+            print("Erreur: Une erreur inattendue s'est produite")
             return []
     
+    @requires_auth
+    def iter_passwords(self, session: Session, page_size: int = 500,
+                       columns: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Parcourir tous les mots de passe de l'utilisateur de la session, page par page."""
+        for page in self.storage.iter_passwords_by_user_id(session.user_id, page_size, columns):
+            yield from page
+    
     @requires_auth
     @log_function_call
-    def retrieve_password(self, password_id: int) -> Optional[Dict[str, Any]]:
+    def retrieve_password(self, session: Session, password_id: int) -> Optional[Dict[str, Any]]:
         """Récupérer et déchiffrer un mot de passe spécifique."""
         try:
+            # Cache de la session : évite la requête SQLite et le déchiffrement
+            if session.secret_cache is not None:
+                cached_entry = session.secret_cache.get(password_id)
+                if cached_entry is not None:
+                    self.audit.record(audit.SECRET_READ, session.user_id, password_id)
+                    logger.info(f"Mot de passe récupéré depuis le cache: ID {password_id}")
+                    return cached_entry
+            
+            # Relevé avant la lecture : une écriture concurrente empêchera la mise en cache
+            cache = session.secret_cache
+            generation = cache.generation() if cache is not None else None
+            
             # Récupérer le mot de passe chiffré
-            password_entry = get_password_by_id(password_id, self.current_user['id'])
+            password_entry = self.storage.get_password_by_id(password_id, session.user_id)
             if not password_entry:
                 logger.warning(f"Tentative d'accès à un mot de passe inexistant: ID {password_id}")
                 print("Erreur: Mot de passe non trouvé")
                 return None
             
-            # Déchiffrer le mot de passe
-            decrypted_password = decrypt_password(password_entry['encrypted_password'])
+            # Déchiffrer le mot de passe (format binaire ou ancien jeton Fernet)
+            encrypted_password = password_entry['encrypted_password']
+            cipher = get_user_cipher(session.user_id, self.storage, [encrypted_password])
+            decrypted_password = cipher.decrypt(encrypted_password)
             
             # Remplacer le mot de passe chiffré par le mot de passe déchiffré
             password_entry['password'] = decrypted_password
             del password_entry['encrypted_password']
             
+            if cache is not None:
+                # Mise en cache à la validation de la transaction en cours : une valeur
+                # annulée par un rollback n'y entre jamais
+                cached_entry = dict(password_entry)
+                self.storage.after_commit(lambda: cache.put(password_id, cached_entry, generation))
+            
+            self.audit.record(audit.SECRET_READ, session.user_id, password_id)
             logger.info(f"Mot de passe récupéré avec succès: ID {password_id}")
             return password_entry
         except Exception as e:
@@ -148,20 +340,158 @@ class PasswordManager:
             print(f"Erreur: Une erreur inattendue s'est produite")
             return None
     
-    def logout(self) -> None:
-        """Déconnecter l'utilisateur actuel."""
-        if self.current_user:
-            logger.info(f"Déconnexion de l'utilisateur {self.current_user['username']}")
-            self.current_user = None
+    @requires_auth
+    def retrieve_password_bulk(self, session: Session, password_ids: Optional[Iterable[int]] = None,
+                               chunk_size: int = 500, workers: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        Récupérer et déchiffrer plusieurs entrées en flux, triées par id : une
+        requête IN par bloc de `chunk_size` ids (tout le coffre, par pagination
+        par clé, si `password_ids` est None), puis un déchiffrement groupé du
+        bloc, réparti sur `workers` processus si > 1. Les ids inconnus sont
+        ignorés. Chaque secret lu est inscrit au journal d'audit ; le cache des
+        secrets de la session n'est pas utilisé.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        
+        if password_ids is None:
+            chunks = self.storage.iter_passwords_by_user_id(session.user_id, chunk_size, SECRET_COLUMNS)
+        else:
+            password_ids = sorted(set(password_ids))
+            chunks = (
+                self.storage.get_passwords_by_ids(session.user_id, password_ids[start:start + chunk_size], SECRET_COLUMNS)
+                for start in range(0, len(password_ids), chunk_size)
+            )
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        retrieved = 0
+        try:
+            for rows in chunks:
+                tokens = [row.pop('encrypted_password') for row in rows]
+                cipher = get_user_cipher(session.user_id, self.storage, tokens)
+                for row, password in zip(rows, decrypt_passwords(tokens, executor, cipher)):
+                    row['password'] = password
+                self.audit.record_many(audit.SECRET_READ, session.user_id, [row['id'] for row in rows])
+                retrieved += len(rows)
+                yield from rows
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération groupée des mots de passe: {e}")
+            raise
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        if password_ids is not None and retrieved < len(password_ids):
+            logger.warning(f"{len(password_ids) - retrieved} mot(s) de passe demandé(s) introuvable(s)")
+        logger.info(f"Récupération groupée de {retrieved} mots de passe pour {session.username}")
+    
+    @requires_auth
+    def enable_secret_cache(self, session: Session, max_entries: Optional[int] = None,
+                            ttl: Optional[float] = None) -> None:
+        """Activer pour cette session le cache des mots de passe déchiffrés (LRU avec durée de vie)."""
+        if session.secret_cache is None:
+            session.secret_cache = SecretCache(max_entries, ttl)
+            logger.info(f"Cache des secrets activé pour {session.username}")
+    
+    @requires_auth
+    def disable_secret_cache(self, session: Session) -> None:
+        """Désactiver le cache de la session en effaçant les secrets qu'il contient."""
+        if session.secret_cache is not None:
+            session.secret_cache.clear()
+            session.secret_cache = None
+    
+    @requires_auth
+    def secret_cache_stats(self, session: Session) -> Optional[Dict[str, int]]:
+        """Compteurs du cache de la session (None si le cache n'est pas activé)."""
+        return session.secret_cache.stats() if session.secret_cache is not None else None
+    
+    def _invalidate_secret(self, user_id: int, password_id: int) -> None:
+        """
+        À appeler après toute écriture sur une entrée pour purger les caches des sessions.
+        Purge immédiate, puis de nouveau à la validation de la transaction : une lecture
+        concurrente a pu remettre l'ancienne ligne en cache entre-temps.
+        """
+        self.sessions.invalidate_secret(user_id, password_id)
+        self.storage.after_commit(lambda: self.sessions.invalidate_secret(user_id, password_id))
+    
+    @requires_auth
+    @log_function_call
+    def import_passwords(self, session: Session, path: str, fmt: Optional[str] = None, chunk_size: int = 1000,
+                         workers: int = 0) -> Dict[str, Any]:
+        """Importer en masse des mots de passe depuis un fichier CSV/JSON/JSONL."""
+        from bulk_transfer import import_passwords
+        stats = import_passwords(session.user_id, path, fmt, chunk_size, workers, storage=self.storage)
+        self.audit.record(audit.SECRETS_IMPORTED, session.user_id, subject=os.path.basename(path))
+        return stats
+    
+    @requires_auth
+    @log_function_call
+    def export_passwords(self, session: Session, path: str, fmt: Optional[str] = None, chunk_size: int = 1000,
+                         workers: int = 0) -> Dict[str, Any]:
+        """Exporter en flux les mots de passe déchiffrés de l'utilisateur de la session."""
+        from bulk_transfer import export_passwords
+        stats = export_passwords(session.user_id, path, fmt, chunk_size, workers, storage=self.storage)
+        self.audit.record(audit.SECRETS_EXPORTED, session.user_id, subject=os.path.basename(path))
+        return stats
+    
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """Instantané des métriques d'appels, du stockage, des sessions et des connexions limitées."""
+        return {
+            "functions": metrics_registry.snapshot(),
+            "storage": self.storage.stats(),
+            "sessions": self.sessions.stats(),
+            "login_throttle": self.throttle.stats(),
+            "audit": self.audit.stats(),
+        }
+    
+    def render_metrics(self) -> str:
+        """Métriques au format texte de Prometheus."""
+        return metrics_registry.render_prometheus()
+    
+    @staticmethod
+    def _hash_token(session_token: str) -> str:
+        return hashlib.sha256(session_token.encode('utf-8')).hexdigest()
+    
+    @requires_auth
+    def persist_session(self, session: Session, ttl: Optional[float] = None) -> None:
+        """
+        Enregistrer la session en base (hash du jeton uniquement) pour qu'un autre
+        processus puisse la reprendre sans nouvelle vérification bcrypt.
+        """
+        expires_at = time.time() + (ttl or Config.CLI_SESSION_TTL)
+        self.storage.save_session(self._hash_token(session.token), session.user_id, session.username, expires_at)
+    
+    def resume_session(self, session_token: Optional[str]) -> bool:
+        """Reprendre une session persistée par un autre processus. Retourne False si elle est invalide."""
+        if not session_token:
+            return False
+        if self.sessions.get(session_token) is not None:
+            return True
+        persisted = self.storage.get_persisted_session(self._hash_token(session_token))
+        if persisted is None:
+            return False
+        remaining = persisted['expires_at'] - time.time()
+        if remaining <= 0:
+            self.storage.delete_persisted_session(self._hash_token(session_token))
+            return False
+        self.sessions.adopt(session_token, persisted['user_id'], persisted['username'], remaining)
+        return True
+    
+    def logout(self, session_token: Optional[str]) -> None:
+        """Fermer la session associée au jeton (y compris sa version persistée)."""
+        session = self.sessions.get(session_token)
+        if session is not None:
+            logger.info(f"Déconnexion de l'utilisateur {session.username}")
+            self.sessions.revoke(session_token)
+            self.storage.delete_persisted_session(self._hash_token(session_token))
         else:
             logger.warning("Tentative de déconnexion sans utilisateur connecté")
 
 def main():
     """Fonction principale pour l'interface en ligne de commande."""
     password_manager = PasswordManager()
+    session_token = None
     
     while True:
-        if password_manager.current_user is None:
+        session = password_manager.sessions.get(session_token)
+        if session is None:
             print("\n--- Gestionnaire de Mots de Passe ---")
             print("1. Connexion")
             print("2. Inscription")
@@ -171,7 +501,8 @@ def main():
             if choice == "1":
                 username = input("Nom d'utilisateur: ")
                 password = getpass.getpass("Mot de passe: ")
-                if password_manager.login_user(username, password):
+                session_token = password_manager.login_user(username, password)
+                if session_token:
                     print(f"Bienvenue, {username}!")
             
             elif choice == "2":
@@ -195,11 +526,14 @@ def main():
                 print("Choix invalide, veuillez réessayer.")
         
         else:
-            print(f"\n--- Bienvenue, {password_manager.current_user['username']} ---")
+            print(f"\n--- Bienvenue, {session.username} ---")
             print("1. Stocker un nouveau mot de passe")
             print("2. Afficher tous les mots de passe")
             print("3. Récupérer un mot de passe spécifique")
-            print("4. Déconnexion")
+            print("4. Rechercher")
+            print("5. Modifier un mot de passe")
+            print("6. Supprimer un mot de passe")
+            print("7. Déconnexion")
             choice = input("Choix: ")
             
             if choice == "1":
@@ -208,22 +542,27 @@ def main():
                 password = getpass.getpass("Mot de passe: ")
                 notes = input("Notes (optionnel): ")
                 
-                if password_manager.store_password(site_name, username, password, notes):
+                if password_manager.store_password(session_token, site_name, username, password, notes):
                     print("Mot de passe stocké avec succès!")
             
             elif choice == "2":
-                passwords = password_manager.retrieve_passwords()
-                if passwords:
-                    print("\n--- Vos mots de passe ---")
+                passwords = password_manager.retrieve_passwords(session_token, limit=PAGE_SIZE)
+                if not passwords:
+                    print("Aucun mot de passe trouvé.")
+                    continue
+                
+                print("\n--- Vos mots de passe ---")
+                while passwords:
                     for pw in passwords:
                         print(f"ID: {pw['id']} | Site: {pw['site_name']} | Utilisateur: {pw['username']}")
-                else:
-                    print("Aucun mot de passe trouvé.")
+                    if len(passwords) < PAGE_SIZE or input("Page suivante ? (o/N): ").strip().lower() != "o":
+                        break
+                    passwords = password_manager.retrieve_passwords(session_token, after_id=passwords[-1]['id'], limit=PAGE_SIZE)
             
             elif choice == "3":
                 try:
                     password_id = int(input("ID du mot de passe: "))
-                    password_entry = password_manager.retrieve_password(password_id)
+                    password_entry = password_manager.retrieve_password(session_token, password_id)
                     
                     if password_entry:
                         print("\n--- Détails du mot de passe ---")
@@ -236,11 +575,53 @@ def main():
                     print("Veuillez entrer un ID valide.")
             
             elif choice == "4":
-                password_manager.logout()
+                query = input("Recherche: ")
+                results = password_manager.search_passwords(session_token, query, limit=PAGE_SIZE)
+                if not results:
+                    # Aucun résultat exact : tenter une recherche approchée
+                    results = password_manager.search_passwords(session_token, query, limit=PAGE_SIZE, fuzzy=True)
+                if not results:
+                    print("Aucun résultat.")
+                for pw in results:
+                    print(f"ID: {pw['id']} | Site: {pw['site_name']} | Utilisateur: {pw['username']}")
+            
+            elif choice == "5":
+                try:
+                    password_id = int(input("ID du mot de passe: "))
+                except ValueError:
+                    print("Veuillez entrer un ID valide.")
+                    continue
+                print("Laisser vide pour conserver la valeur actuelle.")
+                site_name = input("Nom du site: ") or None
+                username = input("Nom d'utilisateur: ") or None
+                password = getpass.getpass("Mot de passe: ") or None
+                notes = input("Notes: ") or None
+                
+                if password_manager.update_password(session_token, password_id, site_name, username, password, notes):
+                    print("Mot de passe modifié avec succès!")
+            
+            elif choice == "6":
+                try:
+                    password_id = int(input("ID du mot de passe: "))
+                except ValueError:
+                    print("Veuillez entrer un ID valide.")
+                    continue
+                if input("Confirmer la suppression ? (o/N): ").strip().lower() == "o":
+                    if password_manager.delete_password(session_token, password_id):
+                        print("Mot de passe supprimé.")
+            
+            elif choice == "7":
+                password_manager.logout(session_token)
+                session_token = None
                 print("Vous êtes déconnecté.")
             
             else:
                 print("Choix invalide, veuillez réessayer.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if "--profile-startup" in sys.argv:
+        # Rapport type `-X importtime` pour suivre la latence de démarrage à froid
+        from startup_profile import print_report
+        print_report(runs=5)
+    else:
+        main()
\ No newline at end of file
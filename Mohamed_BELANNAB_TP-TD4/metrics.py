@@ -0,0 +1,120 @@
+# metrics.py
+import threading
+from bisect import bisect_left
+from typing import Dict, Any, List, Tuple, Callable
+
+# Bornes supérieures des seaux de l'histogramme de latence, en secondes
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+class FunctionMetrics:
+    """Compteurs d'appels, d'erreurs et histogramme de latence d'une fonction."""
+    __slots__ = ("name", "calls", "errors", "total_seconds", "bucket_counts", "buckets", "_lock")
+
+    def __init__(self, name: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.buckets = buckets
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        # Un seau de plus pour les durées au-delà de la dernière borne (+Inf)
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, failed: bool = False) -> None:
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.calls += 1
+            self.total_seconds += seconds
+            self.bucket_counts[index] += 1
+            if failed:
+                self.errors += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = 0
+            self.errors = 0
+            self.total_seconds = 0.0
+            self.bucket_counts = [0] * (len(self.buckets) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "total_seconds": self.total_seconds,
+                "buckets": dict(zip(self.buckets + (float("inf"),), self.bucket_counts)),
+            }
+
+class MetricsRegistry:
+    """Registre des métriques par fonction, en mémoire."""
+
+    def __init__(self):
+        self._metrics: Dict[str, FunctionMetrics] = {}
+        self._gauges: Dict[str, Tuple[str, Callable[[], Dict[str, float]]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> FunctionMetrics:
+        """Retourner (en la créant si besoin) la métrique d'une fonction."""
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(name, FunctionMetrics(name))
+        return metric
+
+    def register_gauge(self, name: str, help_text: str, callback: Callable[[], Dict[str, float]]) -> None:
+        """
+        Enregistrer une jauge calculée à la demande (ex. statistiques du pool).
+        `callback` retourne un dictionnaire {clé: valeur}, exposé avec l'étiquette `key`.
+        """
+        with self._lock:
+            self._gauges[name] = (help_text, callback)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Instantané de toutes les métriques, indexé par nom de fonction."""
+        return {name: metric.snapshot() for name, metric in list(self._metrics.items())}
+
+    def reset(self) -> None:
+        """Remettre à zéro les métriques de fonctions (les décorateurs gardent leur référence)."""
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+    def render_prometheus(self) -> str:
+        """Exposer les métriques au format texte de Prometheus."""
+        lines: List[str] = [
+            "# HELP password_manager_calls_total Nombre d'appels par fonction.",
+            "# TYPE password_manager_calls_total counter",
+        ]
+        snapshot = self.snapshot()
+        for name, data in snapshot.items():
+            lines.append(f'password_manager_calls_total{{function="{name}"}} {data["calls"]}')
+        lines += [
+            "# HELP password_manager_errors_total Nombre d'appels terminés par une exception.",
+            "# TYPE password_manager_errors_total counter",
+        ]
+        for name, data in snapshot.items():
+            lines.append(f'password_manager_errors_total{{function="{name}"}} {data["errors"]}')
+        lines += [
+            "# HELP password_manager_call_duration_seconds Durée des appels par fonction.",
+            "# TYPE password_manager_call_duration_seconds histogram",
+        ]
+        for name, data in snapshot.items():
+            cumulative = 0
+            for bound, count in data["buckets"].items():
+                cumulative += count
+                label = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f'password_manager_call_duration_seconds_bucket{{function="{name}",le="{label}"}} {cumulative}'
+                )
+            lines.append(f'password_manager_call_duration_seconds_sum{{function="{name}"}} {data["total_seconds"]}')
+            lines.append(f'password_manager_call_duration_seconds_count{{function="{name}"}} {data["calls"]}')
+        for gauge_name, (help_text, callback) in list(self._gauges.items()):
+            lines += [f"# HELP {gauge_name} {help_text}", f"# TYPE {gauge_name} gauge"]
+            for key, value in callback().items():
+                if isinstance(value, (int, float)):
+                    lines.append(f'{gauge_name}{{key="{key}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+# Registre global utilisé par les décorateurs
+registry = MetricsRegistry()
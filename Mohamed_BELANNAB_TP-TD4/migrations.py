@@ -0,0 +1,200 @@
+# migrations.py
+import sqlite3
+import logging
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Migrations du schéma, appliquées dans l'ordre et une seule fois.
+# Chaque entrée : (version, description, instructions SQL).
+# Ne jamais modifier une migration déjà publiée : en ajouter une nouvelle.
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "Index couvrant (user_id, site_name) sur passwords", [
+        "CREATE INDEX IF NOT EXISTS idx_passwords_user_site ON passwords (user_id, site_name)",
+    ]),
+    (2, "Index (user_id, id) sur passwords", [
+        "CREATE INDEX IF NOT EXISTS idx_passwords_user_id ON passwords (user_id, id)",
+    ]),
+    (3, "Index de recherche par nom de site", [
+        "CREATE INDEX IF NOT EXISTS idx_passwords_site_name ON passwords (site_name)",
+    ]),
+    (4, "Sessions persistées pour la CLI non interactive", [
+        '''CREATE TABLE IF NOT EXISTS sessions (
+            token_hash TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            username TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )''',
+        "CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)",
+    ]),
+    # Index plein texte à contenu externe : le texte n'est pas dupliqué, seules
+    # les listes de trigrammes sont stockées. Les déclencheurs le tiennent à jour ;
+    # la mise à jour ne se déclenche que si une colonne indexée change.
+    # Le tokenizer trigram nécessite SQLite >= 3.34.
+    (5, "Index plein texte (FTS5, trigrammes) sur site_name, username et notes", [
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS passwords_fts USING fts5(
+            site_name, username, notes,
+            content='passwords', content_rowid='id', tokenize='trigram'
+        )''',
+        '''CREATE TRIGGER IF NOT EXISTS passwords_fts_insert AFTER INSERT ON passwords BEGIN
+            INSERT INTO passwords_fts (rowid, site_name, username, notes)
+            VALUES (new.id, new.site_name, new.username, new.notes);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS passwords_fts_delete AFTER DELETE ON passwords BEGIN
+            INSERT INTO passwords_fts (passwords_fts, rowid, site_name, username, notes)
+            VALUES ('delete', old.id, old.site_name, old.username, old.notes);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS passwords_fts_update AFTER UPDATE OF site_name, username, notes ON passwords BEGIN
+            INSERT INTO passwords_fts (passwords_fts, rowid, site_name, username, notes)
+            VALUES ('delete', old.id, old.site_name, old.username, old.notes);
+            INSERT INTO passwords_fts (rowid, site_name, username, notes)
+            VALUES (new.id, new.site_name, new.username, new.notes);
+        END''',
+        # Classement bm25 : le nom du site pèse plus que l'utilisateur, puis les notes
+        "INSERT INTO passwords_fts (passwords_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0)')",
+        # Indexer les entrées existantes
+        "INSERT INTO passwords_fts (passwords_fts) VALUES ('rebuild')",
+    ]),
+    (6, "Points de reprise des rotations de clé de chiffrement", [
+        '''CREATE TABLE IF NOT EXISTS key_rotations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            key_fingerprint TEXT UNIQUE NOT NULL,
+            status TEXT NOT NULL DEFAULT 'running',
+            last_id INTEGER NOT NULL DEFAULT 0,
+            rows_done INTEGER NOT NULL DEFAULT 0,
+            total_rows INTEGER NOT NULL DEFAULT 0,
+            started_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            finished_at REAL
+        )''',
+    ]),
+    (7, "État persisté de la limitation des tentatives de connexion", [
+        '''CREATE TABLE IF NOT EXISTS login_throttle (
+            throttle_key TEXT PRIMARY KEY,
+            failures INTEGER NOT NULL,
+            locked_until REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )''',
+        "CREATE INDEX IF NOT EXISTS idx_login_throttle_updated_at ON login_throttle (updated_at)",
+    ]),
+    # Chiffrement par enveloppe : chaque utilisateur a ses clés de données,
+    # chiffrées par la clé principale. Les entrées chiffrées avec une clé de
+    # données sont stockées en BLOB dans la colonne encrypted_password (l'affinité
+    # TEXT ne convertit pas les BLOB) ; les anciens jetons Fernet restent en TEXT
+    # jusqu'à `python data_keys.py migrate`.
+    (8, "Clés de données par utilisateur (chiffrement par enveloppe)", [
+        '''CREATE TABLE IF NOT EXISTS user_keys (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            wrapped_key BLOB NOT NULL,
+            created_at REAL NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )''',
+        "CREATE INDEX IF NOT EXISTS idx_user_keys_user_id ON user_keys (user_id, id)",
+    ]),
+    # Sauvegardes incrémentales (backup.py) : entrées modifiées depuis la dernière archive
+    (9, "Index de suivi des modifications (updated_at) sur passwords", [
+        "CREATE INDEX IF NOT EXISTS idx_passwords_updated_at ON passwords (updated_at)",
+    ]),
+    # Journal d'audit (audit.py) : ids attribués par l'écrivain, chaque ligne
+    # chaînée à la précédente par son empreinte. Sans clé étrangère : les
+    # événements survivent aux utilisateurs et aux entrées supprimés.
+    (10, "Journal d'audit en ajout seul, chaîné par empreintes", [
+        '''CREATE TABLE IF NOT EXISTS audit_events (
+            id INTEGER PRIMARY KEY,
+            ts REAL NOT NULL,
+            event INTEGER NOT NULL,
+            user_id INTEGER,
+            entry_id INTEGER,
+            subject TEXT,
+            source TEXT,
+            hash BLOB NOT NULL
+        )''',
+        "CREATE INDEX IF NOT EXISTS idx_audit_events_ts ON audit_events (ts)",
+        "CREATE INDEX IF NOT EXISTS idx_audit_events_user_ts ON audit_events (user_id, ts) WHERE user_id IS NOT NULL",
+        "CREATE INDEX IF NOT EXISTS idx_audit_events_entry_ts ON audit_events (entry_id, ts) WHERE entry_id IS NOT NULL",
+        '''CREATE TRIGGER IF NOT EXISTS audit_events_no_update BEFORE UPDATE ON audit_events BEGIN
+            SELECT RAISE(ABORT, 'Journal d''audit en ajout seul');
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS audit_events_no_delete BEFORE DELETE ON audit_events BEGIN
+            SELECT RAISE(ABORT, 'Journal d''audit en ajout seul');
+        END''',
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def ensure_schema_table(conn: sqlite3.Connection) -> None:
+    """Créer la table de suivi des versions du schéma si nécessaire."""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Retourner la version actuelle du schéma (0 si aucune migration appliquée)."""
+    ensure_schema_table(conn)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """
+    Appliquer les migrations en attente, chacune dans sa propre transaction.
+    Les index sont ajoutés sur place : une base existante n'est jamais reconstruite.
+    Retourne le nombre de migrations appliquées.
+    """
+    ensure_schema_table(conn)
+    conn.commit()
+    applied = 0
+    for version, description, statements in MIGRATIONS:
+        # BEGIN IMMEDIATE sérialise les processus qui migrent la même base
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchone():
+                conn.rollback()
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Échec de la migration {version} ({description}): {e}")
+            raise
+        applied += 1
+        logger.info(f"Migration {version} appliquée: {description}")
+    return applied
+
+def explain_query(conn: sqlite3.Connection, sql: str, params: tuple) -> List[str]:
+    """Retourner les étapes du plan d'exécution d'une requête."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+def check_query_plans(conn: sqlite3.Connection, queries: Dict[str, Tuple[str, tuple]]) -> Dict[str, List[str]]:
+    """
+    Vérifier qu'aucune requête critique ne parcourt une table entière.
+    Lève une RuntimeError listant les requêtes dégradées en SCAN.
+    """
+    plans = {name: explain_query(conn, sql, params) for name, (sql, params) in queries.items()}
+    degraded = {
+        name: steps for name, steps in plans.items()
+        if any(step.startswith("SCAN") for step in steps)
+    }
+    if degraded:
+        details = "; ".join(f"{name}: {' | '.join(steps)}" for name, steps in degraded.items())
+        raise RuntimeError(f"Requêtes critiques sans index: {details}")
+    return plans
+
+if __name__ == "__main__":
+    # Appliquer les migrations sur la base configurée puis vérifier les plans
+    from database import initialize_database, verify_query_plans
+
+    initialize_database()
+    for name, steps in verify_query_plans().items():
+        print(f"{name}: {' | '.join(steps)}")
@@ -1,6 +1,11 @@
 # models.py
+from typing import Optional
+
 from pydantic import BaseModel, EmailStr, Field, field_validator
-import re
+
+from config import Config
+from password_policy import get_policy
+from breach_index import is_breached
 
 class UserRegistration(BaseModel):
     """Modèle pour la validation des données d'enregistrement d'un utilisateur."""
@@ -10,15 +15,11 @@ class UserRegistration(BaseModel):
     
     @field_validator('password')
     def password_strength(cls, v):
-        """Valider la complexité du mot de passe."""
-        if not re.search(r'[A-Z]', v):
-            raise ValueError('Le mot de passe doit contenir au moins une lettre majuscule')
-        if not re.search(r'[a-z]', v):
-            raise ValueError('Le mot de passe doit contenir au moins une lettre minuscule')
-        if not re.search(r'[0-9]', v):
-            raise ValueError('Le mot de passe doit contenir au moins un chiffre')
-        if not re.search(r'[!@#$%^&*(),.?":{}|<>]', v):
-            raise ValueError('Le mot de passe doit contenir au moins un caractère spécial')
+        """Valider le mot de passe selon la politique configurée (password_policy.py)."""
+        policy = get_policy()
+        result = policy.check(v)
+        if not result.valid:
+            raise ValueError("; ".join(policy.messages(result)))
         return v
 
 class UserLogin(BaseModel):
@@ -31,4 +32,11 @@ class PasswordEntry(BaseModel):
     site_name: str = Field(..., min_length=1, max_length=100)
     username: str = Field(..., min_length=1, max_length=100)
     password: str = Field(..., min_length=1)
-    notes: str = Field(None, max_length=500)
\ No newline at end of file
+    notes: Optional[str] = Field(None, max_length=500)
+    
+    @field_validator('password')
+    def password_not_breached(cls, v):
+        """Refuser les mots de passe divulgués si la configuration l'exige (voir breach_index.py)."""
+        if Config.REJECT_BREACHED_STORED_PASSWORDS and is_breached(v):
+            raise ValueError("Ce mot de passe figure dans une liste de mots de passe divulgués")
+        return v
@@ -0,0 +1,196 @@
+# password_policy.py
+"""
+Politique de mots de passe des comptes utilisateurs.
+
+Un mot de passe est analysé en une seule passe : bytes.translate (en C) remplace
+chaque octet par le marqueur de sa classe, puis la présence de chaque marqueur
+donne le masque des classes. La même politique valide un mot de passe isolé
+(check) ou des milliers d'un coup (check_many), avec un résultat structuré
+par mot de passe.
+"""
+import json
+import logging
+import math
+import string
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SPECIAL_CHARACTERS = '!@#$%^&*(),.?":{}|<>'
+
+# Marqueurs de classe. Tout octet hors des quatre classes (caractères non ASCII,
+# espaces, contrôles) devient OTHER.
+UPPER, LOWER, DIGIT, SPECIAL, OTHER = 1, 2, 3, 4, 0
+
+# Ordre des bits du masque des classes présentes
+CLASS_BITS = (("upper", UPPER), ("lower", LOWER), ("digit", DIGIT), ("special", SPECIAL), ("other", OTHER))
+
+# Taille de l'alphabet de chaque classe, pour l'estimation d'entropie ; les autres
+# caractères comptent pour un alphabet forfaitaire
+CLASS_POOL_SIZES = {"upper": 26, "lower": 26, "digit": 10, "special": len(SPECIAL_CHARACTERS), "other": 32}
+
+MESSAGES = {
+    "too_short": "Le mot de passe doit contenir au moins {min_length} caractères",
+    "too_long": "Le mot de passe doit contenir au plus {max_length} caractères",
+    "missing_upper": "Le mot de passe doit contenir au moins une lettre majuscule",
+    "missing_lower": "Le mot de passe doit contenir au moins une lettre minuscule",
+    "missing_digit": "Le mot de passe doit contenir au moins un chiffre",
+    "missing_special": "Le mot de passe doit contenir au moins un caractère spécial",
+    "blocklisted": "Ce mot de passe est trop courant",
+    "breached": "Ce mot de passe figure dans une liste de mots de passe divulgués",
+    "low_entropy": "Le mot de passe est trop prévisible (entropie estimée {entropy_bits:.0f} bits, minimum {min_entropy_bits:.0f})",
+}
+
+def _build_class_table(special_characters: str) -> bytes:
+    """Table bytes.translate (256 octets) : chaque octet UTF-8 vers le marqueur de sa classe."""
+    table = bytearray([OTHER] * 256)
+    for characters, marker in ((string.ascii_uppercase, UPPER), (string.ascii_lowercase, LOWER),
+                               (string.digits, DIGIT), (special_characters, SPECIAL)):
+        for c in characters:
+            table[ord(c)] = marker
+    return bytes(table)
+
+def load_blocklist(path: Optional[str]) -> FrozenSet[str]:
+    """Lire une liste de mots de passe interdits (un par ligne, comparés sans la casse)."""
+    if not path:
+        return frozenset()
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return frozenset(line.strip().lower() for line in f if line.strip())
+
+class PolicyResult(NamedTuple):
+    """Résultat de la validation d'un mot de passe. `errors` contient des codes de MESSAGES."""
+    index: int
+    valid: bool
+    errors: Tuple[str, ...]
+    entropy_bits: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"index": self.index, "valid": self.valid, "errors": list(self.errors),
+                "entropy_bits": round(self.entropy_bits, 1)}
+
+@dataclass(frozen=True)
+class PasswordPolicy:
+    """Règles de robustesse ; voir from_config() pour la politique de l'application."""
+    min_length: int = 8
+    max_length: Optional[int] = None
+    required_classes: Tuple[str, ...] = ("upper", "lower", "digit", "special")
+    special_characters: str = SPECIAL_CHARACTERS
+    min_entropy_bits: float = 0.0
+    blocklist: FrozenSet[str] = field(default_factory=frozenset, repr=False)
+    # Index de mots de passe divulgués (breach_index.BreachIndex), None pour ne pas vérifier
+    breach_index: Optional[Any] = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        unknown = set(self.required_classes) - {"upper", "lower", "digit", "special"}
+        if unknown:
+            raise ValueError(f"Classes de caractères inconnues: {', '.join(sorted(unknown))}")
+        if not self.special_characters.isascii():
+            raise ValueError("Les caractères spéciaux de la politique doivent être ASCII")
+        # Pour chacun des 32 masques de classes possibles : codes des classes
+        # manquantes et entropie par caractère, calculés une fois pour toutes
+        missing, bits_per_char = [], []
+        for mask in range(1 << len(CLASS_BITS)):
+            present = {name for bit, (name, _) in enumerate(CLASS_BITS) if mask >> bit & 1}
+            missing.append(tuple(f"missing_{name}" for name in self.required_classes if name not in present))
+            pool = sum(CLASS_POOL_SIZES[name] for name in present)
+            bits_per_char.append(math.log2(pool) if pool > 1 else 0.0)
+        object.__setattr__(self, "_table", _build_class_table(self.special_characters))
+        object.__setattr__(self, "_missing", tuple(missing))
+        object.__setattr__(self, "_bits_per_char", tuple(bits_per_char))
+
+    @classmethod
+    def from_config(cls) -> "PasswordPolicy":
+        from breach_index import get_breach_index
+        return cls(
+            min_length=Config.PASSWORD_MIN_LENGTH,
+            max_length=Config.PASSWORD_MAX_LENGTH,
+            required_classes=tuple(Config.PASSWORD_REQUIRED_CLASSES),
+            min_entropy_bits=Config.PASSWORD_MIN_ENTROPY_BITS,
+            blocklist=load_blocklist(Config.PASSWORD_BLOCKLIST_PATH),
+            breach_index=get_breach_index(),
+        )
+
+    def messages(self, result: PolicyResult) -> List[str]:
+        """Messages d'erreur lisibles d'un résultat, dans l'ordre des codes."""
+        return [
+            MESSAGES[code].format(min_length=self.min_length, max_length=self.max_length,
+                                  entropy_bits=result.entropy_bits, min_entropy_bits=self.min_entropy_bits)
+            for code in result.errors
+        ]
+
+    def check(self, password: str, index: int = 0) -> PolicyResult:
+        """Valider un mot de passe."""
+        return self.check_many([password], start=index)[0]
+
+    def check_many(self, passwords: Iterable[str], start: int = 0) -> List[PolicyResult]:
+        """
+        Valider un lot de mots de passe et retourner un résultat par mot de passe,
+        dans l'ordre. Chaque mot de passe est réduit à ses marqueurs de classe par
+        bytes.translate, puis les tables précalculées par masque donnent erreurs et entropie.
+        """
+        table, missing, bits_per_char = self._table, self._missing, self._bits_per_char
+        min_length = self.min_length
+        max_length = self.max_length if self.max_length is not None else math.inf
+        blocklist = self.blocklist
+        breach_index = self.breach_index
+        min_entropy = self.min_entropy_bits
+
+        results = []
+        append = results.append
+        # Construction directe du tuple : évite PolicyResult.__new__ (Python) à chaque ligne
+        make_result = tuple.__new__
+        for index, password in enumerate(passwords, start):
+            classes = password.encode("utf-8", "surrogatepass").translate(table)
+            mask = ((UPPER in classes) | (LOWER in classes) << 1 | (DIGIT in classes) << 2
+                    | (SPECIAL in classes) << 3 | (OTHER in classes) << 4)
+            length = len(password)
+            entropy_bits = length * bits_per_char[mask]
+            errors = missing[mask]
+            breached = breach_index is not None and password in breach_index
+            if breached or length < min_length or length > max_length or entropy_bits < min_entropy or (
+                    blocklist and password.lower() in blocklist):
+                errors = self._slow_errors(password, length, entropy_bits, errors, breached)
+            append(make_result(PolicyResult, (index, not errors, errors, entropy_bits)))
+        return results
+
+    def _slow_errors(self, password: str, length: int, entropy_bits: float,
+                     missing: Tuple[str, ...], breached: bool) -> Tuple[str, ...]:
+        """Liste complète des erreurs, pour les mots de passe refusés par une règle autre que les classes."""
+        errors = []
+        if length < self.min_length:
+            errors.append("too_short")
+        elif self.max_length is not None and length > self.max_length:
+            errors.append("too_long")
+        errors.extend(missing)
+        if self.blocklist and password.lower() in self.blocklist:
+            errors.append("blocklisted")
+        if breached:
+            errors.append("breached")
+        if entropy_bits < self.min_entropy_bits:
+            errors.append("low_entropy")
+        return tuple(errors)
+
+_default_policy = None
+
+def get_policy() -> PasswordPolicy:
+    """Politique issue de la Config, construite au premier appel (la liste noire y est lue)."""
+    global _default_policy
+    if _default_policy is None:
+        _default_policy = PasswordPolicy.from_config()
+    return _default_policy
+
+def check_passwords(passwords: Iterable[str], policy: Optional[PasswordPolicy] = None) -> List[PolicyResult]:
+    """Valider un lot de mots de passe avec la politique configurée (ou celle fournie)."""
+    return (policy or get_policy()).check_many(passwords)
+
+if __name__ == "__main__":
+    # Valider des mots de passe candidats lus sur stdin, un par ligne ; un résultat JSON par ligne
+    results = check_passwords(line.rstrip("\n") for line in sys.stdin)
+    for result in results:
+        print(json.dumps(result.to_dict()))
+    rejected = sum(1 for result in results if not result.valid)
+    print(f"{len(results) - rejected} valide(s), {rejected} refusé(s)", file=sys.stderr)
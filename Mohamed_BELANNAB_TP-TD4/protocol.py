@@ -0,0 +1,44 @@
+# protocol.py
+"""
+Protocole du serveur local : trames préfixées par leur longueur.
+
+    +----------------------+---------------------------+
+    | longueur (4 octets,  | charge utile JSON (UTF-8) |
+    | big-endian, non signé)|                           |
+    +----------------------+---------------------------+
+
+Requête : {"id": 1, "op": "get", "token": "...", "args": {"id": 42}}
+Réponse : {"id": 1, "ok": true, "result": {...}} ou {"id": 1, "ok": false, "error": "..."}
+Les réponses portent l'id de la requête : un client peut envoyer plusieurs
+requêtes d'affilée (pipelining) et les associer à leurs réponses.
+"""
+import json
+import struct
+from typing import Dict, Any
+
+HEADER = struct.Struct("!I")
+MAX_FRAME_SIZE = 1024 * 1024
+
+class ProtocolError(Exception):
+    """Trame invalide ou trop grande."""
+
+def encode_frame(message: Dict[str, Any]) -> bytes:
+    payload = json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    if len(payload) > MAX_FRAME_SIZE:
+        raise ProtocolError(f"Trame trop grande: {len(payload)} octets")
+    return HEADER.pack(len(payload)) + payload
+
+def decode_payload(payload: bytes) -> Dict[str, Any]:
+    try:
+        message = json.loads(payload)
+    except ValueError as e:
+        raise ProtocolError(f"JSON invalide: {e}")
+    if not isinstance(message, dict):
+        raise ProtocolError("La trame doit contenir un objet JSON")
+    return message
+
+def read_length(header: bytes) -> int:
+    (length,) = HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ProtocolError(f"Trame trop grande: {length} octets")
+    return length
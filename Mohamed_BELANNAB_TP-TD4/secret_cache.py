@@ -0,0 +1,103 @@
+# secret_cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from config import Config
+
+def _wipe(buffer: bytearray) -> None:
+    """Écraser le contenu d'un tampon en place."""
+    buffer[:] = bytes(len(buffer))
+
+class _CachedSecret:
+    __slots__ = ("metadata", "secret", "expires_at")
+
+    def __init__(self, metadata: Dict[str, Any], secret: bytearray, expires_at: float):
+        self.metadata = metadata
+        self.secret = secret
+        self.expires_at = expires_at
+
+class SecretCache:
+    """
+    Cache LRU borné d'entrées déchiffrées, avec durée de vie.
+    Le secret est conservé dans un bytearray écrasé par des zéros dès que
+    l'entrée expire, est évincée ou invalidée. Les chaînes retournées à
+    l'appelant sont des copies immuables que Python ne permet pas d'effacer.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_entries = max_entries or Config.SECRET_CACHE_SIZE
+        self.ttl = ttl if ttl is not None else Config.SECRET_CACHE_TTL
+        self._entries: "OrderedDict[int, _CachedSecret]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Incrémenté à chaque invalidation : une lecture commencée avant ne peut plus être mise en cache
+        self._generation = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0, "stale": 0}
+
+    def get(self, password_id: int) -> Optional[Dict[str, Any]]:
+        """Retourner l'entrée déchiffrée si elle est en cache et encore valide."""
+        with self._lock:
+            entry = self._entries.get(password_id)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[password_id]
+                _wipe(entry.secret)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(password_id)
+            self._stats["hits"] += 1
+            return {**entry.metadata, "password": entry.secret.decode("utf-8")}
+
+    def generation(self) -> int:
+        """Jeton à relever avant de lire une entrée en base, puis à passer à put()."""
+        with self._lock:
+            return self._generation
+
+    def put(self, password_id: int, password_entry: Dict[str, Any], generation: Optional[int] = None) -> bool:
+        """
+        Mettre en cache une entrée déchiffrée (le champ `password` est stocké à part).
+        Si une invalidation a eu lieu depuis `generation`, l'entrée lue est peut-être
+        périmée : elle n'est pas mise en cache et la méthode retourne False.
+        """
+        metadata = {key: value for key, value in password_entry.items() if key != "password"}
+        secret = bytearray(password_entry["password"].encode("utf-8"))
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                _wipe(secret)
+                self._stats["stale"] += 1
+                return False
+            previous = self._entries.pop(password_id, None)
+            if previous is not None:
+                _wipe(previous.secret)
+            while len(self._entries) >= self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                _wipe(evicted.secret)
+                self._stats["evictions"] += 1
+            self._entries[password_id] = _CachedSecret(metadata, secret, time.monotonic() + self.ttl)
+            return True
+
+    def invalidate(self, password_id: int) -> None:
+        """Retirer une entrée après une écriture."""
+        with self._lock:
+            self._generation += 1
+            entry = self._entries.pop(password_id, None)
+            if entry is not None:
+                _wipe(entry.secret)
+                self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        """Vider le cache en effaçant tous les secrets."""
+        with self._lock:
+            self._generation += 1
+            for entry in self._entries.values():
+                _wipe(entry.secret)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Compteurs de succès/échecs et taille actuelle."""
+        with self._lock:
+            return {**self._stats, "size": len(self._entries)}
@@ -1,20 +1,98 @@
 # security.py
-import bcrypt
+import argparse
 import logging
-from cryptography.fernet import Fernet
+import os
+import struct
+import threading
+import time
 from config import Config
 
 logger = logging.getLogger(__name__)
 
-# Initialiser la clé de chiffrement Fernet
-ENCRYPTION_KEY = Config.get_encryption_key()
-cipher_suite = Fernet(ENCRYPTION_KEY)
+# Chiffreur Fernet créé au premier usage : l'import de cryptography et la
+# lecture de la clé ne pèsent plus sur le démarrage. Il est recréé quand les
+# fichiers de clés changent (rotation par un autre processus).
+_cipher_suite = None
+_cipher_files = None  # signature des fichiers de clés lus pour créer le chiffreur
+_cipher_checked_at = 0.0
+_cipher_lock = threading.Lock()
 
-def hash_password(password):
-    """Hacher un mot de passe avec bcrypt."""
+def _key_files_signature():
+    """Inode, date de modification et taille des fichiers de clé principale et de clés retirées."""
+    signature = []
+    for path in (Config.ENCRYPTION_KEY_PATH, Config.RETIRED_KEYS_PATH):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            signature.append(None)
+        else:
+            signature.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+def get_cipher(check_files=False):
+    """
+    Retourner le chiffreur, en le créant au premier appel.
+    S'il reste d'anciennes clés (rotation en cours), c'est un MultiFernet :
+    il chiffre avec la clé principale et déchiffre avec n'importe laquelle.
+    Les fichiers de clés sont revérifiés au plus toutes les
+    KEY_FILES_CHECK_INTERVAL secondes (à chaque appel avec `check_files`) ;
+    s'ils ont changé, le chiffreur est recréé.
+    """
+    global _cipher_suite, _cipher_files, _cipher_checked_at
+    cipher = _cipher_suite
+    if cipher is not None and (check_files or time.monotonic() - _cipher_checked_at >= Config.KEY_FILES_CHECK_INTERVAL):
+        _cipher_checked_at = time.monotonic()
+        if _key_files_signature() != _cipher_files:
+            cipher = None
+    if cipher is None:
+        with _cipher_lock:
+            signature = _key_files_signature()
+            if _cipher_suite is None or signature != _cipher_files:
+                from cryptography.fernet import Fernet, MultiFernet
+                # Signature relevée avant la lecture : une modification concurrente provoquera un nouveau rechargement
+                primary = Fernet(Config.get_encryption_key())
+                retired = [Fernet(key) for key in Config.get_retired_encryption_keys()]
+                if _cipher_suite is not None:
+                    logger.info("Fichiers de clés modifiés: chiffreur rechargé")
+                _cipher_suite = MultiFernet([primary] + retired) if retired else primary
+                _cipher_files, _cipher_checked_at = signature, time.monotonic()
+            cipher = _cipher_suite
+    return cipher
+
+def _fernet_decrypt(token):
+    """Déchiffrer avec la clé principale ; si le jeton est refusé et que les clés ont changé, réessayer une fois."""
+    from cryptography.fernet import InvalidToken
+
+    cipher = get_cipher()
+    try:
+        return cipher.decrypt(token)
+    except InvalidToken:
+        # Rotation par un autre processus depuis le dernier contrôle des fichiers
+        reloaded = get_cipher(check_files=True)
+        if reloaded is cipher:
+            raise
+        return reloaded.decrypt(token)
+
+def reset_cipher():
+    """Oublier le chiffreur courant pour relire les clés au prochain usage (après une rotation)."""
+    global _cipher_suite
+    with _cipher_lock:
+        _cipher_suite = None
+
+def __getattr__(name):
+    # Compatibilité avec les anciens attributs de module
+    if name == "cipher_suite":
+        return get_cipher()
+    if name == "ENCRYPTION_KEY":
+        return Config.get_encryption_key()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def hash_password(password, rounds=None):
+    """Hacher un mot de passe avec bcrypt au coût configuré (Config.BCRYPT_ROUNDS par défaut)."""
+    import bcrypt  # importé au premier usage : hors du temps de démarrage
     try:
         password_bytes = password.encode('utf-8')
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=rounds or Config.BCRYPT_ROUNDS)
         hashed = bcrypt.hashpw(password_bytes, salt)
         return hashed.decode('utf-8')
     except Exception as e:
@@ -23,6 +101,7 @@ def hash_password(password):
 
 def verify_password(plain_password, hashed_password):
     """Vérifier si un mot de passe correspond à son hash."""
+    import bcrypt
     try:
         plain_password_bytes = plain_password.encode('utf-8')
         hashed_password_bytes = hashed_password.encode('utf-8')
@@ -31,11 +110,45 @@ def verify_password(plain_password, hashed_password):
         logger.error(f"Erreur lors de la vérification du mot de passe: {e}")
         return False
 
+def get_hash_rounds(hashed_password):
+    """Extraire le coût d'un hash bcrypt ($2b$<coût>$...)."""
+    try:
+        return int(hashed_password.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+def needs_rehash(hashed_password):
+    """Indiquer si un hash a été calculé avec un coût différent de la configuration actuelle."""
+    return get_hash_rounds(hashed_password) != Config.BCRYPT_ROUNDS
+
+def calibrate_bcrypt_rounds(target_ms=250.0, min_rounds=10, max_rounds=16, samples=3):
+    """
+    Mesurer bcrypt sur cette machine et retourner le coût le plus élevé dont la
+    vérification reste sous `target_ms`. Chaque coût supplémentaire double le temps :
+    on mesure au coût minimal puis on extrapole.
+    """
+    import bcrypt
+    password = b"calibration-password"
+    hashed = bcrypt.hashpw(password, bcrypt.gensalt(rounds=min_rounds))
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        bcrypt.checkpw(password, hashed)
+        timings.append(time.perf_counter() - start)
+    base_ms = min(timings) * 1000
+
+    rounds = min_rounds
+    while rounds < max_rounds and base_ms * 2 ** (rounds + 1 - min_rounds) <= target_ms:
+        rounds += 1
+    estimated_ms = base_ms * 2 ** (rounds - min_rounds)
+    logger.info(f"Calibration bcrypt: coût {rounds} (~{estimated_ms:.0f} ms par vérification)")
+    return rounds, estimated_ms
+
 def encrypt_password(password):
     """Chiffrer un mot de passe avec Fernet."""
     try:
         password_bytes = password.encode('utf-8')
-        encrypted = cipher_suite.encrypt(password_bytes)
+        encrypted = get_cipher().encrypt(password_bytes)
         return encrypted.decode('utf-8')
     except Exception as e:
         logger.error(f"Erreur lors du chiffrement du mot de passe: {e}")
@@ -45,8 +158,149 @@ def decrypt_password(encrypted_password):
     """Déchiffrer un mot de passe chiffré avec Fernet."""
     try:
         encrypted_bytes = encrypted_password.encode('utf-8')
-        decrypted = cipher_suite.decrypt(encrypted_bytes)
+        decrypted = _fernet_decrypt(encrypted_bytes)
         return decrypted.decode('utf-8')
     except Exception as e:
         logger.error(f"Erreur lors du déchiffrement du mot de passe: {e}")
-        raise
\ No newline at end of file
+        raise
+
+# Format binaire des entrées du coffre : version, id de la clé de données de
+# l'utilisateur, nonce AES-GCM, puis texte chiffré suivi de son tag de 16 octets.
+# Les jetons Fernet (texte base64) des versions précédentes restent lisibles.
+BLOB_VERSION = 2
+BLOB_HEADER = struct.Struct(">BI")
+NONCE_SIZE = 12
+DATA_KEY_SIZE = 32  # AES-256
+
+def blob_key_id(encrypted_password):
+    """Id de la clé de données d'une entrée binaire (None pour un ancien jeton Fernet)."""
+    if isinstance(encrypted_password, str):
+        return None
+    return BLOB_HEADER.unpack_from(encrypted_password)[1]
+
+def wrap_data_key(data_key):
+    """Chiffrer une clé de données avec la clé principale (enveloppe)."""
+    return get_cipher().encrypt(data_key)
+
+def unwrap_data_key(wrapped_key):
+    """Déchiffrer une clé de données enveloppée par la clé principale (ou une ancienne clé)."""
+    return _fernet_decrypt(bytes(wrapped_key))
+
+def generate_data_key():
+    """Nouvelle clé de données aléatoire (256 bits)."""
+    return os.urandom(DATA_KEY_SIZE)
+
+class UserCipher:
+    """
+    Chiffreur du coffre d'un utilisateur : AES-256-GCM avec ses clés de données.
+    La plus récente chiffre ; toutes déchiffrent (l'id de la clé figure dans
+    l'en-tête). En-tête et id de l'utilisateur sont authentifiés : une entrée
+    copiée dans le coffre d'un autre utilisateur ne se déchiffre pas.
+    Les instances se transmettent aux processus d'un ProcessPoolExecutor.
+    """
+
+    def __init__(self, user_id, keys):
+        # keys : {id de clé: clé de données en clair}
+        self.user_id = user_id
+        self.keys = dict(keys)
+        self.active_key_id = max(self.keys)
+        self._aeads = {}
+
+    def __getstate__(self):
+        return {"user_id": self.user_id, "keys": self.keys, "active_key_id": self.active_key_id}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._aeads = {}
+
+    def _aead(self, key_id):
+        aead = self._aeads.get(key_id)
+        if aead is None:
+            from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+            aead = self._aeads[key_id] = AESGCM(self.keys[key_id])
+        return aead
+
+    def _associated_data(self, header):
+        return header + struct.pack(">q", self.user_id)
+
+    def encrypt(self, password):
+        """Chiffrer un mot de passe au format binaire avec la clé active."""
+        header = BLOB_HEADER.pack(BLOB_VERSION, self.active_key_id)
+        nonce = os.urandom(NONCE_SIZE)
+        ciphertext = self._aead(self.active_key_id).encrypt(
+            nonce, password.encode('utf-8'), self._associated_data(header)
+        )
+        return header + nonce + ciphertext
+
+    def decrypt(self, encrypted_password):
+        """Déchiffrer une entrée binaire, ou un ancien jeton Fernet (texte)."""
+        if isinstance(encrypted_password, str):
+            return decrypt_password(encrypted_password)
+        encrypted_password = bytes(encrypted_password)
+        version, key_id = BLOB_HEADER.unpack_from(encrypted_password)
+        if version != BLOB_VERSION:
+            raise ValueError(f"Format de mot de passe chiffré inconnu: {version}")
+        if key_id not in self.keys:
+            raise KeyError(f"Clé de données {key_id} inconnue pour l'utilisateur {self.user_id}")
+        offset = BLOB_HEADER.size
+        return self._aead(key_id).decrypt(
+            encrypted_password[offset:offset + NONCE_SIZE],
+            encrypted_password[offset + NONCE_SIZE:],
+            self._associated_data(encrypted_password[:offset])
+        ).decode('utf-8')
+
+    def reencrypt(self, encrypted_password):
+        """Rechiffrer avec la clé active ; une entrée déjà à jour est retournée telle quelle."""
+        if not isinstance(encrypted_password, str) and blob_key_id(encrypted_password) == self.active_key_id:
+            return encrypted_password
+        return self.encrypt(self.decrypt(encrypted_password))
+
+def encrypt_passwords(passwords, executor=None, cipher=None):
+    """
+    Chiffrer une liste de mots de passe en lot, avec le chiffreur de l'utilisateur
+    s'il est fourni (format binaire), sinon en jetons Fernet.
+    Si un `executor` (par ex. ProcessPoolExecutor) est fourni, le travail y est réparti.
+    """
+    encrypt = cipher.encrypt if cipher is not None else encrypt_password
+    if executor is None:
+        return [encrypt(password) for password in passwords]
+    chunksize = max(1, len(passwords) // 32)
+    return list(executor.map(encrypt, passwords, chunksize=chunksize))
+
+def rotate_encrypted_password(encrypted_password):
+    """Rechiffrer un mot de passe avec la clé principale, quelle que soit la clé d'origine."""
+    cipher = get_cipher()
+    if not hasattr(cipher, "rotate") or not isinstance(encrypted_password, str):
+        # Une seule clé, ou entrée binaire chiffrée par une clé de données
+        # (ce sont alors les clés de données qui sont réenveloppées)
+        return encrypted_password
+    return cipher.rotate(encrypted_password.encode('utf-8')).decode('utf-8')
+
+def rotate_encrypted_passwords(encrypted_passwords, executor=None):
+    """Rechiffrer une liste de mots de passe en lot, éventuellement via un `executor`."""
+    if executor is None:
+        return [rotate_encrypted_password(password) for password in encrypted_passwords]
+    chunksize = max(1, len(encrypted_passwords) // 32)
+    return list(executor.map(rotate_encrypted_password, encrypted_passwords, chunksize=chunksize))
+
+def decrypt_passwords(encrypted_passwords, executor=None, cipher=None):
+    """Déchiffrer une liste de mots de passe en lot, éventuellement via un `executor`."""
+    decrypt = cipher.decrypt if cipher is not None else decrypt_password
+    if executor is None:
+        return [decrypt(password) for password in encrypted_passwords]
+    chunksize = max(1, len(encrypted_passwords) // 32)
+    return list(executor.map(decrypt, encrypted_passwords, chunksize=chunksize))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Outils de sécurité du gestionnaire de mots de passe")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    calibrate_parser = subparsers.add_parser("calibrate", help="Choisir le coût bcrypt pour un temps cible")
+    calibrate_parser.add_argument("--target-ms", type=float, default=250.0, help="Temps de vérification visé")
+    calibrate_parser.add_argument("--min-rounds", type=int, default=10)
+    calibrate_parser.add_argument("--max-rounds", type=int, default=16)
+    args = parser.parse_args()
+
+    rounds, estimated_ms = calibrate_bcrypt_rounds(args.target_ms, args.min_rounds, args.max_rounds)
+    print(f"Coût recommandé: {rounds} (~{estimated_ms:.0f} ms par vérification, actuel: {Config.BCRYPT_ROUNDS})")
+    print(f"export BCRYPT_ROUNDS={rounds}")
@@ -0,0 +1,259 @@
+# server.py
+"""
+Mode serveur local : un processus garde le PasswordManager, le chiffreur Fernet
+et le pool de connexions prêts, et répond aux clients sur une socket Unix.
+
+    python server.py [--socket chemin] [--workers N] [--transfer-dir répertoire]
+
+Voir protocol.py pour le format des trames et client.py pour la bibliothèque cliente.
+"""
+import argparse
+import asyncio
+import contextlib
+import functools
+import logging
+import os
+import signal
+import socket
+import struct
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Tuple
+
+from config import Config
+from protocol import HEADER, ProtocolError, encode_frame, decode_payload, read_length
+
+logger = logging.getLogger(__name__)
+
+class PasswordManagerServer:
+    """
+    Serveur asyncio sur socket Unix. Chaque requête d'une connexion est traitée
+    dans sa propre tâche, ce qui permet le pipelining : au plus
+    Config.SERVER_MAX_INFLIGHT par connexion, au-delà le serveur cesse de lire
+    la socket. L'ordre d'exécution et des réponses n'est pas garanti (elles
+    portent l'id de la requête) : un client qui enchaîne des opérations
+    dépendantes attend la réponse de l'une avant d'envoyer la suivante. Toute opération qui
+    touche la base (pool, lectures, commits qui attendent busy_timeout) ou le
+    chiffrement part dans un pool de threads : une opération lente ne bloque
+    pas les autres clients. Seul ping s'exécute dans la boucle.
+    """
+
+    def __init__(self, manager, socket_path: str, workers: int = None, max_inflight: int = None,
+                 transfer_dir: str = None):
+        self.manager = manager
+        self.socket_path = socket_path
+        self.max_inflight = max_inflight or Config.SERVER_MAX_INFLIGHT
+        transfer_dir = transfer_dir or Config.SERVER_TRANSFER_DIR
+        self.transfer_dir = os.path.realpath(transfer_dir) if transfer_dir else None
+        self._executor = ThreadPoolExecutor(max_workers=workers or Config.ASYNC_CRYPTO_WORKERS,
+                                            thread_name_prefix="server")
+        self._server = None
+        # op -> (fonction, déportée dans le pool de threads ?)
+        self._operations: Dict[str, Tuple[Callable, bool]] = {
+            "ping": (lambda token, args: "pong", False),
+            "register": (self._register, True),
+            "login": (self._login, True),
+            "logout": (self._logout, True),
+            "add": (self._add, True),
+            "get": (self._get, True),
+            "update": (self._update, True),
+            "delete": (self._delete, True),
+            "list": (self._list, True),
+            "search": (self._search, True),
+            "enable_cache": (self._enable_cache, True),
+            "import": (self._import, True),
+            "export": (self._export, True),
+            "metrics": (lambda token, args: self.manager.metrics_snapshot(), True),
+        }
+
+    def _authenticated(self, token):
+        if not self.manager.resume_session(token):
+            raise PermissionError("Authentification requise pour accéder à cette fonctionnalité")
+        return token
+
+    def _register(self, token, args):
+        return self.manager.register_user(args["username"], args["email"], args["password"])
+
+    def _login(self, token, args):
+        session_token = self.manager.login_user(args["username"], args["password"], args.get("source"))
+        if not session_token:
+            retry_after = self.manager.throttle.retry_after(args["username"], args.get("source"))
+            if retry_after:
+                raise PermissionError(f"Connexion refusée, réessayez dans {retry_after:.0f} s")
+            raise PermissionError("Nom d'utilisateur ou mot de passe incorrect")
+        if args.get("cache"):
+            self.manager.enable_secret_cache(session_token)
+        return {"token": session_token}
+
+    def _logout(self, token, args):
+        self.manager.logout(token)
+        return True
+
+    def _add(self, token, args):
+        notes = args.get("notes")
+        return self.manager.store_password(
+            self._authenticated(token), args["site_name"], args["username"], args["password"],
+            notes if notes is not None else ""
+        )
+
+    def _get(self, token, args):
+        return self.manager.retrieve_password(self._authenticated(token), int(args["id"]))
+
+    def _update(self, token, args):
+        return self.manager.update_password(
+            self._authenticated(token), int(args["id"]), args.get("site_name"), args.get("username"),
+            args.get("password"), args.get("notes")
+        )
+
+    def _delete(self, token, args):
+        return self.manager.delete_password(self._authenticated(token), int(args["id"]))
+
+    def _list(self, token, args):
+        return self.manager.retrieve_passwords(
+            self._authenticated(token), int(args.get("after_id", 0)), int(args.get("limit", 50)), args.get("columns")
+        )
+
+    def _search(self, token, args):
+        return self.manager.search_passwords(
+            self._authenticated(token), args["query"], args.get("limit"), bool(args.get("fuzzy")), args.get("columns")
+        )
+
+    def _enable_cache(self, token, args):
+        self.manager.enable_secret_cache(self._authenticated(token), args.get("max_entries"), args.get("ttl"))
+        return True
+
+    def _transfer_path(self, name: str) -> str:
+        """Chemin d'un fichier d'import/export, confiné au répertoire de transfert du serveur."""
+        if self.transfer_dir is None:
+            raise PermissionError("Import/export désactivés sur ce serveur (Config.SERVER_TRANSFER_DIR)")
+        path = os.path.realpath(os.path.join(self.transfer_dir, name))
+        if os.path.commonpath([path, self.transfer_dir]) != self.transfer_dir or path == self.transfer_dir:
+            raise PermissionError("Chemin hors du répertoire de transfert du serveur")
+        return path
+
+    def _import(self, token, args):
+        session = self._authenticated(token)
+        return self.manager.import_passwords(session, self._transfer_path(args["file"]), args.get("format"))
+
+    def _export(self, token, args):
+        session = self._authenticated(token)
+        return self.manager.export_passwords(session, self._transfer_path(args["file"]), args.get("format"))
+
+    @staticmethod
+    def _peer_source(writer: asyncio.StreamWriter):
+        """Identifier le client par l'uid du processus pair (SO_PEERCRED, Linux), pour la limitation des connexions."""
+        sock = writer.get_extra_info("socket")
+        try:
+            _, uid, _ = struct.unpack("3i", sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")))
+        except (AttributeError, OSError):
+            return None
+        return f"uid:{uid}"
+
+    async def _dispatch(self, request: Dict[str, Any], source=None) -> Dict[str, Any]:
+        request_id = request.get("id")
+        operation = self._operations.get(request.get("op"))
+        if operation is None:
+            return {"id": request_id, "ok": False, "error": f"Opération inconnue: {request.get('op')}"}
+        func, offload = operation
+        # La source est fixée par le serveur, jamais par le client
+        args = {**(request.get("args") or {}), "source": source}
+        call = functools.partial(func, request.get("token"), args)
+        try:
+            if offload:
+                result = await asyncio.get_running_loop().run_in_executor(self._executor, call)
+            else:
+                result = call()
+            return {"id": request_id, "ok": True, "result": result}
+        except PermissionError as e:
+            return {"id": request_id, "ok": False, "error": str(e)}
+        except (KeyError, ValueError, TypeError) as e:
+            return {"id": request_id, "ok": False, "error": f"Requête invalide: {e}"}
+        except Exception as e:
+            logger.error(f"Erreur lors du traitement de la requête {request.get('op')}: {e}")
+            return {"id": request_id, "ok": False, "error": "Erreur interne"}
+
+    async def _respond(self, request, writer, write_lock, source, inflight):
+        try:
+            response = await self._dispatch(request, source)
+            async with write_lock:
+                writer.write(encode_frame(response))
+                await writer.drain()
+        finally:
+            inflight.release()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+        # Borne les tâches de la connexion : un client qui envoie sans lire ne remplit ni la mémoire ni le pool
+        inflight = asyncio.Semaphore(self.max_inflight)
+        pending = set()
+        source = self._peer_source(writer)
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(HEADER.size)
+                    payload = await reader.readexactly(read_length(header))
+                    request = decode_payload(payload)
+                except asyncio.IncompleteReadError:
+                    break
+                except ProtocolError as e:
+                    logger.warning(f"Connexion fermée: {e}")
+                    break
+                await inflight.acquire()
+                task = asyncio.create_task(self._respond(request, writer, write_lock, source, inflight))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            writer.close()
+            with contextlib.suppress(Exception):
+                await writer.wait_closed()
+
+    async def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            # Socket restée d'une exécution précédente
+            os.unlink(self.socket_path)
+        previous_umask = os.umask(0o177)  # socket accessible au seul propriétaire
+        try:
+            self._server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        finally:
+            os.umask(previous_umask)
+        logger.info(f"Serveur à l'écoute sur {self.socket_path}")
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._server.close)
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._executor.shutdown(wait=True)
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            logger.info("Serveur arrêté")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serveur local du gestionnaire de mots de passe")
+    parser.add_argument("--socket", default=Config.SERVER_SOCKET_PATH)
+    parser.add_argument("--workers", type=int, default=None, help="Threads de traitement des requêtes")
+    parser.add_argument("--transfer-dir", default=None,
+                        help="Répertoire des fichiers d'import/export (défaut: Config.SERVER_TRANSFER_DIR)")
+    parser.add_argument("--log-level", default=None,
+                        help="Niveau de la journalisation racine (ex. WARNING pour réduire la latence)")
+    args = parser.parse_args(argv)
+
+    from main import PasswordManager
+    from security import get_cipher
+
+    if args.log_level:
+        logging.getLogger().setLevel(args.log_level.upper())
+
+    manager = PasswordManager()
+    get_cipher()  # charger la clé avant la première requête
+    asyncio.run(PasswordManagerServer(manager, args.socket, args.workers,
+                                      transfer_dir=args.transfer_dir).serve_forever())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
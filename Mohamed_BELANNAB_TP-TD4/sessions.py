@@ -0,0 +1,140 @@
+# sessions.py
+import secrets
+import threading
+import time
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Set, List
+
+from config import Config
+from secret_cache import SecretCache
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Session:
+    """Session authentifiée. Le jeton n'apparaît pas dans repr() pour ne pas fuiter dans les logs."""
+    token: str = field(repr=False)
+    user_id: int
+    username: str
+    created_at: float
+    expires_at: float
+    # Cache optionnel des secrets déchiffrés, propre à la session
+    secret_cache: Optional[SecretCache] = field(default=None, repr=False)
+
+class SessionManager:
+    """
+    Table des sessions en mémoire, indexée par jeton opaque.
+    Les sessions sont conservées dans l'ordre du dernier accès : l'expiration
+    (glissante) et l'éviction quand la table est pleine retirent toujours les
+    plus anciennes en tête, en O(1) amorti.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_sessions: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else Config.SESSION_TTL
+        self.max_sessions = max_sessions or Config.SESSION_MAX
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "expired": 0, "evicted": 0, "revoked": 0}
+
+    def _discard(self, token: str) -> Optional[Session]:
+        """Retirer une session des deux index et effacer son cache de secrets."""
+        session = self._sessions.pop(token, None)
+        if session is None:
+            return None
+        tokens = self._tokens_by_user.get(session.user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[session.user_id]
+        if session.secret_cache is not None:
+            session.secret_cache.clear()
+        return session
+
+    def _purge_expired(self, now: float) -> None:
+        while self._sessions:
+            token, session = next(iter(self._sessions.items()))
+            if session.expires_at > now:
+                break
+            self._discard(token)
+            self._stats["expired"] += 1
+
+    def create(self, user: Dict[str, Any]) -> str:
+        """Ouvrir une session pour un utilisateur authentifié et retourner son jeton."""
+        token = secrets.token_urlsafe(32)
+        now = time.monotonic()
+        session = Session(token, user['id'], user['username'], now, now + self.ttl)
+        with self._lock:
+            self._purge_expired(now)
+            while len(self._sessions) >= self.max_sessions:
+                self._discard(next(iter(self._sessions)))
+                self._stats["evicted"] += 1
+            self._sessions[token] = session
+            self._tokens_by_user.setdefault(session.user_id, set()).add(token)
+            self._stats["created"] += 1
+        return token
+
+    def adopt(self, token: str, user_id: int, username: str, ttl: float) -> Session:
+        """Enregistrer en mémoire une session existante (ex. restaurée depuis la base)."""
+        now = time.monotonic()
+        session = Session(token, user_id, username, now, now + ttl)
+        with self._lock:
+            self._discard(token)
+            self._sessions[token] = session
+            self._tokens_by_user.setdefault(user_id, set()).add(token)
+        return session
+
+    def get(self, token: Optional[str]) -> Optional[Session]:
+        """Valider un jeton et prolonger la session, sans accès à la base de données."""
+        if not token:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return None
+            if session.expires_at <= now:
+                self._discard(token)
+                self._stats["expired"] += 1
+                return None
+            session.expires_at = now + self.ttl
+            self._sessions.move_to_end(token)
+            return session
+
+    def revoke(self, token: Optional[str]) -> bool:
+        """Fermer une session. Retourne False si le jeton était inconnu."""
+        with self._lock:
+            session = self._discard(token)
+            if session is not None:
+                self._stats["revoked"] += 1
+            return session is not None
+
+    def revoke_user(self, user_id: int) -> int:
+        """Fermer toutes les sessions d'un utilisateur."""
+        with self._lock:
+            tokens = list(self._tokens_by_user.get(user_id, ()))
+            for token in tokens:
+                self._discard(token)
+            self._stats["revoked"] += len(tokens)
+            return len(tokens)
+
+    def sessions_for_user(self, user_id: int) -> List[Session]:
+        """Sessions ouvertes d'un utilisateur (sans parcourir toute la table)."""
+        with self._lock:
+            return [self._sessions[token] for token in self._tokens_by_user.get(user_id, ())]
+
+    def invalidate_secret(self, user_id: int, password_id: int) -> None:
+        """Retirer une entrée des caches de secrets de toutes les sessions de l'utilisateur."""
+        for session in self.sessions_for_user(user_id):
+            if session.secret_cache is not None:
+                session.secret_cache.invalidate(password_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Retourner le nombre de sessions actives et les compteurs de cycle de vie."""
+        with self._lock:
+            return {**self._stats, "active": len(self._sessions)}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,72 @@
+# startup_profile.py
+"""
+Mesure du démarrage à froid de l'application.
+
+    python startup_profile.py              # profil des imports de main (équivalent -X importtime)
+    python startup_profile.py --runs 10    # + temps de démarrage complet (import + PasswordManager())
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Dict, Any
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def profile_imports(module: str = "main") -> List[Dict[str, Any]]:
+    """Importer `module` dans un interpréteur neuf avec -X importtime et analyser le rapport."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, capture_output=True, text=True
+    )
+    entries = []
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({
+                "module": name,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                "depth": len(indent) // 2,
+            })
+    if completed.returncode != 0:
+        raise RuntimeError(f"Échec de l'import de {module}: {completed.stderr.strip().splitlines()[-1:]}")
+    return entries
+
+def time_startup(runs: int = 5) -> Dict[str, float]:
+    """Mesurer le démarrage complet (import de main + PasswordManager()) dans des processus neufs."""
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", "import main; main.PasswordManager()"],
+            cwd=APP_DIR, check=True, stdout=subprocess.DEVNULL
+        )
+        durations.append((time.perf_counter() - start) * 1000)
+    return {"runs": runs, "min_ms": min(durations), "median_ms": statistics.median(durations)}
+
+def print_report(module: str = "main", top: int = 15, runs: int = 0) -> None:
+    entries = profile_imports(module)
+    root = next((entry for entry in entries if entry["module"] == module), None)
+    if root is not None:
+        print(f"Import de {module}: {root['cumulative_ms']:.1f} ms au total")
+    print(f"\n{'cumulé (ms)':>12} {'propre (ms)':>12}  module")
+    for entry in sorted(entries, key=lambda e: e["cumulative_ms"], reverse=True)[:top]:
+        print(f"{entry['cumulative_ms']:12.1f} {entry['self_ms']:12.1f}  {'  ' * entry['depth']}{entry['module']}")
+    if runs:
+        timing = time_startup(runs)
+        print(f"\nDémarrage complet sur {timing['runs']} essais: "
+              f"min {timing['min_ms']:.1f} ms, médiane {timing['median_ms']:.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profil du démarrage à froid")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=0, help="Nombre de démarrages complets à chronométrer")
+    args = parser.parse_args()
+    print_report(args.module, args.top, args.runs)
@@ -0,0 +1,933 @@
+# storage.py
+"""
+Moteurs de stockage interchangeables du gestionnaire de mots de passe.
+
+    sqlite  : database.py (pool de connexions, migrations, FTS5) — par défaut
+    memory  : dictionnaires indexés en mémoire, rien n'est écrit sur disque
+    cached  : SQLite derrière un cache de lecture LRU avec durée de vie
+
+Le moteur est choisi par Config.STORAGE_BACKEND (ou la variable d'environnement
+PASSWORD_MANAGER_STORAGE) ; get_backend() retourne l'instance partagée. Le moteur
+en mémoire sert aux essais et aux bancs d'essai : mêmes résultats que SQLite,
+sans fichier ni connexion. La rotation de clé (key_rotation.py) travaille
+directement sur la base SQLite.
+"""
+import bisect
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import database
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Poids des colonnes dans le classement de la recherche (comme bm25 dans la migration 5)
+SEARCH_WEIGHTS = (("site_name", 10.0), ("username", 5.0), ("notes", 1.0))
+
+class StorageBackend(ABC):
+    """
+    Protocole commun des moteurs de stockage. Les signatures et les résultats
+    (dictionnaires par ligne, ValueError pour un doublon ou une colonne inconnue)
+    sont ceux des fonctions de database.py.
+    """
+
+    name = "abstract"
+
+    @abstractmethod
+    def initialize(self) -> None: ...
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Regrouper plusieurs écritures : une exception dans le bloc les annule toutes."""
+        yield
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """
+        Exécuter `callback` après la validation de la transaction() ouverte dans
+        ce thread, ou aussitôt hors transaction ; jamais si elle est annulée.
+        """
+        callback()
+
+    def stats(self) -> Dict[str, float]:
+        """Compteurs propres au moteur, exposés en jauge."""
+        return {}
+
+    def close(self) -> None:
+        """Libérer les ressources du moteur."""
+
+    # Utilisateurs
+    @abstractmethod
+    def add_user(self, username: str, password_hash: str, email: str) -> int: ...
+
+    @abstractmethod
+    def get_user_by_username(self, username: str) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def update_user_password_hash(self, user_id: int, password_hash: str) -> None: ...
+
+    # Entrées du coffre
+    @abstractmethod
+    def add_password(self, user_id: int, site_name: str, username: str, encrypted_password: str,
+                     notes: Optional[str] = None) -> int: ...
+
+    @abstractmethod
+    def add_passwords_bulk(self, user_id: int, entries: Sequence[Tuple]) -> int: ...
+
+    @abstractmethod
+    def get_password_by_id(self, password_id: int, user_id: int) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def update_password(self, password_id: int, user_id: int, changes: Dict[str, Any]) -> bool: ...
+
+    @abstractmethod
+    def delete_password(self, password_id: int, user_id: int) -> bool: ...
+
+    @abstractmethod
+    def get_passwords_page(self, user_id: int, after_id: int = 0, limit: int = 50,
+                           columns: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def get_passwords_by_ids(self, user_id: int, password_ids: Iterable[int],
+                             columns: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]: ...
+
+    def iter_passwords_by_user_id(self, user_id: int, chunk_size: int = 1000,
+                                  columns: Optional[Iterable[str]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Parcourir les entrées d'un utilisateur page par page (pagination par clé)."""
+        after_id = 0
+        while True:
+            rows = self.get_passwords_page(user_id, after_id, chunk_size, columns)
+            if not rows:
+                break
+            yield rows
+            if len(rows) < chunk_size:
+                break
+            after_id = rows[-1]["id"]
+
+    @abstractmethod
+    def search_passwords(self, user_id: int, query: str, limit: int = 20, fuzzy: bool = False,
+                         columns: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def replace_encrypted_passwords(self, updates: Sequence[Tuple]) -> int: ...
+
+    # (id, user_id, encrypted_password) des entrées encore au format Fernet (TEXT), triées par id
+    @abstractmethod
+    def get_legacy_passwords_page(self, after_id: int = 0, limit: int = 1000) -> List[Tuple]: ...
+
+    # Clés de données des utilisateurs (enveloppées par la clé principale)
+    @abstractmethod
+    def get_user_keys(self, user_id: int) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def get_active_user_key_id(self, user_id: int) -> Optional[int]: ...
+
+    @abstractmethod
+    def add_user_key(self, user_id: int, wrapped_key: bytes, created_at: float) -> int: ...
+
+    @abstractmethod
+    def delete_user_keys(self, user_id: int, key_ids: Sequence[int]) -> int: ...
+
+    # Sessions persistées
+    @abstractmethod
+    def save_session(self, token_hash: str, user_id: int, username: str, expires_at: float) -> None: ...
+
+    @abstractmethod
+    def get_persisted_session(self, token_hash: str) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def delete_persisted_session(self, token_hash: Optional[str] = None, before: Optional[float] = None) -> int: ...
+
+    # Limitation des connexions
+    @abstractmethod
+    def get_throttle_state(self, throttle_key: str) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def save_throttle_state(self, throttle_key: str, failures: int, locked_until: float, updated_at: float) -> None: ...
+
+    @abstractmethod
+    def delete_throttle_state(self, throttle_key: Optional[str] = None, before: Optional[float] = None) -> int: ...
+
+    # Journal d'audit (ajout seul, voir audit.py)
+    @abstractmethod
+    def get_audit_head(self) -> Optional[Tuple[int, bytes]]: ...
+
+    @abstractmethod
+    def append_audit_events(self, rows: Sequence[Tuple]) -> bool: ...
+
+    @abstractmethod
+    def get_audit_events_page(self, after_id: int = 0, limit: int = 1000) -> List[Tuple]: ...
+
+    @abstractmethod
+    def query_audit_events(self, start: Optional[float] = None, end: Optional[float] = None,
+                           user_id: Optional[int] = None, entry_id: Optional[int] = None,
+                           events: Optional[Sequence[int]] = None, limit: int = 1000) -> List[Dict[str, Any]]: ...
+
+class SQLiteBackend(StorageBackend):
+    """Moteur par défaut : délègue aux fonctions de database.py (Config.DATABASE_PATH)."""
+
+    name = "sqlite"
+
+    def initialize(self) -> None:
+        database.initialize_database()
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        with database.transaction():
+            yield
+
+    def after_commit(self, callback):
+        database.after_commit(callback)
+
+    def stats(self) -> Dict[str, float]:
+        return database.get_pool_stats()
+
+    def close(self) -> None:
+        database.close_pool()
+
+    def add_user(self, username, password_hash, email):
+        return database.add_user(username, password_hash, email)
+
+    def get_user_by_username(self, username):
+        return database.get_user_by_username(username)
+
+    def update_user_password_hash(self, user_id, password_hash):
+        database.update_user_password_hash(user_id, password_hash)
+
+    def add_password(self, user_id, site_name, username, encrypted_password, notes=None):
+        return database.add_password(user_id, site_name, username, encrypted_password, notes)
+
+    def add_passwords_bulk(self, user_id, entries):
+        return database.add_passwords_bulk(user_id, entries)
+
+    def get_password_by_id(self, password_id, user_id):
+        return database.get_password_by_id(password_id, user_id)
+
+    def update_password(self, password_id, user_id, changes):
+        return database.update_password(password_id, user_id, changes)
+
+    def delete_password(self, password_id, user_id):
+        return database.delete_password(password_id, user_id)
+
+    def get_passwords_page(self, user_id, after_id=0, limit=50, columns=None):
+        return database.get_passwords_page(user_id, after_id, limit, columns)
+
+    def get_passwords_by_ids(self, user_id, password_ids, columns=None):
+        return database.get_passwords_by_ids(user_id, password_ids, columns)
+
+    def search_passwords(self, user_id, query, limit=20, fuzzy=False, columns=None):
+        return database.search_passwords(user_id, query, limit, fuzzy, columns)
+
+    def replace_encrypted_passwords(self, updates):
+        return database.replace_encrypted_passwords(updates)
+
+    def get_legacy_passwords_page(self, after_id=0, limit=1000):
+        return database.get_legacy_passwords_page(after_id, limit)
+
+    def get_user_keys(self, user_id):
+        return database.get_user_keys(user_id)
+
+    def get_active_user_key_id(self, user_id):
+        return database.get_active_user_key_id(user_id)
+
+    def add_user_key(self, user_id, wrapped_key, created_at):
+        return database.add_user_key(user_id, wrapped_key, created_at)
+
+    def delete_user_keys(self, user_id, key_ids):
+        return database.delete_user_keys(user_id, key_ids)
+
+    def save_session(self, token_hash, user_id, username, expires_at):
+        database.save_session(token_hash, user_id, username, expires_at)
+
+    def get_persisted_session(self, token_hash):
+        return database.get_persisted_session(token_hash)
+
+    def delete_persisted_session(self, token_hash=None, before=None):
+        return database.delete_persisted_session(token_hash, before)
+
+    def get_throttle_state(self, throttle_key):
+        return database.get_throttle_state(throttle_key)
+
+    def save_throttle_state(self, throttle_key, failures, locked_until, updated_at):
+        database.save_throttle_state(throttle_key, failures, locked_until, updated_at)
+
+    def delete_throttle_state(self, throttle_key=None, before=None):
+        return database.delete_throttle_state(throttle_key, before)
+
+    def get_audit_head(self):
+        return database.get_audit_head()
+
+    def append_audit_events(self, rows):
+        return database.append_audit_events(rows)
+
+    def get_audit_events_page(self, after_id=0, limit=1000):
+        return database.get_audit_events_page(after_id, limit)
+
+    def query_audit_events(self, start=None, end=None, user_id=None, entry_id=None, events=None, limit=1000):
+        return database.query_audit_events(start, end, user_id, entry_id, events, limit)
+
+def _row_trigrams(row: Dict[str, Any]) -> List[str]:
+    """Trigrammes des colonnes cherchées d'une entrée, en minuscules."""
+    return database._trigrams([row[column] or "" for column, _ in SEARCH_WEIGHTS])
+
+def _timestamp() -> str:
+    """Horodatage UTC au format de CURRENT_TIMESTAMP (SQLite)."""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+
+class MemoryBackend(StorageBackend):
+    """
+    Moteur en mémoire : des dictionnaires indexés par id, par nom d'utilisateur
+    et par email, et pour chaque utilisateur la liste triée des ids de ses
+    entrées (pagination par dichotomie). Les lignes ne sont jamais modifiées en
+    place : une mise à jour remplace la ligne, et les appelants reçoivent des copies.
+    La recherche s'appuie sur un index de trigrammes par utilisateur, construit
+    à la première recherche puis tenu à jour à chaque écriture.
+
+    Un verrou réentrant sérialise les opérations ; transaction() le garde pour
+    tout le bloc et restaure un instantané des index si le bloc échoue.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._in_transaction = False
+        # Thread propriétaire de la transaction ouverte et actions à exécuter à sa validation
+        self._transaction_owner: Optional[int] = None
+        self._after_commit: List[Callable[[], None]] = []
+        self._users: Dict[int, Dict[str, Any]] = {}
+        self._user_ids_by_username: Dict[str, int] = {}
+        self._user_ids_by_email: Dict[str, int] = {}
+        self._passwords: Dict[int, Dict[str, Any]] = {}
+        self._password_ids_by_user: Dict[int, List[int]] = {}
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._throttle: Dict[str, Dict[str, Any]] = {}
+        self._user_keys: Dict[int, List[Dict[str, Any]]] = {}  # user_id -> clés, de la plus ancienne
+        # Journal d'audit : lignes dans l'ordre des ids (id = position + 1) et
+        # positions par utilisateur et par entrée. Hors des instantanés de
+        # transaction : le journal ne s'annule pas avec les écritures qu'il décrit.
+        self._audit: List[Tuple] = []
+        self._audit_by_user: Dict[int, List[int]] = {}
+        self._audit_by_entry: Dict[int, List[int]] = {}
+        # user_id -> trigramme -> ids des entrées qui le contiennent
+        self._trigram_index: Dict[int, Dict[str, set]] = {}
+        # Comme AUTOINCREMENT : un id n'est jamais réutilisé
+        self._next_user_id = 1
+        self._next_password_id = 1
+        self._next_key_id = 1
+
+    def initialize(self) -> None:
+        logger.debug("Stockage en mémoire: aucune initialisation nécessaire")
+
+    def _snapshot(self) -> Tuple:
+        return (
+            dict(self._users), dict(self._user_ids_by_username), dict(self._user_ids_by_email),
+            dict(self._passwords), {user_id: list(ids) for user_id, ids in self._password_ids_by_user.items()},
+            dict(self._sessions), dict(self._throttle),
+            {user_id: list(keys) for user_id, keys in self._user_keys.items()},
+            self._next_user_id, self._next_password_id, self._next_key_id,
+        )
+
+    def _restore(self, snapshot: Tuple) -> None:
+        (self._users, self._user_ids_by_username, self._user_ids_by_email, self._passwords,
+         self._password_ids_by_user, self._sessions, self._throttle, self._user_keys,
+         self._next_user_id, self._next_password_id, self._next_key_id) = snapshot
+        # Index de recherche reconstruits à la demande plutôt que copiés dans l'instantané
+        self._trigram_index = {}
+
+    def _index_row(self, row: Dict[str, Any], remove: bool = False) -> None:
+        """Ajouter (ou retirer) les trigrammes d'une entrée, si l'index de son utilisateur existe."""
+        index = self._trigram_index.get(row["user_id"])
+        if index is None:
+            return
+        for gram in _row_trigrams(row):
+            if remove:
+                ids = index.get(gram)
+                if ids is not None:
+                    ids.discard(row["id"])
+                    if not ids:
+                        del index[gram]
+            else:
+                index.setdefault(gram, set()).add(row["id"])
+
+    def _user_trigrams(self, user_id: int) -> Dict[str, set]:
+        index = self._trigram_index.get(user_id)
+        if index is None:
+            index = self._trigram_index[user_id] = {}
+            for password_id in self._password_ids_by_user.get(user_id, ()):
+                self._index_row(self._passwords[password_id])
+        return index
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        with self._lock:
+            if self._in_transaction:
+                # Transaction déjà ouverte : le bloc externe décide de l'annulation
+                yield
+                return
+            snapshot = self._snapshot()
+            self._in_transaction = True
+            self._transaction_owner = threading.get_ident()
+            self._after_commit = callbacks = []
+            try:
+                yield
+            except BaseException:
+                self._restore(snapshot)
+                raise
+            finally:
+                self._in_transaction = False
+                self._transaction_owner = None
+                self._after_commit = []
+        for callback in callbacks:
+            callback()
+
+    def after_commit(self, callback):
+        # Sans prendre le verrou : seul le thread propriétaire voit son propre id
+        if self._transaction_owner == threading.get_ident():
+            self._after_commit.append(callback)
+        else:
+            callback()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {"users": len(self._users), "passwords": len(self._passwords),
+                    "sessions": len(self._sessions), "throttle_keys": len(self._throttle),
+                    "audit_events": len(self._audit)}
+
+    def add_user(self, username, password_hash, email):
+        with self._lock:
+            if username in self._user_ids_by_username or email in self._user_ids_by_email:
+                logger.error(f"L'utilisateur {username} ou l'email {email} existe déjà")
+                raise ValueError(f"L'utilisateur {username} ou l'email {email} existe déjà")
+            user_id = self._next_user_id
+            self._next_user_id += 1
+            self._users[user_id] = {"id": user_id, "username": username, "password_hash": password_hash,
+                                    "email": email, "created_at": _timestamp()}
+            self._user_ids_by_username[username] = user_id
+            self._user_ids_by_email[email] = user_id
+        logger.info(f"Nouvel utilisateur créé avec ID: {user_id}")
+        return user_id
+
+    def get_user_by_username(self, username):
+        with self._lock:
+            user_id = self._user_ids_by_username.get(username)
+            return dict(self._users[user_id]) if user_id is not None else None
+
+    def update_user_password_hash(self, user_id, password_hash):
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is not None:
+                self._users[user_id] = {**user, "password_hash": password_hash}
+        logger.info(f"Hash du mot de passe mis à jour pour l'utilisateur {user_id}")
+
+    def _insert_password(self, user_id, site_name, username, encrypted_password, notes):
+        password_id = self._next_password_id
+        self._next_password_id += 1
+        now = _timestamp()
+        row = self._passwords[password_id] = {
+            "id": password_id, "user_id": user_id, "site_name": site_name, "username": username,
+            "encrypted_password": encrypted_password, "notes": notes, "created_at": now, "updated_at": now,
+        }
+        self._index_row(row)
+        # Les ids sont croissants : l'ajout en fin garde la liste triée
+        self._password_ids_by_user.setdefault(user_id, []).append(password_id)
+        return password_id
+
+    def add_password(self, user_id, site_name, username, encrypted_password, notes=None):
+        with self._lock:
+            password_id = self._insert_password(user_id, site_name, username, encrypted_password, notes)
+        logger.info(f"Nouveau mot de passe ajouté avec ID: {password_id}")
+        return password_id
+
+    def add_passwords_bulk(self, user_id, entries):
+        with self._lock:
+            for entry in entries:
+                self._insert_password(user_id, *entry)
+        logger.debug(f"{len(entries)} mots de passe ajoutés en lot pour l'utilisateur {user_id}")
+        return len(entries)
+
+    def _owned(self, password_id, user_id) -> Optional[Dict[str, Any]]:
+        row = self._passwords.get(password_id)
+        return row if row is not None and row["user_id"] == user_id else None
+
+    def get_password_by_id(self, password_id, user_id):
+        with self._lock:
+            row = self._owned(password_id, user_id)
+            return dict(row) if row is not None else None
+
+    def update_password(self, password_id, user_id, changes):
+        unknown = set(changes) - set(database.UPDATABLE_PASSWORD_COLUMNS)
+        if unknown:
+            raise ValueError(f"Colonnes non modifiables: {', '.join(sorted(unknown))}")
+        with self._lock:
+            row = self._owned(password_id, user_id)
+            if row is None:
+                return False
+            if changes:
+                self._index_row(row, remove=True)
+                self._passwords[password_id] = {**row, **changes, "updated_at": _timestamp()}
+                self._index_row(self._passwords[password_id])
+                logger.info(f"Mot de passe mis à jour: ID {password_id}")
+            return True
+
+    def delete_password(self, password_id, user_id):
+        with self._lock:
+            row = self._owned(password_id, user_id)
+            if row is None:
+                return False
+            self._index_row(row, remove=True)
+            del self._passwords[password_id]
+            ids = self._password_ids_by_user[user_id]
+            del ids[bisect.bisect_left(ids, password_id)]
+        logger.info(f"Mot de passe supprimé: ID {password_id}")
+        return True
+
+    def get_passwords_page(self, user_id, after_id=0, limit=50, columns=None):
+        columns = database._validate_columns(columns)
+        with self._lock:
+            ids = self._password_ids_by_user.get(user_id, ())
+            start = bisect.bisect_right(ids, after_id)
+            rows = [self._passwords[password_id] for password_id in ids[start:start + limit]]
+        return [{column: row[column] for column in columns} for row in rows]
+
+    def get_passwords_by_ids(self, user_id, password_ids, columns=None):
+        columns = database._validate_columns(columns)
+        with self._lock:
+            rows = [row for row in (self._owned(password_id, user_id) for password_id in sorted(set(password_ids)))
+                    if row is not None]
+        return [{column: row[column] for column in columns} for row in rows]
+
+    def search_passwords(self, user_id, query, limit=20, fuzzy=False, columns=None):
+        """
+        Mêmes règles que database.search_passwords, par parcours des entrées de
+        l'utilisateur : sous-chaînes (termes de 3 caractères ou plus), préfixes
+        du site ou du nom d'utilisateur (termes plus courts), ou trigrammes partagés
+        avec `fuzzy`. Le classement pondère les colonnes comme bm25, sans normalisation
+        par longueur : à score proche, l'ordre peut différer de celui de SQLite.
+        """
+        terms = [term.lower() for term in query.split()]
+        if not terms:
+            return []
+        columns = database._validate_columns(columns)
+        grams = database._trigrams(terms)
+        # Comme SQLite : une requête floue sans trigramme (termes trop courts) devient une recherche par préfixe
+        indexed = bool(grams) if fuzzy else all(len(term) >= 3 for term in terms)
+        with self._lock:
+            if indexed:
+                # Candidats : entrées ayant un trigramme de la requête (fuzzy) ou tous
+                # les trigrammes de chaque terme ; la sous-chaîne est vérifiée ensuite
+                index = self._user_trigrams(user_id)
+                if fuzzy:
+                    candidates = set().union(*(index.get(gram, ()) for gram in grams))
+                else:
+                    # Intersection en partant de l'ensemble le plus petit
+                    postings = sorted((index.get(gram, set()) for gram in grams), key=len)
+                    candidates = set(postings[0])
+                    for ids in postings[1:]:
+                        if not candidates:
+                            break
+                        candidates &= ids
+                rows = [self._passwords[password_id] for password_id in candidates]
+            else:
+                rows = [self._passwords[password_id] for password_id in self._password_ids_by_user.get(user_id, ())]
+
+        if indexed:
+            needles = grams if fuzzy else terms
+            scored = []
+            for row in rows:
+                texts = [(str(row[column] or "").lower(), weight) for column, weight in SEARCH_WEIGHTS]
+                found = [sum(weight for text, weight in texts if needle in text) for needle in needles]
+                if any(found) if fuzzy else all(found):
+                    scored.append((not texts[0][0].startswith(terms[0]), -sum(found), row["id"], row))
+            scored.sort(key=lambda item: item[:3])
+            matches = [row for *_, row in scored[:limit]]
+        else:
+            matches = sorted(
+                (row for row in rows if all(
+                    row["site_name"].lower().startswith(term) or row["username"].lower().startswith(term)
+                    for term in terms
+                )),
+                key=lambda row: row["site_name"]
+            )[:limit]
+        return [{column: row[column] for column in columns} for row in matches]
+
+    def replace_encrypted_passwords(self, updates):
+        replaced = 0
+        with self._lock:
+            for new_token, password_id, old_token in updates:
+                row = self._passwords.get(password_id)
+                if row is not None and row["encrypted_password"] == old_token:
+                    self._passwords[password_id] = {**row, "encrypted_password": new_token,
+                                                    "updated_at": _timestamp()}
+                    replaced += 1
+        return replaced
+
+    def get_legacy_passwords_page(self, after_id=0, limit=1000):
+        with self._lock:
+            # Les ids croissent avec l'ordre d'insertion du dictionnaire
+            page = []
+            for password_id, row in self._passwords.items():
+                if password_id > after_id and isinstance(row["encrypted_password"], str):
+                    page.append((password_id, row["user_id"], row["encrypted_password"]))
+                    if len(page) >= limit:
+                        break
+            return page
+
+    def get_user_keys(self, user_id):
+        with self._lock:
+            return [dict(key) for key in self._user_keys.get(user_id, ())]
+
+    def get_active_user_key_id(self, user_id):
+        with self._lock:
+            keys = self._user_keys.get(user_id)
+            return keys[-1]["id"] if keys else None
+
+    def add_user_key(self, user_id, wrapped_key, created_at):
+        with self._lock:
+            key_id = self._next_key_id
+            self._next_key_id += 1
+            self._user_keys.setdefault(user_id, []).append(
+                {"id": key_id, "wrapped_key": wrapped_key, "created_at": created_at}
+            )
+            return key_id
+
+    def delete_user_keys(self, user_id, key_ids):
+        key_ids = set(key_ids)
+        with self._lock:
+            keys = self._user_keys.get(user_id, [])
+            kept = [key for key in keys if key["id"] not in key_ids]
+            self._user_keys[user_id] = kept
+            return len(keys) - len(kept)
+
+    def save_session(self, token_hash, user_id, username, expires_at):
+        with self._lock:
+            self._sessions[token_hash] = {"user_id": user_id, "username": username, "expires_at": expires_at}
+
+    def get_persisted_session(self, token_hash):
+        with self._lock:
+            session = self._sessions.get(token_hash)
+            return dict(session) if session is not None else None
+
+    def delete_persisted_session(self, token_hash=None, before=None):
+        with self._lock:
+            if token_hash is not None:
+                return 1 if self._sessions.pop(token_hash, None) is not None else 0
+            expired = [key for key, session in self._sessions.items() if session["expires_at"] <= before]
+            for key in expired:
+                del self._sessions[key]
+            return len(expired)
+
+    def get_throttle_state(self, throttle_key):
+        with self._lock:
+            state = self._throttle.get(throttle_key)
+            return dict(state) if state is not None else None
+
+    def save_throttle_state(self, throttle_key, failures, locked_until, updated_at):
+        with self._lock:
+            self._throttle[throttle_key] = {"failures": failures, "locked_until": locked_until,
+                                            "updated_at": updated_at}
+
+    def delete_throttle_state(self, throttle_key=None, before=None):
+        with self._lock:
+            if throttle_key is not None:
+                return 1 if self._throttle.pop(throttle_key, None) is not None else 0
+            stale = [key for key, state in self._throttle.items() if state["updated_at"] <= before]
+            for key in stale:
+                del self._throttle[key]
+            return len(stale)
+
+    def get_audit_head(self):
+        with self._lock:
+            return (self._audit[-1][0], self._audit[-1][7]) if self._audit else None
+
+    def append_audit_events(self, rows):
+        with self._lock:
+            if rows and rows[0][0] != len(self._audit) + 1:
+                return False
+            for row in rows:
+                position = len(self._audit)
+                self._audit.append(tuple(row))
+                if row[3] is not None:
+                    self._audit_by_user.setdefault(row[3], []).append(position)
+                if row[4] is not None:
+                    self._audit_by_entry.setdefault(row[4], []).append(position)
+            return True
+
+    def get_audit_events_page(self, after_id=0, limit=1000):
+        with self._lock:
+            return self._audit[max(after_id, 0):after_id + limit]
+
+    def query_audit_events(self, start=None, end=None, user_id=None, entry_id=None, events=None, limit=1000):
+        with self._lock:
+            # Parcourir la plus courte des listes de positions disponibles
+            candidates = [positions for positions in (
+                self._audit_by_user.get(user_id, []) if user_id is not None else None,
+                self._audit_by_entry.get(entry_id, []) if entry_id is not None else None,
+            ) if positions is not None]
+            positions = min(candidates, key=len) if candidates else range(len(self._audit))
+            matches = []
+            for position in positions:
+                row = self._audit[position]
+                if ((user_id is None or row[3] == user_id) and (entry_id is None or row[4] == entry_id)
+                        and (start is None or row[1] >= start) and (end is None or row[1] < end)
+                        and (not events or row[2] in events)):
+                    matches.append(row)
+            matches.sort(key=lambda row: (row[1], row[0]))
+            return [
+                {"id": row[0], "ts": row[1], "event": row[2], "user_id": row[3],
+                 "username": self._users[row[3]]["username"] if row[3] in self._users else None,
+                 "entry_id": row[4], "subject": row[5], "source": row[6]}
+                for row in matches[:limit]
+            ]
+
+class CachingBackend(StorageBackend):
+    """
+    Cache de lecture devant un autre moteur (SQLite par défaut). Les lectures
+    par clé (utilisateur par nom, entrée par id, session persistée) sont servies
+    depuis un LRU borné ; chaque écriture passe au moteur sous-jacent puis retire
+    les clés concernées, une seconde fois à la validation de la transaction en
+    cours. Une génération par clé, augmentée à chaque écriture, empêche une
+    lecture commencée avant l'écriture de remettre l'ancienne ligne en cache.
+    La durée de vie borne le retard sur les écritures faites par un autre
+    processus (CLI pendant que server.py tourne).
+    Les listes, pages et recherches ne sont pas mises en cache.
+    """
+
+    name = "cached"
+
+    def __init__(self, backend: Optional[StorageBackend] = None, max_entries: Optional[int] = None,
+                 ttl: Optional[float] = None):
+        self.backend = backend or SQLiteBackend()
+        self.max_entries = max_entries or Config.STORAGE_CACHE_SIZE
+        self.ttl = ttl if ttl is not None else Config.STORAGE_CACHE_TTL
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # clé -> nombre d'écritures ; l'époque invalide toutes les lectures en cours
+        # (table des générations vidée, écriture qui ne connaît pas ses clés)
+        self._generations: Dict[Tuple, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def _get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return dict(entry[1])
+            if entry is not None:
+                del self._entries[key]
+            self._stats["misses"] += 1
+            return None
+
+    def _load(self, key: Tuple, read: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Lire une ligne dans le moteur sous-jacent et la mettre en cache si aucune écriture ne l'a touchée entre-temps."""
+        with self._lock:
+            generation = (self._epoch, self._generations.get(key, 0))
+        return self._put(key, read(), generation)
+
+    def _put(self, key: Tuple, row: Optional[Dict[str, Any]], generation: Tuple[int, int]) -> Optional[Dict[str, Any]]:
+        # Les absences ne sont pas mises en cache : une création n'a rien à invalider
+        if row is None:
+            return None
+        with self._lock:
+            if (self._epoch, self._generations.get(key, 0)) != generation:
+                # Écriture pendant la lecture : la ligne lue est peut-être déjà périmée
+                return row
+            self._entries[key] = (time.monotonic() + self.ttl, dict(row))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return row
+
+    def _drop(self, keys: Sequence[Tuple], all_reads: bool = False) -> None:
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self._stats["invalidations"] += 1
+                self._generations[key] = self._generations.get(key, 0) + 1
+            if all_reads or len(self._generations) > self.max_entries:
+                self._generations.clear()
+                self._epoch += 1
+
+    def _invalidate(self, *keys: Tuple, all_reads: bool = False) -> None:
+        """
+        Retirer des clés après une écriture, puis de nouveau à la validation de la
+        transaction en cours : une lecture faite entre-temps a pu remettre en
+        cache la ligne d'avant. `all_reads` écarte aussi les lectures en cours
+        des autres clés (écriture dont on ne connaît pas toutes les clés).
+        """
+        self._drop(keys, all_reads)
+        self.backend.after_commit(lambda: self._drop(keys, all_reads))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+            self._epoch += 1
+
+    def initialize(self) -> None:
+        self.backend.initialize()
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        try:
+            with self.backend.transaction():
+                yield
+        except BaseException:
+            # Des lignes lues pendant la transaction annulée ont pu être mises en cache
+            self.clear()
+            raise
+
+    def after_commit(self, callback):
+        self.backend.after_commit(callback)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            cache = {f"cache_{key}": value for key, value in self._stats.items()}
+            cache["cache_size"] = len(self._entries)
+        return {**self.backend.stats(), **cache}
+
+    def close(self) -> None:
+        self.clear()
+        self.backend.close()
+
+    def add_user(self, username, password_hash, email):
+        return self.backend.add_user(username, password_hash, email)
+
+    def get_user_by_username(self, username):
+        key = ("user", username)
+        return self._get(key) or self._load(key, lambda: self.backend.get_user_by_username(username))
+
+    def update_user_password_hash(self, user_id, password_hash):
+        self.backend.update_user_password_hash(user_id, password_hash)
+        with self._lock:
+            stale = [key for key, (_, row) in self._entries.items() if key[0] == "user" and row["id"] == user_id]
+        # Une lecture en cours de cet utilisateur (par nom) n'est pas dans la liste
+        self._invalidate(*stale, all_reads=True)
+
+    def add_password(self, user_id, site_name, username, encrypted_password, notes=None):
+        return self.backend.add_password(user_id, site_name, username, encrypted_password, notes)
+
+    def add_passwords_bulk(self, user_id, entries):
+        return self.backend.add_passwords_bulk(user_id, entries)
+
+    def get_password_by_id(self, password_id, user_id):
+        key = ("password", password_id)
+        row = self._get(key)
+        if row is not None and row["user_id"] == user_id:
+            return row
+        return self._load(key, lambda: self.backend.get_password_by_id(password_id, user_id))
+
+    def update_password(self, password_id, user_id, changes):
+        try:
+            return self.backend.update_password(password_id, user_id, changes)
+        finally:
+            self._invalidate(("password", password_id))
+
+    def delete_password(self, password_id, user_id):
+        try:
+            return self.backend.delete_password(password_id, user_id)
+        finally:
+            self._invalidate(("password", password_id))
+
+    def get_passwords_page(self, user_id, after_id=0, limit=50, columns=None):
+        return self.backend.get_passwords_page(user_id, after_id, limit, columns)
+
+    def get_passwords_by_ids(self, user_id, password_ids, columns=None):
+        return self.backend.get_passwords_by_ids(user_id, password_ids, columns)
+
+    def search_passwords(self, user_id, query, limit=20, fuzzy=False, columns=None):
+        return self.backend.search_passwords(user_id, query, limit, fuzzy, columns)
+
+    def replace_encrypted_passwords(self, updates):
+        updates = list(updates)
+        try:
+            return self.backend.replace_encrypted_passwords(updates)
+        finally:
+            self._invalidate(*(("password", password_id) for _, password_id, _ in updates))
+
+    def get_legacy_passwords_page(self, after_id=0, limit=1000):
+        return self.backend.get_legacy_passwords_page(after_id, limit)
+
+    def get_user_keys(self, user_id):
+        return self.backend.get_user_keys(user_id)
+
+    def get_active_user_key_id(self, user_id):
+        return self.backend.get_active_user_key_id(user_id)
+
+    def add_user_key(self, user_id, wrapped_key, created_at):
+        return self.backend.add_user_key(user_id, wrapped_key, created_at)
+
+    def delete_user_keys(self, user_id, key_ids):
+        return self.backend.delete_user_keys(user_id, key_ids)
+
+    def save_session(self, token_hash, user_id, username, expires_at):
+        self.backend.save_session(token_hash, user_id, username, expires_at)
+        self._invalidate(("session", token_hash))
+
+    def get_persisted_session(self, token_hash):
+        key = ("session", token_hash)
+        return self._get(key) or self._load(key, lambda: self.backend.get_persisted_session(token_hash))
+
+    def delete_persisted_session(self, token_hash=None, before=None):
+        deleted = self.backend.delete_persisted_session(token_hash, before)
+        if token_hash is not None:
+            self._invalidate(("session", token_hash))
+        else:
+            with self._lock:
+                stale = [key for key, (_, row) in self._entries.items()
+                         if key[0] == "session" and row["expires_at"] <= before]
+            self._invalidate(*stale, all_reads=True)
+        return deleted
+
+    def get_throttle_state(self, throttle_key):
+        return self.backend.get_throttle_state(throttle_key)
+
+    def save_throttle_state(self, throttle_key, failures, locked_until, updated_at):
+        self.backend.save_throttle_state(throttle_key, failures, locked_until, updated_at)
+
+    def delete_throttle_state(self, throttle_key=None, before=None):
+        return self.backend.delete_throttle_state(throttle_key, before)
+
+    def get_audit_head(self):
+        return self.backend.get_audit_head()
+
+    def append_audit_events(self, rows):
+        return self.backend.append_audit_events(rows)
+
+    def get_audit_events_page(self, after_id=0, limit=1000):
+        return self.backend.get_audit_events_page(after_id, limit)
+
+    def query_audit_events(self, start=None, end=None, user_id=None, entry_id=None, events=None, limit=1000):
+        return self.backend.query_audit_events(start, end, user_id, entry_id, events, limit)
+
+BACKENDS = {
+    "sqlite": SQLiteBackend,
+    "memory": MemoryBackend,
+    "cached": CachingBackend,
+}
+
+def create_backend(name: str) -> StorageBackend:
+    """Créer un moteur par son nom (clé de BACKENDS)."""
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Moteur de stockage inconnu: {name} (choix: {', '.join(BACKENDS)})") from None
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend() -> StorageBackend:
+    """Moteur partagé choisi par Config.STORAGE_BACKEND, recréé si ce réglage change."""
+    global _backend
+    with _backend_lock:
+        if _backend is None or _backend.name != Config.STORAGE_BACKEND:
+            _backend = create_backend(Config.STORAGE_BACKEND)
+            logger.debug(f"Moteur de stockage: {_backend.name}")
+        return _backend
@@ -0,0 +1,83 @@
+# test_audit.py
+"""
+Journal d'audit : chaîne d'empreintes, écriture par lots, nouvel essai quand
+la base est verrouillée et mise en file à la validation des transactions.
+
+    python -m pytest test_audit.py
+"""
+import sqlite3
+
+import pytest
+
+import audit
+import database
+import storage
+from config import Config
+
+@pytest.fixture
+def memory_log():
+    log = audit.AuditLog(storage.MemoryBackend(), batch_size=2, flush_interval=10.0)
+    yield log
+    log.close()
+
+def _record(log, count, user_id=1):
+    for entry_id in range(1, count + 1):
+        log.record(audit.SECRET_READ, user_id, entry_id, source="test")
+
+def test_chain_verifies(memory_log):
+    _record(memory_log, 5)
+    memory_log.record_many(audit.SECRET_DELETED, 1, [6, 7])
+    result = memory_log.verify()
+    assert (result["checked"], result["head_id"], result["broken_at"]) == (7, 7, None)
+    assert [row["entry_id"] for row in memory_log.query(user_id=1)] == [1, 2, 3, 4, 5, 6, 7]
+
+def test_verify_detects_tampering(memory_log):
+    _record(memory_log, 5)
+    assert memory_log.flush(5.0)
+    rows = memory_log.storage._audit
+    # Ligne 3 réécrite (autre entrée) sans recalculer son empreinte
+    rows[2] = rows[2][:4] + (42,) + rows[2][5:]
+    assert memory_log.verify()["broken_at"] == 3
+    # Ligne 3 supprimée : l'id manquant casse aussi la chaîne
+    del rows[2]
+    assert memory_log.verify()["broken_at"] == 4
+
+def test_events_written_in_batches(memory_log):
+    _record(memory_log, 5)
+    assert memory_log.flush(5.0)
+    stats = memory_log.stats()
+    # Deux lots pleins, puis le reste écrit par flush() sans attendre flush_interval
+    assert (stats["written"], stats["batches"]) == (5, 3)
+
+def test_retry_while_database_locked(isolated, monkeypatch):
+    monkeypatch.setitem(Config.DB_PRAGMAS, "busy_timeout", 50)
+    database.close_pool()
+    log = audit.AuditLog(storage.SQLiteBackend(), flush_interval=0.01)
+    blocker = sqlite3.connect(Config.DATABASE_PATH)
+    try:
+        blocker.execute("BEGIN IMMEDIATE")
+        _record(log, 3)
+        assert not log.flush(0.5)
+        assert log.stats()["retries"] >= 1
+        assert log.stats()["written"] == 0
+        blocker.rollback()
+        # Rien n'est perdu : le lot gardé est écrit dès que le verrou est libéré
+        assert log.flush(5.0)
+        assert (log.stats()["written"], log.stats()["dropped"]) == (3, 0)
+        assert log.verify()["checked"] == 3
+    finally:
+        blocker.close()
+        log.close()
+
+def test_record_waits_for_commit(memory_log):
+    backend = memory_log.storage
+    with pytest.raises(RuntimeError):
+        with backend.transaction():
+            memory_log.record(audit.SECRET_CREATED, 1, 1)
+            raise RuntimeError("annulation")
+    with backend.transaction():
+        memory_log.record(audit.SECRET_CREATED, 1, 2)
+        # Pas encore en file tant que la transaction n'est pas validée
+        assert memory_log.stats()["queued"] == 0 and memory_log._thread is None
+    # L'événement de la transaction annulée n'est jamais écrit
+    assert [row["entry_id"] for row in memory_log.query()] == [2]
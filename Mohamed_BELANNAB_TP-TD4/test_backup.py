@@ -0,0 +1,70 @@
+# test_backup.py
+"""
+Sauvegardes : restauration d'une complète et de sa chaîne d'incrémentales,
+détection d'une archive altérée.
+
+    python -m pytest test_backup.py
+"""
+import sqlite3
+
+import pytest
+
+import backup
+import storage
+from config import Config
+
+def _rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT id, site_name, username, encrypted_password, notes FROM passwords ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+@pytest.fixture
+def vault(isolated):
+    backend = storage.SQLiteBackend()
+    user_id = backend.add_user("alice", "hash", "alice@example.com")
+    ids = [backend.add_password(user_id, f"site{i}", "alice", f"jeton{i}", None) for i in range(4)]
+    return backend, user_id, ids
+
+def test_full_and_incremental_round_trip(vault, isolated):
+    backend, user_id, ids = vault
+    full = backup.backup_full()
+    snapshot = _rows(Config.DATABASE_PATH)
+
+    backend.update_password(ids[1], user_id, {"notes": "modifiée"})
+    backend.delete_password(ids[2], user_id)
+    backend.add_password(user_id, "nouveau", "alice", "jeton-nouveau", None)
+    first = backup.backup_incremental()
+    backend.update_password(ids[0], user_id, {"site_name": "renommé"})
+    second = backup.backup_incremental()
+    expected = _rows(Config.DATABASE_PATH)
+
+    assert [manifest["kind"] for _, manifest in backup.resolve_chain(second["path"])] == \
+        ["full", "incremental", "incremental"]
+    target = str(isolated / "restauree.db")
+    assert backup.restore(second["path"], target)["rows"] == 4
+    assert _rows(target) == expected
+    # Chaque archive de la chaîne restaure l'état de son époque
+    assert backup.restore(full["path"], target)["archives"] == 1
+    assert _rows(target) == snapshot
+    backup.restore(first["path"], target)
+    assert [row[1] for row in _rows(target)] == ["site0", "site1", "site3", "nouveau"]
+
+def test_tampered_archive_rejected(vault, isolated):
+    path = backup.backup_full()["path"]
+    with open(path, "r+b") as f:
+        f.seek(-20, 2)
+        byte = f.read(1)
+        f.seek(-20, 2)
+        f.write(bytes([byte[0] ^ 0x01]))
+    target = str(isolated / "restauree.db")
+    with pytest.raises(ValueError, match="altérée"):
+        backup.restore(path, target)
+
+def test_truncated_archive_rejected(vault, isolated):
+    path = backup.backup_full()["path"]
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 10)
+    with pytest.raises(ValueError):
+        backup.restore(path, str(isolated / "restauree.db"))
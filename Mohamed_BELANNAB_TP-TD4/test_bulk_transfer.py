@@ -0,0 +1,40 @@
+# test_bulk_transfer.py
+"""
+Import de fichiers : les entrées invalides sont rejetées et comptées sans interrompre l'import.
+
+    python -m pytest test_bulk_transfer.py
+"""
+import json
+
+import storage
+from bulk_transfer import import_passwords
+from data_keys import get_user_cipher
+
+def _import(tmp_path, name, content):
+    backend = storage.MemoryBackend()
+    user_id = backend.add_user("alice", "hash", "alice@example.com")
+    path = tmp_path / name
+    path.write_text(content, encoding="utf-8")
+    # Un bloc par entrée : les entrées valides précédentes sont déjà enregistrées
+    stats = import_passwords(user_id, str(path), chunk_size=1, storage=backend)
+    rows = backend.get_passwords_page(user_id, 0, 10, ["site_name", "encrypted_password"])
+    cipher = get_user_cipher(user_id, backend)
+    return stats, [(row["site_name"], cipher.decrypt(row["encrypted_password"])) for row in rows]
+
+def test_jsonl_malformed_line_is_rejected(isolated):
+    lines = [
+        json.dumps({"site_name": "a.com", "username": "u", "password": "Pw-a"}),
+        '{"site_name": "tronquée", ',
+        json.dumps({"site_name": "b.com", "username": "u", "password": "Pw-b"}),
+    ]
+    stats, entries = _import(isolated, "in.jsonl", "\n".join(lines) + "\n")
+    assert (stats["imported"], stats["rejected"]) == (2, 1)
+    assert entries == [("a.com", "Pw-a"), ("b.com", "Pw-b")]
+
+def test_json_non_object_records_are_rejected(isolated):
+    records = [{"site_name": "a.com", "username": "u", "password": "Pw-a"}, "oops", 5, [1],
+               {"site_name": "b.com", "username": "u"}]
+    stats, entries = _import(isolated, "in.json", json.dumps(records))
+    # La dernière entrée n'a pas de mot de passe : rejetée par la validation
+    assert (stats["imported"], stats["rejected"]) == (1, 4)
+    assert entries == [("a.com", "Pw-a")]
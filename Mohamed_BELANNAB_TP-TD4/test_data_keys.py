@@ -0,0 +1,71 @@
+# test_data_keys.py
+"""
+Clés de données par utilisateur : migration des jetons Fernet, changement de
+clé d'un coffre et suppression des clés remplacées.
+
+    python -m pytest test_data_keys.py
+"""
+import pytest
+
+import data_keys
+import storage
+from security import blob_key_id, encrypt_password
+
+@pytest.fixture(params=["sqlite", "memory", "cached"])
+def backend(request, isolated):
+    backend = storage.create_backend(request.param)
+    backend.initialize()
+    yield backend
+    backend.close()
+
+def test_migrate_counts_unreadable_rows(backend):
+    user_id = backend.add_user("alice", "hash", "alice@example.com")
+    ids = [backend.add_password(user_id, f"site{i}", "alice", encrypt_password(f"secret{i}"), None) for i in range(3)]
+    legacy = backend.get_password_by_id(ids[1], user_id)["encrypted_password"]
+    backend.replace_encrypted_passwords([("gAAAAA-jeton-altere", ids[1], legacy)])
+
+    stats = data_keys.migrate_vault(chunk_size=1, storage=backend)
+    assert (stats["migrated"], stats["failed"]) == (2, 1)
+    # L'entrée illisible reste au format Fernet, les autres se lisent avec la clé de données
+    assert [row[0] for row in backend.get_legacy_passwords_page()] == [ids[1]]
+    cipher = data_keys.get_user_cipher(user_id, backend)
+    assert cipher.decrypt(backend.get_password_by_id(ids[2], user_id)["encrypted_password"]) == "secret2"
+
+def _vault(backend, count=3):
+    user_id = backend.add_user("alice", "hash", "alice@example.com")
+    cipher = data_keys.get_user_cipher(user_id, backend)
+    ids = [backend.add_password(user_id, f"site{i}", "alice", cipher.encrypt(f"secret{i}"), None) for i in range(count)]
+    return user_id, ids
+
+def _key_ids(backend, user_id, ids):
+    return {blob_key_id(backend.get_password_by_id(password_id, user_id)["encrypted_password"]) for password_id in ids}
+
+def test_rekey_reencrypts_vault(backend):
+    user_id, ids = _vault(backend)
+    old_key_id = data_keys.get_user_cipher(user_id, backend).active_key_id
+
+    stats = data_keys.rekey_user(user_id, backend, chunk_size=2)
+    assert (stats["rows"], stats["reencrypted"], stats["failed"]) == (3, 3, 0)
+    assert stats["key_id"] != old_key_id
+    assert _key_ids(backend, user_id, ids) == {stats["key_id"]}
+    cipher = data_keys.get_user_cipher(user_id, backend)
+    assert [cipher.decrypt(backend.get_password_by_id(password_id, user_id)["encrypted_password"])
+            for password_id in ids] == ["secret0", "secret1", "secret2"]
+
+def test_purge_keeps_recently_replaced_keys(backend):
+    user_id, _ = _vault(backend)
+    stats = data_keys.rekey_user(user_id, backend, purge=True)
+    # Clé remplacée à l'instant : conservée pendant DATA_KEY_PURGE_GRACE
+    assert stats["purged_keys"] == 0
+    assert len(backend.get_user_keys(user_id)) == 2
+    assert data_keys.purge_user_keys(user_id, backend, grace=0) == 1
+    assert [key["id"] for key in backend.get_user_keys(user_id)] == [stats["key_id"]]
+
+def test_purge_keeps_keys_still_in_use(backend):
+    user_id, _ = _vault(backend)
+    old_cipher = data_keys.get_user_cipher(user_id, backend)
+    data_keys.rekey_user(user_id, backend)
+    # Un processus qui n'a pas encore vu la nouvelle clé chiffre avec l'ancienne
+    backend.add_password(user_id, "retard", "alice", old_cipher.encrypt("secret"), None)
+    assert data_keys.purge_user_keys(user_id, backend, grace=0) == 0
+    assert len(backend.get_user_keys(user_id)) == 2
@@ -0,0 +1,63 @@
+# test_key_rotation.py
+"""
+Rotation de la clé principale : reprise d'un rechiffrement interrompu et
+refus de retirer les anciennes clés tant qu'une entrée en dépend.
+
+    python -m pytest test_key_rotation.py
+"""
+import os
+
+import pytest
+
+import key_rotation
+import storage
+from config import Config
+from security import encrypt_password, decrypt_password
+
+@pytest.fixture
+def vault(isolated):
+    backend = storage.SQLiteBackend()
+    user_id = backend.add_user("alice", "hash", "alice@example.com")
+    # Entrées au format Fernet, chiffrées avec la clé principale actuelle
+    for i in range(5):
+        backend.add_password(user_id, f"site{i}", "alice", encrypt_password(f"secret{i}"), None)
+    return backend, user_id
+
+def _tokens(backend, user_id):
+    return [row["encrypted_password"] for page in backend.iter_passwords_by_user_id(user_id, 100, ("encrypted_password",))
+            for row in page]
+
+def test_rotation_resumes_after_interruption(vault, monkeypatch):
+    backend, user_id = vault
+    before = _tokens(backend, user_id)
+    key_rotation.generate_new_key()
+
+    job = key_rotation.KeyRotationJob(chunk_size=2, workers=1)
+    update = key_rotation.update_key_rotation
+
+    def stop_after_first_chunk(*args, **kwargs):
+        update(*args, **kwargs)
+        job._stop_event.set()
+
+    monkeypatch.setattr(key_rotation, "update_key_rotation", stop_after_first_chunk)
+    progress = job.run()
+    assert (progress["status"], progress["rows_done"], progress["last_id"]) == ("stopped", 2, 2)
+    monkeypatch.setattr(key_rotation, "update_key_rotation", update)
+
+    progress = key_rotation.KeyRotationJob(chunk_size=2, workers=1).run()
+    assert (progress["status"], progress["rows_done"]) == ("completed", 5)
+    after = _tokens(backend, user_id)
+    assert all(old != new for old, new in zip(before, after))
+    # Les anciennes clés ne sont plus nécessaires
+    assert key_rotation.retire_old_keys() == 5
+    assert not os.path.exists(Config.RETIRED_KEYS_PATH)
+    assert [decrypt_password(token) for token in after] == [f"secret{i}" for i in range(5)]
+
+def test_retire_refuses_stale_rows(vault):
+    backend, user_id = vault
+    key_rotation.generate_new_key()
+    with pytest.raises(RuntimeError, match="5 entrée"):
+        key_rotation.retire_old_keys()
+    # Les anciennes clés sont conservées : le coffre reste lisible
+    assert os.path.exists(Config.RETIRED_KEYS_PATH)
+    assert decrypt_password(_tokens(backend, user_id)[0]) == "secret0"
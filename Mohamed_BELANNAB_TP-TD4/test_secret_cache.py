@@ -0,0 +1,56 @@
+# test_secret_cache.py
+"""
+Le cache des secrets d'une session ne doit jamais servir une valeur périmée
+ou annulée par un rollback.
+
+    python -m pytest test_secret_cache.py
+"""
+import pytest
+
+import storage
+from main import PasswordManager
+from secret_cache import SecretCache
+
+@pytest.fixture
+def manager(isolated):
+    manager = PasswordManager(storage.MemoryBackend())
+    manager.register_user("alice", "alice@example.com", "Motdepasse-tres-solide-42!")
+    token = manager.login_user("alice", "Motdepasse-tres-solide-42!")
+    manager.enable_secret_cache(token)
+    manager.store_password(token, "github.com", "alice", "ancien-secret-1")
+    password_id = manager.retrieve_passwords(token)[0]["id"]
+    return manager, token, password_id
+
+def test_put_refused_after_invalidation():
+    cache = SecretCache(max_entries=4, ttl=60)
+    generation = cache.generation()
+    cache.invalidate(1)
+    assert not cache.put(1, {"id": 1, "password": "ancien"}, generation)
+    assert cache.get(1) is None
+    assert cache.put(1, {"id": 1, "password": "nouveau"}, cache.generation())
+    assert cache.get(1)["password"] == "nouveau"
+    assert cache.stats()["stale"] == 1
+
+def test_read_started_before_update_not_cached(manager, monkeypatch):
+    manager, token, password_id = manager
+    read = manager.storage.get_password_by_id
+
+    def slow_read(*args):
+        # La lecture obtient l'ancienne ligne, puis une modification passe avant sa mise en cache
+        row = read(*args)
+        monkeypatch.setattr(manager.storage, "get_password_by_id", read)
+        manager.update_password(token, password_id, password="nouveau-secret-2")
+        return row
+
+    monkeypatch.setattr(manager.storage, "get_password_by_id", slow_read)
+    assert manager.retrieve_password(token, password_id)["password"] == "ancien-secret-1"
+    assert manager.retrieve_password(token, password_id)["password"] == "nouveau-secret-2"
+
+def test_rolled_back_value_not_cached(manager):
+    manager, token, password_id = manager
+    with pytest.raises(RuntimeError):
+        with manager.storage.transaction():
+            manager.update_password(token, password_id, password="annule-secret-3")
+            assert manager.retrieve_password(token, password_id)["password"] == "annule-secret-3"
+            raise RuntimeError("annulation")
+    assert manager.retrieve_password(token, password_id)["password"] == "ancien-secret-1"
@@ -0,0 +1,138 @@
+# test_storage.py
+"""
+Les moteurs SQLite, en mémoire et avec cache doivent donner les mêmes résultats ;
+le cache ne doit jamais servir une ligne périmée après une écriture.
+
+    python -m pytest test_storage.py
+"""
+import threading
+
+import pytest
+
+import storage
+from config import Config
+
+# site, nom d'utilisateur, notes
+ENTRIES = [
+    ("github.com", "alice", "dépôt de code"),
+    ("gitlab.com", "alice.dev", None),
+    ("amazon.fr", "bob", "achats"),
+    ("banque", "alice", "compte courant"),
+]
+
+@pytest.fixture(params=["sqlite", "memory", "cached"])
+def backend(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "DATABASE_PATH", str(tmp_path / "passwords.db"))
+    backend = storage.create_backend(request.param)
+    backend.initialize()
+    yield backend
+    backend.close()
+
+@pytest.fixture
+def vault(backend):
+    user_id = backend.add_user("alice", "hash", "alice@example.com")
+    ids = [backend.add_password(user_id, site, username, f"jeton-{site}", notes) for site, username, notes in ENTRIES]
+    return backend, user_id, ids
+
+def _sites(rows):
+    return [row["site_name"] for row in rows]
+
+def test_add_and_get(vault):
+    backend, user_id, ids = vault
+    row = backend.get_password_by_id(ids[0], user_id)
+    assert (row["site_name"], row["username"], row["encrypted_password"], row["notes"]) == \
+        ("github.com", "alice", "jeton-github.com", "dépôt de code")
+    # Une entrée n'est visible que par son propriétaire
+    other_id = backend.add_user("bob", "hash", "bob@example.com")
+    assert backend.get_password_by_id(ids[0], other_id) is None
+
+def test_page(vault):
+    backend, user_id, ids = vault
+    first = backend.get_passwords_page(user_id, 0, 2)
+    assert [row["id"] for row in first] == ids[:2]
+    assert set(first[0]) == {"id", "site_name", "username"}
+    rest = backend.get_passwords_page(user_id, first[-1]["id"], 10, ["id", "notes"])
+    assert rest == [{"id": ids[2], "notes": "achats"}, {"id": ids[3], "notes": "compte courant"}]
+
+@pytest.mark.parametrize("query, fuzzy, expected", [
+    ("git", False, {"github.com", "gitlab.com"}),
+    ("courant", False, {"banque"}),
+    ("gi", False, {"github.com", "gitlab.com"}),
+    # Requêtes floues sans trigramme : recherche par préfixe, comme sans `fuzzy`
+    ("gi", True, {"github.com", "gitlab.com"}),
+    ("am bo", True, {"amazon.fr"}),
+    ("zzz", True, set()),
+])
+def test_search(vault, query, fuzzy, expected):
+    backend, user_id, _ = vault
+    assert set(_sites(backend.search_passwords(user_id, query, fuzzy=fuzzy))) == expected
+
+def test_fuzzy_search_ranks_closest_first(vault):
+    backend, user_id, _ = vault
+    sites = _sites(backend.search_passwords(user_id, "githib", fuzzy=True))
+    assert sites[0] == "github.com"
+    assert set(sites) == {"github.com", "gitlab.com"}
+
+def test_update(vault):
+    backend, user_id, ids = vault
+    assert backend.update_password(ids[2], user_id, {"site_name": "amazon.de", "notes": "livres"})
+    row = backend.get_password_by_id(ids[2], user_id)
+    assert (row["site_name"], row["username"], row["notes"]) == ("amazon.de", "bob", "livres")
+    assert _sites(backend.search_passwords(user_id, "livres")) == ["amazon.de"]
+    assert backend.search_passwords(user_id, "achats") == []
+    assert not backend.update_password(ids[2], user_id + 1, {"notes": "autre"})
+
+def test_delete(vault):
+    backend, user_id, ids = vault
+    assert backend.delete_password(ids[0], user_id)
+    assert backend.get_password_by_id(ids[0], user_id) is None
+    assert not backend.delete_password(ids[0], user_id)
+    assert _sites(backend.search_passwords(user_id, "git")) == ["gitlab.com"]
+
+def test_transaction_rollback(vault):
+    backend, user_id, ids = vault
+    with pytest.raises(RuntimeError):
+        with backend.transaction():
+            backend.add_password(user_id, "annulée", "alice", "jeton", None)
+            backend.update_password(ids[1], user_id, {"site_name": "modifiée"})
+            backend.delete_password(ids[3], user_id)
+            raise RuntimeError("annulation")
+    assert [row["id"] for row in backend.get_passwords_page(user_id, 0, 10)] == ids
+    assert backend.get_password_by_id(ids[1], user_id)["site_name"] == "gitlab.com"
+    assert backend.search_passwords(user_id, "annulée") == []
+    assert _sites(backend.search_passwords(user_id, "courant")) == ["banque"]
+
+def test_cache_ignores_read_started_before_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "DATABASE_PATH", str(tmp_path / "passwords.db"))
+    backend = storage.CachingBackend(storage.MemoryBackend())
+    user_id = backend.add_user("alice", "hash", "alice@example.com")
+    password_id = backend.add_password(user_id, "github.com", "alice", "ancien", None)
+    read = backend.backend.get_password_by_id
+
+    def slow_read(*args):
+        # La lecture obtient l'ancienne ligne, puis une écriture passe avant sa mise en cache
+        row = read(*args)
+        backend.update_password(password_id, user_id, {"encrypted_password": "nouveau"})
+        return row
+
+    monkeypatch.setattr(backend.backend, "get_password_by_id", slow_read)
+    assert backend.get_password_by_id(password_id, user_id)["encrypted_password"] == "ancien"
+    monkeypatch.setattr(backend.backend, "get_password_by_id", read)
+    assert backend.get_password_by_id(password_id, user_id)["encrypted_password"] == "nouveau"
+
+def test_cache_invalidated_at_commit(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "DATABASE_PATH", str(tmp_path / "passwords.db"))
+    backend = storage.CachingBackend(storage.SQLiteBackend())
+    backend.initialize()
+    try:
+        user_id = backend.add_user("alice", "hash", "alice@example.com")
+        password_id = backend.add_password(user_id, "github.com", "alice", "ancien", None)
+        with backend.transaction():
+            backend.update_password(password_id, user_id, {"encrypted_password": "nouveau"})
+            # Un autre thread relit la ligne validée (l'ancienne) et la remet en cache
+            reader = threading.Thread(target=backend.get_password_by_id, args=(password_id, user_id))
+            reader.start()
+            reader.join()
+        assert backend.get_password_by_id(password_id, user_id)["encrypted_password"] == "nouveau"
+    finally:
+        backend.close()
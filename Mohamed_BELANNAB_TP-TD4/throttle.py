@@ -0,0 +1,169 @@
+# throttle.py
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class _ThrottleState:
+    __slots__ = ("tokens", "refilled_at", "failures", "locked_until", "failed_at")
+
+    def __init__(self, tokens: float, refilled_at: float, failures: int = 0, locked_until: float = 0.0,
+                 failed_at: float = 0.0):
+        self.tokens = tokens
+        self.refilled_at = refilled_at
+        self.failures = failures
+        self.locked_until = locked_until
+        self.failed_at = failed_at
+
+class LoginThrottle:
+    """
+    Limitation des tentatives de connexion, consultée avant tout travail bcrypt.
+
+    Chaque nom d'utilisateur et chaque source (ex. uid du client) a un seau de
+    jetons : une tentative consomme un jeton, les jetons se regagnent à débit
+    constant. Après LOGIN_LOCKOUT_THRESHOLD échecs consécutifs, la clé est
+    verrouillée pour une durée qui double à chaque nouvel échec. Le compteur
+    d'échecs repart de zéro après LOGIN_FAILURE_RESET secondes sans échec : une
+    source partagée (uid de la CLI) n'accumule pas des fautes de frappe espacées.
+
+    Les états sont gardés dans l'ordre du dernier accès et les plus anciens sont
+    évincés quand la table est pleine. Avec `persist`, échecs et verrouillages
+    sont aussi écrits dans le stockage (storage.py) pour survivre au processus (CLI).
+    """
+
+    def __init__(self, persist: Optional[bool] = None, max_entries: Optional[int] = None, storage=None):
+        self.persist = Config.LOGIN_THROTTLE_PERSIST if persist is None else persist
+        self.storage = storage
+        self.max_entries = max_entries or Config.LOGIN_THROTTLE_MAX_ENTRIES
+        # type de clé -> (capacité du seau, jetons regagnés par seconde)
+        self.buckets = {
+            "user": (Config.LOGIN_USER_BURST, Config.LOGIN_USER_RATE),
+            "source": (Config.LOGIN_SOURCE_BURST, Config.LOGIN_SOURCE_RATE),
+        }
+        self._states: "OrderedDict[str, _ThrottleState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"allowed": 0, "throttled": 0, "locked_out": 0, "failures": 0, "lockouts": 0, "evicted": 0}
+
+    @staticmethod
+    def _keys(username: str, source: Optional[str]) -> List[Tuple[str, str]]:
+        keys = [("user", f"user:{username}")]
+        if source:
+            keys.append(("source", f"source:{source}"))
+        return keys
+
+    def _storage(self):
+        # Import tardif : le moteur n'est chargé qu'à la première persistance
+        if self.storage is None:
+            from storage import get_backend
+            self.storage = get_backend()
+        return self.storage
+
+    def _load_persisted(self, keys: List[Tuple[str, str]]) -> Dict[str, Optional[Dict]]:
+        """Lire, hors du verrou global, l'état persisté des clés absentes de la mémoire."""
+        if not self.persist:
+            return {}
+        with self._lock:
+            missing = [key for _, key in keys if key not in self._states]
+        return {key: self._storage().get_throttle_state(key) for key in missing}
+
+    def _state(self, kind: str, key: str, now: float, persisted: Dict[str, Optional[Dict]]) -> _ThrottleState:
+        """État d'une clé (avec l'état persisté lu par _load_persisted s'il n'est pas en mémoire), jetons remis à jour."""
+        capacity, rate = self.buckets[kind]
+        state = self._states.get(key)
+        if state is None:
+            state = _ThrottleState(capacity, now)
+            saved = persisted.get(key)
+            if saved:
+                state.failures, state.locked_until = saved["failures"], saved["locked_until"]
+                state.failed_at = saved["updated_at"]
+            self._states[key] = state
+            while len(self._states) > self.max_entries:
+                self._states.popitem(last=False)
+                self._stats["evicted"] += 1
+        else:
+            self._states.move_to_end(key)
+            state.tokens = min(capacity, state.tokens + (now - state.refilled_at) * rate)
+            state.refilled_at = now
+        if state.failures and now - state.failed_at >= Config.LOGIN_FAILURE_RESET:
+            state.failures = 0
+        return state
+
+    def _wait(self, kind: str, state: _ThrottleState, now: float) -> Tuple[float, bool]:
+        """Temps d'attente avant la prochaine tentative autorisée, et si la clé est verrouillée."""
+        if state.locked_until > now:
+            return state.locked_until - now, True
+        if state.tokens < 1:
+            return (1 - state.tokens) / self.buckets[kind][1], False
+        return 0.0, False
+
+    def acquire(self, username: str, source: Optional[str] = None) -> float:
+        """
+        Autoriser ou refuser une tentative. Retourne 0 si elle est autorisée
+        (un jeton est consommé sur chaque clé), sinon le nombre de secondes à
+        attendre ; une tentative refusée ne consomme rien.
+        """
+        keys = self._keys(username, source)
+        persisted = self._load_persisted(keys)
+        now = time.time()
+        with self._lock:
+            states = [(kind, self._state(kind, key, now, persisted)) for kind, key in keys]
+            waits = [self._wait(kind, state, now) for kind, state in states]
+            retry_after = max(wait for wait, _ in waits)
+            if retry_after > 0:
+                self._stats["locked_out" if any(locked for _, locked in waits) else "throttled"] += 1
+                return retry_after
+            for _, state in states:
+                state.tokens -= 1
+            self._stats["allowed"] += 1
+            return 0.0
+
+    def retry_after(self, username: str, source: Optional[str] = None) -> float:
+        """Temps d'attente actuel, sans consommer de jeton."""
+        keys = self._keys(username, source)
+        persisted = self._load_persisted(keys)
+        now = time.time()
+        with self._lock:
+            return max(self._wait(kind, self._state(kind, key, now, persisted), now)[0] for kind, key in keys)
+
+    def record_failure(self, username: str, source: Optional[str] = None) -> None:
+        """Compter un échec ; au-delà du seuil, verrouiller avec un délai exponentiel."""
+        keys = self._keys(username, source)
+        loaded = self._load_persisted(keys)
+        now = time.time()
+        persisted = []
+        with self._lock:
+            self._stats["failures"] += 1
+            for kind, key in keys:
+                state = self._state(kind, key, now, loaded)
+                state.failures += 1
+                state.failed_at = now
+                excess = state.failures - Config.LOGIN_LOCKOUT_THRESHOLD
+                if excess >= 0:
+                    state.locked_until = now + min(Config.LOGIN_LOCKOUT_BASE * 2 ** excess, Config.LOGIN_LOCKOUT_MAX)
+                    self._stats["lockouts"] += 1
+                    logger.warning(f"Connexions verrouillées pour {key} pendant {state.locked_until - now:.0f} s "
+                                   f"après {state.failures} échecs")
+                persisted.append((key, state.failures, state.locked_until))
+        if self.persist:
+            for key, failures, locked_until in persisted:
+                self._storage().save_throttle_state(key, failures, locked_until, now)
+
+    def record_success(self, username: str, source: Optional[str] = None) -> None:
+        """Remettre à zéro les échecs du nom d'utilisateur (ceux de la source sont conservés)."""
+        key = f"user:{username}"
+        with self._lock:
+            state = self._states.get(key)
+            had_failures = state is not None and (state.failures or state.locked_until)
+            if state is not None:
+                state.failures, state.locked_until = 0, 0.0
+        if self.persist and had_failures:
+            self._storage().delete_throttle_state(key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "tracked": len(self._states)}